@@ -2,16 +2,19 @@
 # Importações organizadas por origem
 from flask import (
     Flask, Blueprint, render_template, jsonify, request, 
-    send_file, redirect, url_for, session, flash, current_app
+    send_file, redirect, url_for, session, flash, current_app, Response
 )
 from functools import wraps
+from contextlib import closing, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 import jinja2
 import signal
 import secrets
 import ansible_runner
-from datetime import datetime
+from datetime import datetime, timezone
 import threading
+import time
 import yaml  # Certifique-se que esta importação esteja presente
 import os
 import json
@@ -19,17 +22,38 @@ import re
 import getpass
 from ansible.parsing.dataloader import DataLoader
 from ansible.inventory.manager import InventoryManager
+from ansible.release import __version__ as ANSIBLE_CORE_VERSION
+from ansible import constants as ANSIBLE_CONSTANTS
 import subprocess
 import logging
-import platform
 from pathlib import Path
 import configparser
 import tempfile
+import shutil
+import hashlib
+import math
+import bisect
+import sqlite3
+import gzip
+from html import escape
+import fnmatch
+import asyncio
+import ssl
+import queue
+import socket
+import urllib.request
+import urllib.error
+import sys
 import os
 import tempfile
 from datetime import datetime
 import logging
 
+try:
+    import brotli  # Opcional: compressão "br" nas respostas HTTP
+except ImportError:
+    brotli = None
+
 # Configuração do Blueprint
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = secrets.token_hex(16)  # Chave secreta para sessões
@@ -174,10 +198,9 @@ def dashboard_data():
                 logger.error(f"Erro ao carregar playbooks: {str(e)}")
             
             try:
-                hosts = ansible_mgr.load_inventory()
-                hosts_data['hosts_count'] = len(hosts)
-                hosts_data['linux_count'] = sum(1 for info in hosts.values() if info.get("connection") != "winrm")
-                hosts_data['windows_count'] = sum(1 for info in hosts.values() if info.get("connection") == "winrm")
+                hosts_data['linux_count'] = len(ansible_mgr.inventory.hosts_by_os("linux"))
+                hosts_data['windows_count'] = len(ansible_mgr.inventory.hosts_by_os("windows"))
+                hosts_data['hosts_count'] = hosts_data['linux_count'] + hosts_data['windows_count']
             except Exception as e:
                 logger.error(f"Erro ao carregar hosts: {str(e)}")
             
@@ -214,6 +237,187 @@ INVENTORY_DIR = os.path.join(BASE_DIR, 'inventory')
 GROUP_VARS_DIR = os.path.join(INVENTORY_DIR, 'group_vars')
 INVENTORY_FILE = os.path.join(INVENTORY_DIR, 'inventory.ini')
 
+# Configuração do motor de sondagem de hosts (/api/hosts)
+PROBE_MAX_WORKERS = int(os.environ.get('AUTOMATO_PROBE_WORKERS', '16'))
+PROBE_HOST_TIMEOUT = float(os.environ.get('AUTOMATO_PROBE_HOST_TIMEOUT', '60'))
+# Forks usados na coleta de fatos em lote (uma execução do Ansible para vários hosts)
+FACTS_BATCH_FORKS = int(os.environ.get('AUTOMATO_FACTS_FORKS', '50'))
+# Conexões TCP simultâneas no teste de conectividade (SSH/WinRM) e prazo de cada uma
+PROBE_CONNECT_CONCURRENCY = int(os.environ.get('AUTOMATO_PROBE_CONNECTIONS', '1000'))
+PROBE_CONNECT_TIMEOUT = float(os.environ.get('AUTOMATO_PROBE_CONNECT_TIMEOUT', '5'))
+
+# Cache persistente de fatos dos hosts
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+FACTS_CACHE_TTL = float(os.environ.get('AUTOMATO_FACTS_TTL', '300'))
+FACTS_REFRESH_INTERVAL = float(os.environ.get('AUTOMATO_FACTS_REFRESH_INTERVAL', '60'))
+# Intervalo da varredura do catálogo de playbooks (0 desativa a thread de varredura)
+CATALOG_POLL_INTERVAL = float(os.environ.get('AUTOMATO_CATALOG_POLL_INTERVAL', '10'))
+# Intervalo (s) entre os comentários de keep-alive do stream de execução (SSE)
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('AUTOMATO_STREAM_HEARTBEAT', '15'))
+
+# Histórico persistente de jobs
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+# jobs.db e a saída dos jobs ficam em disco local do nó controlador: o SQLite em WAL não funciona
+# em sistemas de arquivos de rede (NFS, SMB...), e com o banco em um deles este nó não executa
+# jobs. Outros nós participam por HTTP (ver JOB_COORDINATOR_URL), sem acessar o arquivo
+JOBS_DB_PATH = os.environ.get('AUTOMATO_JOBS_DB', os.path.join(DATA_DIR, 'jobs.db'))
+JOB_OUTPUT_DIR = os.environ.get('AUTOMATO_JOB_OUTPUT_DIR', os.path.join(DATA_DIR, 'job_output'))
+JOB_RETENTION_DAYS = float(os.environ.get('AUTOMATO_JOB_RETENTION_DAYS', '30'))
+JOB_HISTORY_MAX = int(os.environ.get('AUTOMATO_JOB_HISTORY_MAX', '2000'))
+# Inventário (fonte única em SQLite)
+INVENTORY_DB_PATH = os.path.join(DATA_DIR, 'inventory.db')
+
+# Fila de execução de jobs
+JOB_WORKERS = int(os.environ.get('AUTOMATO_JOB_WORKERS', '4'))
+JOB_PER_HOST_LIMIT = int(os.environ.get('AUTOMATO_JOB_PER_HOST_LIMIT', '1'))
+JOB_DEFAULT_PRIORITY = 5
+# Status em que um job ainda não terminou
+ACTIVE_JOB_STATUSES = ("queued", "running")
+# Estado compartilhado entre processos: os jobs em execução publicam saída e progresso no
+# jobs.db a cada JOB_SYNC_INTERVAL e os workers ociosos consultam a fila a cada JOB_POLL_INTERVAL
+JOB_SYNC_INTERVAL = float(os.environ.get('AUTOMATO_JOB_SYNC_INTERVAL', '0.5'))
+JOB_POLL_INTERVAL = float(os.environ.get('AUTOMATO_JOB_POLL_INTERVAL', '1'))
+# Intervalo da verificação de jobs de processos que terminaram sem finalizá-los
+JOB_RECOVER_INTERVAL = float(os.environ.get('AUTOMATO_JOB_RECOVER_INTERVAL', '30'))
+# Quem executa os jobs:
+# - "auto" (padrão): os pontos de entrada (python app.py, --production) iniciam um job runner
+#   em sessão própria, que sobrevive a recargas e quedas da web; os processos web só executam
+#   jobs enquanto não há nenhum job runner ativo
+# - "embedded": como "auto", mas sem iniciar o job runner
+# - "daemon": somente processos "python app.py --job-runner"; a web apenas enfileira,
+#   consulta e cancela pelo jobs.db
+JOB_EXECUTION_MODE = os.environ.get('AUTOMATO_EXECUTION_MODE', 'auto')
+# Processos que executam jobs registram um heartbeat; sem heartbeat por JOB_WORKER_TIMEOUT são considerados parados
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('AUTOMATO_JOB_HEARTBEAT_INTERVAL', '5'))
+JOB_WORKER_TIMEOUT = float(os.environ.get('AUTOMATO_JOB_WORKER_TIMEOUT', '30'))
+# Lease dos jobs em execução, renovado pelo dono a cada heartbeat. O job só é recuperado quando
+# o processo dono comprovadamente terminou: volta para a fila apenas se JOB_MAX_ATTEMPTS > 1
+# (nova execução opcional; playbooks nem sempre são idempotentes), senão fica "interrupted"
+JOB_LEASE_TTL = float(os.environ.get('AUTOMATO_JOB_LEASE_TTL', '30'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('AUTOMATO_JOB_MAX_ATTEMPTS', '1'))
+# Hosts por shard ao distribuir um job entre workers e nós (0 = o job não é dividido)
+JOB_SHARD_SIZE = int(os.environ.get('AUTOMATO_JOB_SHARD_SIZE', '0'))
+# Nós adicionais: "python app.py --job-runner" com AUTOMATO_JOB_COORDINATOR=http://<controlador>:<porta>
+# assume, renova e finaliza jobs pela API /api/cluster/ do nó dono do jobs.db. Todos os nós usam o
+# mesmo AUTOMATO_CLUSTER_TOKEN (sem ele a API fica desativada) e a mesma árvore do projeto
+# (playbooks/ e inventory/ sincronizados); os caminhos dos playbooks são relativos a BASE_DIR
+JOB_COORDINATOR_URL = os.environ.get('AUTOMATO_JOB_COORDINATOR', '').rstrip('/')
+CLUSTER_TOKEN = os.environ.get('AUTOMATO_CLUSTER_TOKEN', '')
+# Sockets Unix pelos quais a web acorda os job runners logo após enfileirar um job
+RUNNER_SOCKET_DIR = os.path.join(DATA_DIR, 'runners')
+# Tempo que um job runner encerrado (SIGTERM) espera os jobs em execução terminarem
+RUNNER_DRAIN_TIMEOUT = float(os.environ.get('AUTOMATO_RUNNER_DRAIN_TIMEOUT', '300'))
+# Cache chave/valor compartilhado entre os processos do servidor (dados do dashboard)
+SHARED_CACHE_DB_PATH = os.path.join(DATA_DIR, 'shared_cache.db')
+DASHBOARD_CACHE_TTL = float(os.environ.get('AUTOMATO_DASHBOARD_CACHE_TTL', '30'))
+# Servidor de produção (gunicorn): endereço, processos e threads por processo
+WEB_BIND = os.environ.get('AUTOMATO_BIND', '0.0.0.0:5000')
+WEB_WORKERS = int(os.environ.get('AUTOMATO_WEB_WORKERS', '4'))
+WEB_THREADS = int(os.environ.get('AUTOMATO_WEB_THREADS', '8'))
+# Cada stream SSE (/api/stream) ocupa uma thread do gthread durante todo o job; o limite por
+# processo preserva threads para as demais requisições (acima dele a resposta é 503 e o
+# cliente volta a consultar /api/status). Para centenas de visualizações abertas, rode o
+# servidor de streams (python app.py --stream-server, gevent) e encaminhe /api/stream/ para ele
+STREAM_MAX_CONNECTIONS = int(os.environ.get('AUTOMATO_STREAM_MAX', str(max(1, WEB_THREADS // 2))))
+STREAM_BIND = os.environ.get('AUTOMATO_STREAM_BIND', '0.0.0.0:5001')
+STREAM_WORKERS = int(os.environ.get('AUTOMATO_STREAM_WORKERS', '2'))
+STREAM_WORKER_CONNECTIONS = int(os.environ.get('AUTOMATO_STREAM_WORKER_CONNECTIONS', '1000'))
+# Chave das sessões, igual em todos os processos (AUTOMATO_SECRET_KEY ou arquivo gerado em data/)
+SECRET_KEY_PATH = os.path.join(DATA_DIR, 'secret_key')
+# Hosts executados simultaneamente no baseline multi-host
+BASELINE_PARALLELISM = int(os.environ.get('AUTOMATO_BASELINE_WIDTH', '10'))
+# Pool de conexões SSH multiplexadas (ControlMaster); caminho curto por causa do limite dos sockets Unix
+SSH_CONTROL_DIR = os.environ.get('AUTOMATO_SSH_CONTROL_DIR', os.path.join(tempfile.gettempdir(), f"automato-ssh-{getpass.getuser()}"))
+SSH_CONTROL_PERSIST = int(os.environ.get('AUTOMATO_SSH_CONTROL_PERSIST', '600'))
+SSH_PREWARM_WORKERS = int(os.environ.get('AUTOMATO_SSH_PREWARM_WORKERS', '16'))
+# Compressão das respostas HTTP (gzip ou brotli, conforme o Accept-Encoding do cliente)
+COMPRESS_MIN_SIZE = int(os.environ.get('AUTOMATO_COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.environ.get('AUTOMATO_COMPRESS_LEVEL', '6'))
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/css', 'text/javascript',
+    'application/javascript', 'application/x-yaml'
+}
+# Workers da validação de sintaxe do catálogo inteiro (um ansible-playbook por worker)
+CATALOG_VALIDATION_WORKERS = int(os.environ.get('AUTOMATO_VALIDATION_WORKERS', str(os.cpu_count() or 4)))
+
+# Perfis de execução: opções gravadas no ansible.cfg gerado para cada job
+JOB_CONFIG_DIR = os.path.join(DATA_DIR, 'job_config')
+EXECUTION_PROFILES = {
+    "default": {
+        "label": "Padrão",
+        "description": "Configuração padrão do Ansible (5 forks, estratégia linear)",
+        "config": {}
+    },
+    "high_fanout": {
+        "label": "Alto paralelismo",
+        "description": "Muitos hosts: forks elevados, estratégia free, pipelining e fatos em cache",
+        "config": {
+            "defaults": {
+                "forks": int(os.environ.get('AUTOMATO_FANOUT_FORKS', '50')),
+                "strategy": "free",
+                # Fatos coletados uma vez e reaproveitados entre plays e jobs
+                "gathering": "smart",
+                "fact_caching": "jsonfile",
+                "fact_caching_connection": os.path.join(CACHE_DIR, 'ansible_facts'),
+                "fact_caching_timeout": 3600,
+                "timeout": 10
+            },
+            "ssh_connection": {
+                "pipelining": True
+            }
+        }
+    },
+    "conservative": {
+        "label": "Conservador",
+        "description": "Hosts sensíveis: poucos forks, estratégia linear, sem pipelining e timeouts maiores",
+        "config": {
+            "defaults": {
+                "forks": 2,
+                "strategy": "linear",
+                "timeout": 60
+            },
+            "ssh_connection": {
+                "pipelining": False,
+                "retries": 3
+            }
+        }
+    }
+}
+DEFAULT_EXECUTION_PROFILE = os.environ.get('AUTOMATO_EXECUTION_PROFILE', 'default')
+if DEFAULT_EXECUTION_PROFILE not in EXECUTION_PROFILES:
+    # Um perfil inválido faria toda execução sem perfil explícito falhar com 400
+    logger.warning(f"Perfil de execução padrão desconhecido em AUTOMATO_EXECUTION_PROFILE: "
+                   f"{DEFAULT_EXECUTION_PROFILE!r}; usando 'default'")
+    DEFAULT_EXECUTION_PROFILE = 'default'
+
+
+def _load_secret_key() -> str:
+    """
+    Chave de assinatura das sessões. Precisa ser a mesma em todos os processos do servidor,
+    senão o login feito em um worker não vale nos demais.
+    """
+    key = os.environ.get('AUTOMATO_SECRET_KEY')
+    if key:
+        return key
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if not os.path.exists(SECRET_KEY_PATH):
+        fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+            os.chmod(tmp_path, 0o600)
+            # link() é atômico e falha se outro processo já criou a chave
+            os.link(tmp_path, SECRET_KEY_PATH)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(SECRET_KEY_PATH, 'r') as f:
+        return f.read().strip()
+
+
+app.secret_key = _load_secret_key()
+
 # Classe para formatação de saída do Ansible
 class AnsibleOutputFormatter:
     """
@@ -311,199 +515,80 @@ class AnsibleOutputFormatter:
     }
     
     
+    # Rótulos exibidos nos resultados de tarefa; cores e ícones ficam em static/css/ansible/job-output.css
+    RESULT_LABELS = {
+        'ok': 'Sucesso',
+        'changed': 'Alterado',
+        'failed': 'Falha',
+        'skipped': 'Ignorado',
+        'unreachable': 'Inacessível'
+    }
+    
+    @staticmethod
+    def _format_json(text: str) -> str:
+        """JSON indentado (e escapado) ou None se o texto não for um objeto JSON"""
+        text = text.strip()
+        if not (text.startswith('{') and text.endswith('}')):
+            return None
+        try:
+            return escape(json.dumps(json.loads(text), indent=2), quote=False)
+        except ValueError:
+            return None
+    
     @staticmethod
     def format_output(line: str) -> str:
-        """Formata uma linha de saída do Ansible para HTML com design aprimorado"""
-        if not line.strip():
+        """
+        Formata uma linha de saída do Ansible em HTML compacto: cada tipo de linha recebe
+        apenas uma classe "ao-*" e o visual vem de static/css/ansible/job-output.css.
+        Todo texto vindo do Ansible é escapado.
+        """
+        line = line.strip()
+        if not line:
             return ""
         
-        # Formata cabeçalhos de PLAY com design destacado
+        # PLAY RECAP antes de PLAY, que também casaria com o resumo
+        if line.startswith('PLAY RECAP'):
+            return '<div class="ao-recap">Resumo da Execução</div>'
+        
         if line.startswith('PLAY'):
-            play_name = line.replace('PLAY', '').strip('[] *')
-            return (
-                '<div class="ansible-play" style="background-color: #252526; color: #569cd6; '
-                'font-weight: bold; margin: 12px 0; padding: 10px 15px; border-radius: 6px; '
-                'box-shadow: 0 2px 4px rgba(0,0,0,0.2); display: flex; align-items: center;">'
-                '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" '
-                'stroke-width="2" style="margin-right: 10px;"><polygon points="5 3 19 12 5 21 5 3"></polygon></svg>'
-                f'Playbook: {play_name}</div>'
-            )
+            play_name = escape(line[4:].strip('[] *'), quote=False)
+            return f'<div class="ao-play">Playbook: {play_name}</div>'
         
-        # Formata cabeçalhos de TASK com design moderno
         if line.startswith('TASK'):
-            task_name = line.replace('TASK', '').strip('[] *')
-            return (
-                '<div class="ansible-task" style="background-color: #2d2d2d; color: #9cdcfe; '
-                'font-weight: 500; margin: 8px 0; padding: 8px 15px; border-radius: 4px; '
-                'border-left: 3px solid #0e639c; display: flex; align-items: center;">'
-                '<svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" '
-                'stroke-width="2" style="margin-right: 10px;"><path d="M8 6h13M8 12h13M8 18h13M3 6h.01M3 12h.01M3 18h.01"></path></svg>'
-                f'Tarefa: {task_name}</div>'
-            )
-        
-        # Formata resumo (PLAY RECAP) com design visual destacado
-        if line.startswith('PLAY RECAP'):
-            return (
-                '<div class="ansible-recap" style="background-color: #252526; color: #569cd6; '
-                'font-weight: bold; margin: 15px 0 5px 0; padding: 10px 15px; border-radius: 6px; '
-                'border-top: 2px solid #0e639c; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">'
-                '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" '
-                'stroke-width="2" style="margin-right: 10px; vertical-align: middle;"><path d="M16 4h2a2 2 0 0 1 2 2v14a2 2 0 0 1-2 2H6a2 2 0 0 1-2-2V6a2 2 0 0 1 2-2h2"></path>'
-                '<rect x="8" y="2" width="8" height="4" rx="1" ry="1"></rect></svg>'
-                'Resumo da Execução</div>'
-            )
+            task_name = escape(line[4:].strip('[] *'), quote=False)
+            return f'<div class="ao-task">Tarefa: {task_name}</div>'
         
-        # Formata resultado de tarefas (ok, changed, failed, etc.) com cards visuais
-        for status in ['ok', 'changed', 'failed', 'skipped', 'unreachable']:
+        # Resultado de tarefa (ok, changed, failed, etc.)
+        for status, label in AnsibleOutputFormatter.RESULT_LABELS.items():
             if line.startswith(f"{status}:"):
                 parts = line.split('=>', 1)
-                host_part = parts[0].replace(f"{status}:", '').strip('[] ')
+                host_part = escape(parts[0][len(status) + 1:].strip('[] '), quote=False)
                 content_part = parts[1].strip() if len(parts) > 1 else ''
                 
-                status_colors = {
-                    'ok': '#4CAF50',
-                    'changed': '#FF9800',
-                    'failed': '#F44336',
-                    'skipped': '#9E9E9E',
-                    'unreachable': '#F44336'
-                }
-                
-                status_icons = {
-                    'ok': '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">'
-                        '<path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path>'
-                        '<polyline points="22 4 12 14.01 9 11.01"></polyline></svg>',
-                    'changed': '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">'
-                            '<path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>'
-                            '<path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path></svg>',
-                    'failed': '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">'
-                            '<circle cx="12" cy="12" r="10"></circle>'
-                            '<line x1="12" y1="8" x2="12" y2="12"></line>'
-                            '<line x1="12" y1="16" x2="12.01" y2="16"></line></svg>',
-                    'skipped': '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">'
-                            '<polygon points="5 4 15 12 5 20 5 4"></polygon>'
-                            '<line x1="19" y1="5" x2="19" y2="19"></line></svg>',
-                    'unreachable': '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">'
-                                '<line x1="1" y1="1" x2="23" y2="23"></line>'
-                                '<path d="M16.72 11.06A10.94 10.94 0 0 1 19 12.55"></path>'
-                                '<path d="M5 12.55a10.94 10.94 0 0 1 5.17-2.39"></path></svg>'
-                }
-                
-                status_labels = {
-                    'ok': 'Sucesso',
-                    'changed': 'Alterado',
-                    'failed': 'Falha',
-                    'skipped': 'Ignorado',
-                    'unreachable': 'Inacessível'
-                }
-                
-                status_color = status_colors.get(status, '#d4d4d4')
-                status_icon = status_icons.get(status, '')
-                status_label = status_labels.get(status, status.capitalize())
-                
-                bg_color = f"rgba({','.join(str(int(status_color[1:][i:i+2], 16)) for i in (0, 2, 4))}, 0.1)"
-                
-                result = (
-                    f'<div class="ansible-task-status" style="margin: 6px 0; padding: 10px 15px; '
-                    f'background-color: {bg_color}; border-left: 3px solid {status_color}; '
-                    f'border-radius: 4px; display: flex; align-items: flex-start;">'
-                    f'<div style="color: {status_color}; margin-right: 10px;">{status_icon}</div>'
-                    f'<div style="flex: 1;">'
-                    f'<div style="font-weight: 500; display: flex; justify-content: space-between;">'
-                    f'<span>{status_label}</span>'
-                    f'<span style="font-size: 12px; color: #666; background: rgba(0,0,0,0.1); '
-                    f'padding: 2px 6px; border-radius: 12px;">Host: {host_part}</span>'
-                    f'</div>'
-                )
-                
+                result = f'<div class="ao-res ao-{status}"><b>{label}</b><i>{host_part}</i>'
                 if content_part:
-                    # Se for um JSON, tenta formatá-lo bonito
-                    if content_part.strip().startswith('{') and content_part.strip().endswith('}'):
-                        try:
-                            import json
-                            json_obj = json.loads(content_part)
-                            json_str = json.dumps(json_obj, indent=2)
-                            result += (
-                                f'<div style="margin-top: 6px; padding: 8px; background-color: #1e1e1e; '
-                                f'border-radius: 4px; font-family: monospace; white-space: pre-wrap; '
-                                f'font-size: 13px; overflow: auto; max-height: 300px;">{json_str}</div>'
-                            )
-                        except:
-                            result += (
-                                f'<div style="margin-top: 6px; color: #d4d4d4; '
-                                f'font-family: monospace;">{content_part}</div>'
-                            )
+                    json_str = AnsibleOutputFormatter._format_json(content_part)
+                    if json_str is not None:
+                        result += f'<pre>{json_str}</pre>'
                     else:
-                        result += (
-                            f'<div style="margin-top: 6px; color: #d4d4d4; '
-                            f'font-family: monospace;">{content_part}</div>'
-                        )
-                
-                result += '</div></div>'
-                return result
+                        result += f'<code>{escape(content_part, quote=False)}</code>'
+                return result + '</div>'
         
-        # Formata linhas de resumo com estatísticas coloridas
+        # Linha de resumo por host com as estatísticas
         if any(x in line for x in ['ok=', 'changed=', 'unreachable=', 'failed=']):
-            parts = []
-            host = line.split(' ', 1)[0]
-            
+            host = escape(line.split(' ', 1)[0], quote=False)
             stats_text = line.split(' : ')[1] if ' : ' in line else line
-            stats = {}
-            
-            for stat in stats_text.split():
-                if '=' in stat:
-                    key, value = stat.split('=')
-                    stats[key] = int(value)
-            
-            status_colors = {
-                'ok': '#4CAF50',
-                'changed': '#FF9800',
-                'unreachable': '#F44336',
-                'failed': '#F44336',
-                'skipped': '#9E9E9E',
-                'rescued': '#29B6F6',
-                'ignored': '#BDBDBD'
-            }
-            
-            result = (
-                f'<div style="margin: 8px 0; padding: 12px 15px; background-color: #252526; '
-                f'border-radius: 6px; font-family: monospace;">'
-                f'<div style="margin-bottom: 8px; font-weight: 500;">Host: {host}</div>'
-                f'<div style="display: flex; flex-wrap: wrap; gap: 8px;">'
+            stats = ''.join(
+                f'<span class="ao-{escape(key)}">{escape(key)}: {escape(value)}</span>'
+                for key, _, value in (stat.partition('=') for stat in stats_text.split() if '=' in stat)
             )
-            
-            for key, value in stats.items():
-                color = status_colors.get(key, '#d4d4d4')
-                result += (
-                    f'<div style="padding: 4px 8px; background-color: {color}; color: white; '
-                    f'border-radius: 4px; font-weight: 500; display: inline-flex; align-items: center;">'
-                    f'{key}: {value}</div>'
-                )
-            
-            result += '</div></div>'
-            return result
-        
-        # Formata linhas de saída JSON com estilo especial para melhor leitura
-        if line.strip().startswith('{') and line.strip().endswith('}'):
-            try:
-                import json
-                json_obj = json.loads(line)
-                json_str = json.dumps(json_obj, indent=2)
-                return (
-                    f'<div style="margin: 8px 15px; padding: 12px; background-color: #1e1e1e; '
-                    f'border-radius: 6px; font-family: monospace; white-space: pre-wrap; '
-                    f'font-size: 13px; overflow: auto; max-height: 400px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">{json_str}</div>'
-                )
-            except:
-                pass
+            return f'<div class="ao-stats"><i>{host}</i>{stats}</div>'
         
-        # Formato padrão para outras linhas
-        return (
-            '<div style="color: #d4d4d4; margin: 4px 0 4px 20px; '
-            'padding: 2px 0; font-family: monospace;">'
-            f'{line.strip()}</div>'
-        )
+        json_str = AnsibleOutputFormatter._format_json(line)
+        if json_str is not None:
+            return f'<pre class="ao-json">{json_str}</pre>'
         
-    
+        return f'<div class="ao-line">{escape(line, quote=False)}</div>'
     
     @staticmethod
     def get_css():
@@ -1380,21 +1465,47 @@ class AnsibleOutputFormatter:
                 <meta charset="UTF-8">
                 <meta name="viewport" content="width=device-width, initial-scale=1.0">
                 <title>Saída do Ansible</title>
+                <link rel="stylesheet" href="{{ url_for('static', filename='css/ansible/job-output.css') }}">
             </head>
             <body style="background-color: #1e1e1e; margin: 0; padding: 20px;">
                 {{ html|safe }}
                 
                 <script>
-                    // Se o status ainda for "running", recarregar a página a cada 5 segundos
-                    {% if status == 'running' %}
-                    setTimeout(function() {
-                        window.location.reload();
-                    }, 5000);
+                    // Enquanto o job estiver em execução, acompanha a saída pelo stream (SSE)
+                    // e recarrega a página uma única vez ao final para montar o resumo
+                    {% if status in ('queued', 'running') %}
+                    (function() {
+                        var url = '/api/stream/' + encodeURIComponent({{ job_id|tojson }}) + '?since={{ cursor|int }}';
+                        var rawOutput = document.querySelector('.ansible-raw-output');
+                        var progressBar = document.querySelector('.ansible-progress-bar');
+                        var source = new EventSource(url);
+                        source.addEventListener('output', function(e) {
+                            var data = JSON.parse(e.data);
+                            if (rawOutput) {
+                                rawOutput.insertAdjacentHTML('beforeend', data.output);
+                                rawOutput.scrollTop = rawOutput.scrollHeight;
+                            }
+                        });
+                        source.addEventListener('progress', function(e) {
+                            var data = JSON.parse(e.data);
+                            if (progressBar) progressBar.style.width = (data.progress || 0) + '%';
+                        });
+                        source.addEventListener('end', function() {
+                            source.close();
+                            window.location.reload();
+                        });
+                        source.onerror = function() {
+                            // Sem suporte a stream (ou conexão perdida): volta ao recarregamento periódico
+                            if (source.readyState === EventSource.CLOSED) {
+                                setTimeout(function() { window.location.reload(); }, 5000);
+                            }
+                        };
+                    })();
                     {% endif %}
                 </script>
             </body>
             </html>
-            ''', html=html, status=formatter.status)
+            ''', html=html, status=formatter.status, job_id=job_id, cursor=status_data.get('cursor', 0))
                         
                                 
                                 
@@ -1660,340 +1771,2697 @@ def ensure_directory_structure():
 # Inicializa a estrutura de diretórios
 ensure_directory_structure()
 
-# Classe AnsibleManager
-# Classe AnsibleManager
-class AnsibleManager:
-    def __init__(self):
-        self.base_path = Path(__file__).parent
-        # Altere o caminho do inventário para usar inventory.yml
-        self.inventory_path = self.base_path / "inventory" / "inventory.yml"
-        self.playbook_path = self.base_path / "playbooks"
-        self.arquivos_path = self.base_path / "arquivos"
-        self.running_playbooks = {}
-        
-        self.inventory_path.parent.mkdir(parents=True, exist_ok=True)
-        self.playbook_path.mkdir(parents=True, exist_ok=True)
-        self.arquivos_path.mkdir(parents=True, exist_ok=True)
+class InventoryModel:
+    """
+    Modelo do inventário em memória, compartilhado e thread-safe.
+    O inventory.yml (e os arquivos de group_vars) é lido uma única vez e só volta a ser
+    analisado quando o mtime/tamanho de algum arquivo muda e o hash do conteúdo difere.
+    Mantém índices por nome, grupo e sistema operacional para consultas rápidas.
+    """
+    
+    # Variáveis sensíveis que nunca são expostas em "vars"
+    SECRET_VARS = {'ansible_password', 'ansible_ssh_pass', 'ansible_become_pass'}
+    
+    def __init__(self, inventory_path: Path, group_vars_dir: Path):
+        self.inventory_path = Path(inventory_path)
+        self.group_vars_dir = Path(group_vars_dir)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._signature = None
+        self._content_hash = None
+        self._hosts = {}
+        self._by_group = {}
+        self._by_os = {}
+    
+    def _source_files(self) -> list:
+        files = [self.inventory_path]
+        if self.group_vars_dir.is_dir():
+            files += sorted(self.group_vars_dir.glob('*.yml'))
+        return files
+    
+    def _file_signature(self) -> tuple:
+        """Assinatura barata (caminho, mtime, tamanho) dos arquivos de origem"""
+        signature = []
+        for path in self._source_files():
+            try:
+                st = path.stat()
+                signature.append((str(path), st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                continue
+        return tuple(signature)
+    
+    def invalidate(self):
+        """Força a verificação do conteúdo na próxima consulta"""
+        with self._lock:
+            self._signature = None
+    
+    @property
+    def content_hash(self) -> str:
+        """Hash do conteúdo atual do inventário (o mesmo em todos os processos)"""
+        self._ensure_fresh()
+        return self._content_hash
+    
+    def _ensure_fresh(self):
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            
+            contents = {}
+            digest = hashlib.sha256()
+            for path_str, _, _ in signature:
+                data = Path(path_str).read_bytes()
+                contents[path_str] = data
+                digest.update(path_str.encode('utf-8'))
+                digest.update(data)
+            content_hash = digest.hexdigest()
+            
+            if content_hash != self._content_hash:
+                self._rebuild(contents)
+                self._content_hash = content_hash
+                self.version += 1
+                logger.info(f"Inventário carregado: {len(self._hosts)} host(s) (versão {self.version})")
+            self._signature = signature
+    
+    def _rebuild(self, contents: dict):
+        """Reconstrói hosts e índices a partir do conteúdo dos arquivos"""
+        inventory_data = {}
+        raw_inventory = contents.get(str(self.inventory_path))
+        if raw_inventory:
+            inventory_data = yaml.safe_load(raw_inventory) or {}
+        
+        # Como no Ansible, só os arquivos com o nome de um grupo existente são usados
+        raw_group_vars = {
+            Path(path_str).stem: (path_str, data)
+            for path_str, data in contents.items()
+            if path_str != str(self.inventory_path)
+        }
         
-        for os_type in ["windows", "linux"]:
-            (self.playbook_path / os_type).mkdir(exist_ok=True)
-            (self.arquivos_path / os_type).mkdir(exist_ok=True)
-            for category in ["agents", "security", "baseline", "config"]:
-                (self.playbook_path / os_type / category).mkdir(exist_ok=True)
+        def load_group_vars(group_name):
+            if group_name not in raw_group_vars:
+                return {}
+            path_str, data = raw_group_vars[group_name]
+            try:
+                return yaml.safe_load(data) or {}
+            except yaml.YAMLError as e:
+                logger.error(f"Erro ao ler group_vars {path_str}: {str(e)}")
+                return {}
         
-        # Criar playbooks específicos para coletar fatos
-        self.create_linux_facts_playbook()
-        self.create_windows_facts_playbook()
+        # host -> lista de (profundidade, grupo, vars do grupo)
+        memberships = {}
+        host_vars = {}
+        
+        def walk(group_name, group_data, depth):
+            """Percorre um grupo e retorna todos os hosts dele e dos seus filhos"""
+            group_data = group_data or {}
+            group_vars = dict(group_data.get('vars') or {})
+            group_vars.update(load_group_vars(group_name))
+            # dict usado como conjunto ordenado para preservar a ordem do arquivo
+            members = {}
+            for hostname, vars_ in (group_data.get('hosts') or {}).items():
+                hostname = str(hostname)
+                members[hostname] = True
+                host_vars.setdefault(hostname, {}).update(vars_ or {})
+            for child_name, child_data in (group_data.get('children') or {}).items():
+                members.update(walk(child_name, child_data, depth + 1))
+            for hostname in members:
+                memberships.setdefault(hostname, []).append((depth, group_name, group_vars))
+            return members
+        
+        for root_name, root_data in inventory_data.items():
+            walk(root_name, root_data, 0)
+        
+        hosts, by_group, by_os = {}, {}, {}
+        for hostname, groups in memberships.items():
+            merged = {}
+            # Mesma precedência do Ansible: grupos mais rasos primeiro, depois as vars do host
+            for _, _, vars_ in sorted(groups, key=lambda g: (g[0], g[1])):
+                merged.update(vars_)
+            merged.update(host_vars.get(hostname, {}))
+            
+            ansible_vars = {
+                k: v for k, v in merged.items()
+                if k.startswith('ansible_') and k not in self.SECRET_VARS
+            }
+            connection = ansible_vars.get("ansible_connection", "ssh")
+            group_names = sorted({g for _, g, _ in groups if g != 'all'})
+            os_type = "windows" if connection == "winrm" or "windows" in group_names else "linux"
+            
+            hosts[hostname] = {
+                "name": hostname,
+                "connection": connection,
+                "host": ansible_vars.get("ansible_host", hostname),
+                "user": ansible_vars.get("ansible_user", ""),
+                "vars": ansible_vars,
+                "groups": group_names,
+                "os_type": os_type,
+                "os_distribution": merged.get("os_distribution", ""),
+                "os_version": str(merged.get("os_version", ""))
+            }
+            for group_name in group_names:
+                by_group.setdefault(group_name, []).append(hostname)
+            by_os.setdefault(os_type, []).append(hostname)
+            if hosts[hostname]["os_distribution"]:
+                by_os.setdefault(f"{os_type}:{hosts[hostname]['os_distribution']}", []).append(hostname)
         
-        logger.info(f"Inicializado com inventory_path: {self.inventory_path}")
-        logger.info(f"Inicializado com playbook_path: {self.playbook_path}")
-        logger.info(f"Inicializado com arquivos_path: {self.arquivos_path}")
+        self._hosts, self._by_group, self._by_os = hosts, by_group, by_os
     
-    def _update_execution_status(self, job_id: str, line: str, formatted_line: str):
-        if job_id not in self.running_playbooks:
-            return
-        playbook = self.running_playbooks[job_id]
-        playbook["output"] += formatted_line
-        if "TASK" in line:
-            playbook["progress"] = min(95, playbook["progress"] + 5)
-        elif "PLAY RECAP" in line:
-            playbook["progress"] = 100
-            if "failed=0" in line and "unreachable=0" in line:
-                playbook["status"] = "completed"
-            else:
-                playbook["status"] = "failed"
+    def hosts(self) -> dict:
+        """Todos os hosts (hostname -> info). Os dicionários retornados não devem ser alterados."""
+        self._ensure_fresh()
+        with self._lock:
+            return dict(self._hosts)
+    
+    def get(self, hostname: str) -> dict:
+        """Informações de um host ou None"""
+        self._ensure_fresh()
+        with self._lock:
+            return self._hosts.get(hostname)
+    
+    def hosts_in_group(self, group: str) -> list:
+        """Nomes dos hosts de um grupo"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._by_group.get(group, []))
+    
+    def hosts_by_os(self, os_type: str, distribution: str = None) -> list:
+        """Nomes dos hosts de um sistema operacional (e opcionalmente de uma distribuição)"""
+        self._ensure_fresh()
+        key = f"{os_type}:{distribution}" if distribution else os_type
+        with self._lock:
+            return list(self._by_os.get(key, []))
 
 
-    def create_linux_facts_playbook(self):
-        """Cria playbook para coleta de fatos de hosts Linux"""
-        playbook_path = self.playbook_path / "gather_facts_linux.yml"
-        
-        if playbook_path.exists():
-            return
-            
-        logger.info(f"Criando playbook gather_facts_linux.yml")
-        content = """---
-    - name: Coletar Informações do Host Linux
-    hosts: all
-    gather_facts: yes
-    become: no
-    
-    tasks:
-        - name: Coletar informações básicas do sistema
-        set_fact:
-            system_info: "{{ ansible_distribution }} {{ ansible_distribution_version }}{% if ansible_os_family == 'Debian' %} (Debian){% elif ansible_os_family == 'RedHat' %} (RedHat){% endif %}"
-
-        - name: Formatar informações do sistema
-        set_fact:
-            formatted_info:
-            hostname: "{{ ansible_hostname }}"
-            private_ip: "{{ ansible_default_ipv4.address | default('N/A') }}"
-            system: "{{ system_info }}"
-
-        - name: Obter IP Público
-        uri:
-            url: https://api.ipify.org?format=json
-            return_content: yes
-        register: public_ip_response
-        ignore_errors: yes
-
-        - name: Criar JSON com informações
-        set_fact:
-            host_details:
-            hostname: "{{ formatted_info.hostname }}"
-            private_ip: "{{ formatted_info.private_ip }}"
-            public_ip: "{{ public_ip_response.json.ip | default('N/A') }}"
-            system: "{{ formatted_info.system }}"
-
-        - name: Debug informações coletadas
-        debug:
-            var: host_details
+class PlaybookCatalog:
     """
-        with open(playbook_path, 'w') as f:
-            f.write(content)
-            
-            
-
-    def create_windows_facts_playbook(self):
-        """Cria playbook para coleta de fatos de hosts Windows"""
-        playbook_path = self.playbook_path / "gather_facts_windows.yml"
-        
-        if playbook_path.exists():
-            # Remover o playbook existente para garantir que ele seja recriado corretamente
-            os.remove(playbook_path)
-            
-        logger.info(f"Criando playbook gather_facts_windows.yml")
-        content = """---
-    - name: Coletar Informações do Host Windows
-    hosts: all
-    gather_facts: yes
-    vars:
-        ansible_connection: winrm
-        ansible_winrm_transport: ntlm
-        ansible_winrm_server_cert_validation: ignore
-    
-    tasks:
-        - name: Coletar informações básicas do sistema Windows
-        set_fact:
-            system_info: "{{ ansible_distribution }} {{ ansible_distribution_version | default('') }}"
-
-        - name: Formatar informações do sistema Windows
-        set_fact:
-            formatted_info:
-            hostname: "{{ ansible_hostname }}"
-            private_ip: "{{ ansible_ip_addresses[0] | default('N/A') }}"
-            system: "{{ system_info }}"
-
-        - name: Obter IP Público Windows
-        win_uri:
-            url: https://api.ipify.org?format=json
-            return_content: yes
-        register: public_ip_response
-        ignore_errors: yes
-
-        - name: Definir IP público alternativo
-        set_fact:
-            public_ip_alt: "{{ inventory_hostname }}"
-        when: not public_ip_response.status_code is defined or public_ip_response.status_code != 200
-        
-        - name: Criar JSON com informações Windows
-        set_fact:
-            host_details:
-            hostname: "{{ formatted_info.hostname }}"
-            private_ip: "{{ formatted_info.private_ip | default(inventory_hostname) }}"
-            public_ip: "{{ public_ip_response.json.ip | default(public_ip_alt) | default(inventory_hostname) }}"
-            system: "{{ formatted_info.system | default('Windows Server') }}"
-
-        - name: Debug informações coletadas Windows
-        debug:
-            var: host_details
-            verbosity: 0
+    Índice persistente do catálogo de playbooks.
+    Cada arquivo é identificado por (caminho, mtime, tamanho): só arquivos novos ou alterados
+    são analisados de novo, e o índice é salvo em disco para sobreviver a reinicializações.
+    Uma thread de varredura periódica (polling) mantém o catálogo atualizado.
     """
-        with open(playbook_path, 'w') as f:
-            f.write(content)      
-
-    def get_execution_status(self, job_id: str) -> dict:
-        if job_id not in self.running_playbooks:
-            return {"status": "not_found", "output": "", "progress": 0}
-        return self.running_playbooks[job_id]
     
-    def gather_host_facts(self, hostname: str) -> dict:
+    FOLDER_TO_CATEGORY = {
+        "agents": "agentes",
+        "baseline": "baseline",
+        "config": "configuracoes",
+        "security": "seguranca"
+    }
+    IGNORED_FILES = {"gather_facts.yml", "README.md"}
+    
+    def __init__(self, playbook_path: Path, index_path: str, extract_metadata,
+                 poll_interval: float = CATALOG_POLL_INTERVAL):
+        """
+        Args:
+            playbook_path (Path): Diretório raiz dos playbooks
+            index_path (str): Arquivo JSON onde o índice é persistido
+            extract_metadata (callable): Função (arquivo, os_padrão, categoria_padrão) -> metadados
+            poll_interval (float): Intervalo da varredura em segundos (0 desativa a thread)
+        """
+        self.playbook_path = Path(playbook_path)
+        self.index_path = index_path
+        self.extract_metadata = extract_metadata
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._digest = None
+        self._entries = {}
+        self._playbooks = []
+        self._lock = threading.RLock()
+        self._scanned = False
+        self._thread = None
+        self._load()
+    
+    def _load(self):
+        """Carrega o índice do disco, se existir"""
         try:
-            job_id = f"gather_facts_{hostname}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            logger.info(f"Iniciando coleta de fatos para {hostname} (Job ID: {job_id})")
-            
-            # Determinar se o host é Windows ou Linux
-            inventory_yaml_path = self.base_path / "inventory" / "inventory.yml"
-            is_windows = False
-            
-            if inventory_yaml_path.exists():
-                with open(inventory_yaml_path, 'r') as f:
-                    inventory_data = yaml.safe_load(f)
-                    
-                if 'all' in inventory_data and 'children' in inventory_data['all']:
-                    if 'windows' in inventory_data['all']['children'] and 'hosts' in inventory_data['all']['children']['windows']:
-                        if hostname in inventory_data['all']['children']['windows']['hosts']:
-                            is_windows = True
-            
-            # Sempre recriar os playbooks para garantir que estejam atualizados e corretamente formatados
-            if is_windows:
-                self.create_windows_facts_playbook()
-                gather_facts_path = self.playbook_path / "gather_facts_windows.yml"
-                
-                # Configurações específicas para Windows
-                ansible_opts = [
-                    '-e', 'ansible_winrm_transport=ntlm',
-                    '-e', 'ansible_winrm_server_cert_validation=ignore'
-                ]
-                system_type = "Windows Server"
-            else:
-                self.create_linux_facts_playbook()
-                gather_facts_path = self.playbook_path / "gather_facts_linux.yml"
-                ansible_opts = []
-                system_type = "Linux"
-            
-            # Adicionar verbosidade para ajudar na depuração
-                    
-            ansible_playbook_path = "ansible-playbook"
-            cmd = [
-                ansible_playbook_path,
-                str(gather_facts_path),
-                '-i', str(self.inventory_path),
-                '--limit', hostname
-            ] + ansible_opts
-            
-            logger.info(f"Executando comando: {' '.join(cmd)}")
-            
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
-            stdout, _ = process.communicate()
-            
-            # Registrar a saída completa para depuração
-            logger.debug(f"Saída completa do playbook para {hostname}:\n{stdout}")
-            
-            # Nova abordagem: Procurar pelo bloco de facts delimitado
-            facts_match = re.search(r'FACTS_BEGIN\s*(.*?)\s*FACTS_END', stdout, re.DOTALL)
-            if facts_match:
-                facts_block = facts_match.group(1)
-                host_details = {}
-                
-                # Extrair cada linha de propriedade do bloco
-                for line in facts_block.strip().split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        host_details[key.strip()] = value.strip()
-                
-                if all(k in host_details for k in ['hostname', 'public_ip', 'private_ip', 'system']):
-                    logger.info(f"Fatos extraídos com sucesso para {hostname}: {host_details}")
-                    return host_details
-            
-            # Se a nova abordagem falhar, tentamos as anteriores
-            
-            # Tentar encontrar o bloco JSON nos resultados
-            host_details_output = re.findall(r'TASK \[Debug informações coletadas.*?\].*?\n.*?({.*?})', stdout, re.DOTALL)
-            if host_details_output:
-                debug_output = host_details_output[-1]  # Pegar o último resultado que encontramos
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r') as f:
+                    self._entries = json.load(f).get('files', {})
+                logger.info(f"Índice de playbooks carregado com {len(self._entries)} arquivo(s)")
+        except Exception as e:
+            logger.error(f"Erro ao carregar índice de playbooks: {str(e)}")
+            self._entries = {}
+    
+    def _save(self):
+        """Grava o índice no disco de forma atômica"""
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            data = json.dumps({'files': self._entries}, indent=2)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.index_path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar índice de playbooks: {str(e)}")
+    
+    def _iter_files(self):
+        """Percorre playbooks/<linux|windows>/<sistema>/<categoria>/*.yml"""
+        for default_os in ("linux", "windows"):
+            os_root = self.playbook_path / default_os
+            if not os_root.is_dir():
+                continue
+            for os_dir in os_root.iterdir():
+                if not os_dir.is_dir():
+                    continue
+                for category_dir in os_dir.iterdir():
+                    if not category_dir.is_dir() or category_dir.name not in self.FOLDER_TO_CATEGORY:
+                        continue
+                    ui_category = self.FOLDER_TO_CATEGORY[category_dir.name]
+                    for file in category_dir.glob("*.yml"):
+                        if file.name not in self.IGNORED_FILES:
+                            yield file, default_os, ui_category
+    
+    def scan(self) -> bool:
+        """
+        Sincroniza o índice com o sistema de arquivos.
+        
+        Returns:
+            bool: True se o catálogo mudou
+        """
+        with self._lock:
+            entries = {}
+            parsed = 0
+            for file, default_os, ui_category in self._iter_files():
                 try:
-                    # Limpar a saída para facilitar o parsing
-                    cleaned_output = re.sub(r'ok:.*?\=>\s*', '', debug_output)
-                    cleaned_output = cleaned_output.strip()
-                    logger.debug(f"Tentando parsear JSON: {cleaned_output}")
-                    host_details = json.loads(cleaned_output)
-                    
-                    # Verificar se temos todos os campos esperados
-                    if all(k in host_details for k in ['hostname', 'public_ip', 'private_ip', 'system']):
-                        logger.info(f"Fatos extraídos com sucesso para {hostname}: {host_details}")
-                        return host_details
-                except Exception as e:
-                    logger.error(f"Erro ao parsear saída do Ansible para {hostname}: {str(e)}")
-            
-            # Método alternativo - procurar a variável host_details no YAML
-            json_match = re.search(r'{\s*"host_details":\s*({[^}]*})', stdout)
-            if json_match:
+                    st = file.stat()
+                except FileNotFoundError:
+                    continue
+                key = str(file)
+                cached = self._entries.get(key)
+                if (cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size
+                        and cached['default_os'] == default_os and cached['default_category'] == ui_category):
+                    entries[key] = cached
+                    continue
                 try:
-                    json_str = "{" + json_match.group(1) + "}"
-                    data = json.loads(json_str)
-                    logger.info(f"Fatos extraídos via regex JSON para {hostname}: {data}")
-                    return data
-                except json.JSONDecodeError as e:
-                    logger.error(f"Erro decodificando JSON: {e}")
-            
-            # Extração de campos específicos via regex se o JSON completo falhar
-            hostname_match = re.search(r'"hostname":\s*"([^"]+)"', stdout)
-            public_ip_match = re.search(r'"public_ip":\s*"([^"]+)"', stdout)
-            private_ip_match = re.search(r'"private_ip":\s*"([^"]+)"', stdout)
-            system_match = re.search(r'"system":\s*"([^"]+)"', stdout)
-            
-            # Verificar se temos pelo menos algumas informações
-            if hostname_match or public_ip_match or private_ip_match or system_match:
-                host_details = {
-                    "hostname": hostname_match.group(1) if hostname_match else hostname,
-                    "public_ip": public_ip_match.group(1) if public_ip_match else hostname,
-                    "private_ip": private_ip_match.group(1) if private_ip_match else hostname,
-                    "system": system_match.group(1) if system_match else system_type
+                    meta = self.extract_metadata(file, default_os=default_os, default_category=ui_category)
+                except Exception as e:
+                    logger.error(f"Erro ao processar playbook {file.name}: {str(e)}", exc_info=True)
+                    continue
+                entries[key] = {
+                    'mtime_ns': st.st_mtime_ns,
+                    'size': st.st_size,
+                    'default_os': default_os,
+                    'default_category': ui_category,
+                    'meta': meta
                 }
-                
-                logger.info(f"Fatos extraídos via regex para {hostname}: {host_details}")
-                return host_details
-            
-            # Fallback para valores básicos
-            basic_details = {
-                "hostname": hostname,
-                "public_ip": hostname,
-                "private_ip": hostname,
-                "system": system_type
-            }
-            
-            logger.warning(f"Usando informações básicas para {hostname}: {basic_details}")
-            return basic_details
-            
-        except Exception as e:
-            logger.error(f"Erro ao coletar fatos do host {hostname}: {str(e)}", exc_info=True)
-            return {
-                "hostname": hostname,
-                "public_ip": hostname,
-                "private_ip": hostname,
-                "system": "Windows Server" if is_windows else "Linux"
-            }
-
-    def create_gather_facts_playbook(self, playbook_path):
-        """Cria playbook para coleta de fatos"""
-        logger.info(f"Criando playbook gather_facts.yml em {playbook_path}")
-        content = """---
-- name: Coletar Informações do Host
-  hosts: all
-  gather_facts: yes
-  become: no
-  
-  tasks:
-    - name: Coletar informações básicas do sistema
-      set_fact:
-        system_info: "{{ ansible_distribution }} {{ ansible_distribution_version }}{% if ansible_os_family == 'Debian' %} (Debian){% elif ansible_os_family == 'RedHat' %} (RedHat){% endif %}"
-
-    - name: Formatar informações do sistema
-      set_fact:
-        formatted_info:
-          hostname: "{{ ansible_hostname }}"
-          private_ip: "{{ ansible_default_ipv4.address | default('N/A') }}"
-          system: "{{ system_info }}"
-
-    - name: Obter IP Público
-      uri:
-        url: https://api.ipify.org?format=json
-        return_content: yes
-      register: public_ip_response
-      ignore_errors: yes
+                parsed += 1
+            
+            changed = parsed > 0 or entries.keys() != self._entries.keys()
+            if changed or not self._scanned:
+                self._entries = entries
+                self._playbooks = sorted((entry['meta'] for entry in entries.values()), key=lambda x: x["name"])
+                self._digest = hashlib.sha256(json.dumps(sorted(
+                    (key, entry['mtime_ns'], entry['size'], entry['default_os'], entry['default_category'])
+                    for key, entry in entries.items()
+                )).encode('utf-8')).hexdigest()
+                self._scanned = True
+            if changed:
+                self.version += 1
+                self._save()
+                logger.info(f"Catálogo de playbooks atualizado: {len(entries)} playbook(s), "
+                            f"{parsed} analisado(s) (versão {self.version})")
+            return changed
+    
+    @property
+    def digest(self) -> str:
+        """Hash do estado indexado (arquivos, mtime e tamanho), o mesmo em todos os processos"""
+        if not self._scanned:
+            self.scan()
+        return self._digest
+    
+    def start(self):
+        """Inicia a thread de varredura periódica (apenas uma vez)"""
+        if self.poll_interval <= 0:
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._watch_loop, name="playbook-catalog-watcher", daemon=True)
+            self._thread.start()
+        logger.info("Thread de varredura do catálogo de playbooks iniciada")
+    
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"Erro na varredura do catálogo de playbooks: {str(e)}", exc_info=True)
+    
+    def list(self, os_type: str = None, category: str = None, name: str = None) -> list:
+        """
+        Playbooks do catálogo, opcionalmente filtrados.
+        Sem a thread de varredura, cada consulta faz uma varredura (apenas stat dos arquivos).
+        
+        Args:
+            os_type (str): Sistema operacional ("linux", "windows"); playbooks "all" sempre entram
+            category (str): Categoria da interface (ex.: "agentes", "seguranca")
+            name (str): Trecho do nome ou da descrição (sem diferenciar maiúsculas)
+        """
+        if not self._scanned or not (self._thread and self._thread.is_alive()):
+            self.scan()
+        self.start()
+        
+        with self._lock:
+            playbooks = self._playbooks
+        
+        if os_type:
+            os_type = os_type.lower()
+            playbooks = [p for p in playbooks if str(p.get("os", "")).lower() in (os_type, "all")]
+        if category:
+            category = category.lower()
+            playbooks = [p for p in playbooks if str(p.get("category", "")).lower() == category]
+        if name:
+            name = name.lower()
+            playbooks = [
+                p for p in playbooks
+                if name in p.get("name", "").lower() or name in str(p.get("description", "")).lower()
+            ]
+        return list(playbooks)
 
-    - name: Criar JSON com informações
-      set_fact:
-        host_details:
-          hostname: "{{ formatted_info.hostname }}"
-          private_ip: "{{ formatted_info.private_ip }}"
-          public_ip: "{{ public_ip_response.json.ip | default('N/A') }}"
-          system: "{{ formatted_info.system }}"
 
-    - name: Debug informações coletadas
-      debug:
-        var: host_details
+class PlaybookPlanCache:
+    """
+    Plano de execução de cada playbook (plays, tarefas e padrões de hosts), extraído do
+    YAML sem executar o Ansible. O plano fica em cache pelo hash do conteúdo do playbook e
+    de todos os arquivos que ele inclui; enquanto nenhum desses arquivos muda (mtime e
+    tamanho), o plano é servido direto da memória.
+    """
+    
+    # Inclusões de tarefas: as estáticas (import_*) não geram um evento próprio
+    STATIC_INCLUDES = {"import_tasks", "ansible.builtin.import_tasks"}
+    DYNAMIC_INCLUDES = {"include_tasks", "ansible.builtin.include_tasks", "include", "ansible.builtin.include"}
+    ROLE_INCLUDES = {"import_role", "ansible.builtin.import_role", "include_role", "ansible.builtin.include_role"}
+    PLAYBOOK_IMPORTS = {"import_playbook", "ansible.builtin.import_playbook"}
+    # Palavras-chave de tarefa que não são o módulo executado
+    TASK_KEYWORDS = {
+        "name", "when", "register", "loop", "with_items", "with_dict", "with_fileglob", "loop_control",
+        "become", "become_user", "become_method", "ignore_errors", "changed_when", "failed_when",
+        "notify", "tags", "vars", "delegate_to", "run_once", "until", "retries", "delay", "args",
+        "environment", "no_log", "check_mode", "async", "poll", "timeout", "any_errors_fatal"
+    }
+    
+    def __init__(self, cache_path: str, roles_path: Path = None, max_entries: int = 500):
+        """
+        Args:
+            cache_path (str): Arquivo JSON onde os planos são persistidos
+            roles_path (Path): Diretório adicional de roles (além de <playbook>/roles)
+            max_entries (int): Quantidade máxima de playbooks mantidos
+        """
+        self.cache_path = cache_path
+        self.roles_path = Path(roles_path) if roles_path else None
+        self.max_entries = max_entries
+        self._plans = {}
+        self._files = {}
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        """Carrega os planos do disco, se existirem"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r') as f:
+                    data = json.load(f)
+                self._plans = data.get('plans', {})
+                self._files = data.get('files', {})
+                self._prune()
+                logger.info(f"Cache de planos carregado com {len(self._plans)} plano(s)")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de planos: {str(e)}")
+            self._plans, self._files = {}, {}
+    
+    def _save(self):
+        """Grava os planos no disco de forma atômica"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            data = json.dumps({'plans': self._plans, 'files': self._files})
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de planos: {str(e)}")
+    
+    def _prune(self):
+        """Descarta os playbooks mais antigos além de max_entries e os planos sem playbook"""
+        while len(self._files) > self.max_entries:
+            # _files fica em ordem de atualização (ver get)
+            del self._files[next(iter(self._files))]
+        referenced = {entry["hash"] for entry in self._files.values()}
+        for plan_hash in [h for h in self._plans if h not in referenced]:
+            del self._plans[plan_hash]
+    
+    @staticmethod
+    def _signature(paths: list) -> list:
+        """(caminho, mtime, tamanho) de cada arquivo; None para arquivos ausentes"""
+        signature = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                signature.append([path, st.st_mtime_ns, st.st_size])
+            except OSError:
+                signature.append([path, None, None])
+        return signature
+    
+    def get(self, playbook_path: str) -> dict:
+        """
+        Plano de execução de um playbook.
+        
+        Returns:
+            dict: {"hash", "plays": [{"name", "hosts", "tasks": [...]}], "task_count", "files", "errors", "warnings"}
+        """
+        playbook_path = os.path.abspath(playbook_path)
+        with self._lock:
+            cached = self._files.get(playbook_path)
+            if cached and cached["hash"] in self._plans and self._signature(
+                    [entry[0] for entry in cached["signature"]]) == cached["signature"]:
+                return self._plans[cached["hash"]]
+        
+        contents = {}
+        plan = self._build(playbook_path, contents)
+        digest = hashlib.sha256()
+        for path in sorted(contents):
+            digest.update(path.encode('utf-8'))
+            digest.update(contents[path] or b'')
+        plan["hash"] = digest.hexdigest()
+        plan["files"] = sorted(contents)
+        
+        with self._lock:
+            # Conteúdo idêntico (ex.: arquivo apenas "tocado") reaproveita o plano existente
+            plan = self._plans.setdefault(plan["hash"], plan)
+            # Reinsere no fim: o plano anterior deste playbook (hash antigo) sai no _prune
+            self._files.pop(playbook_path, None)
+            self._files[playbook_path] = {"hash": plan["hash"], "signature": self._signature(sorted(contents))}
+            self._prune()
+            self._save()
+        logger.info(f"Plano de {os.path.basename(playbook_path)}: {plan['task_count']} tarefa(s) em {len(plan['plays'])} play(s)")
+        return plan
+    
+    def _read_yaml(self, path: str, contents: dict, problems: list):
+        """Lê um arquivo YAML registrando o conteúdo (para o hash) e eventuais problemas"""
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            contents[path] = None
+            problems.append(f"Arquivo não encontrado: {path} ({e.strerror})")
+            return None
+        contents[path] = raw
+        try:
+            return yaml.safe_load(raw)
+        except yaml.YAMLError as e:
+            problems.append(f"YAML inválido em {path}: {str(e)}")
+            return None
+    
+    def _build(self, playbook_path: str, contents: dict) -> dict:
+        # errors impedem a execução; warnings são inclusões que o plano não conseguiu resolver
+        report = {"errors": [], "warnings": []}
+        plays = []
+        self._collect_plays(playbook_path, contents, plays, report, depth=0)
+        if not plays and not report["errors"]:
+            report["errors"].append("Playbook não contém uma seção 'hosts' válida")
+        return {
+            "plays": plays,
+            "task_count": sum(len(play["tasks"]) for play in plays),
+            "errors": report["errors"],
+            "warnings": report["warnings"]
+        }
+    
+    def _collect_plays(self, path: str, contents: dict, plays: list, report: dict, depth: int):
+        problems = report["errors"] if depth == 0 else report["warnings"]
+        data = self._read_yaml(path, contents, problems)
+        if data is None:
+            return
+        if not isinstance(data, list):
+            problems.append("Formato de playbook inválido" if depth == 0 else f"Formato de playbook inválido: {path}")
+            return
+        base_dir = os.path.dirname(path)
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            imported = next((item[k] for k in self.PLAYBOOK_IMPORTS if k in item), None)
+            if imported is not None:
+                if depth < 10 and isinstance(imported, str) and '{{' not in imported:
+                    self._collect_plays(os.path.join(base_dir, imported), contents, plays, report, depth + 1)
+                continue
+            if 'hosts' not in item:
+                continue
+            # vars_files entram no hash do plano (e da validação), mesmo sem gerar tarefas
+            vars_files = item.get('vars_files') or []
+            for vars_file in vars_files if isinstance(vars_files, list) else [vars_files]:
+                if isinstance(vars_file, str) and '{{' not in vars_file:
+                    self._read_yaml(os.path.join(base_dir, vars_file), contents, report["warnings"])
+            tasks = []
+            gather = item.get('gather_facts', True)
+            if str(gather).lower() not in ('false', 'no', '0'):
+                tasks.append({"name": "Gathering Facts", "action": "gather_facts"})
+            # Mesma ordem do Ansible: pre_tasks, roles, tasks, post_tasks
+            self._collect_tasks(item.get('pre_tasks'), base_dir, contents, tasks, report, 0)
+            for role in item.get('roles') or []:
+                role_name = (role.get('role') or role.get('name')) if isinstance(role, dict) else role
+                self._collect_role(role_name, base_dir, contents, tasks, report, 0)
+            for section in ('tasks', 'post_tasks'):
+                self._collect_tasks(item.get(section), base_dir, contents, tasks, report, 0)
+            plays.append({
+                "name": item.get('name') or str(item['hosts']),
+                "hosts": str(item['hosts']),
+                "tasks": tasks
+            })
+    
+    def _collect_role(self, role_name, base_dir: str, contents: dict, tasks: list, report: dict, depth: int):
+        if not isinstance(role_name, str) or '{{' in role_name:
+            return
+        candidates = [os.path.join(base_dir, 'roles', role_name)]
+        if self.roles_path:
+            candidates.append(str(self.roles_path / role_name))
+        for role_dir in candidates:
+            for main in ('main.yml', 'main.yaml'):
+                main_path = os.path.join(role_dir, 'tasks', main)
+                if os.path.exists(main_path):
+                    for vars_dir in ('defaults', 'vars', 'handlers'):
+                        vars_path = os.path.join(role_dir, vars_dir, main)
+                        if os.path.exists(vars_path):
+                            self._read_yaml(vars_path, contents, report["warnings"])
+                        else:
+                            # Ausente também entra na assinatura: criá-lo invalida o plano
+                            contents.setdefault(vars_path, None)
+                    # Dependências declaradas em meta/ executam antes das tarefas da role
+                    meta_path = os.path.join(role_dir, 'meta', main)
+                    meta = None
+                    if os.path.exists(meta_path):
+                        meta = self._read_yaml(meta_path, contents, report["warnings"])
+                    else:
+                        contents.setdefault(meta_path, None)
+                    dependencies = meta.get('dependencies') if isinstance(meta, dict) else None
+                    if isinstance(dependencies, list) and depth < 10:
+                        for dependency in dependencies:
+                            if isinstance(dependency, dict):
+                                dependency = dependency.get('role') or dependency.get('name')
+                            self._collect_role(dependency, base_dir, contents, tasks, report, depth + 1)
+                    self._collect_file(main_path, contents, tasks, report, depth + 1)
+                    return
+        # Os locais procurados entram na assinatura, então instalar a role invalida o plano
+        for role_dir in candidates:
+            contents.setdefault(os.path.join(role_dir, 'tasks', 'main.yml'), None)
+        report["warnings"].append(f"Role não encontrada: {role_name}")
+    
+    def _collect_file(self, path: str, contents: dict, tasks: list, report: dict, depth: int):
+        data = self._read_yaml(path, contents, report["warnings"])
+        if data is not None:
+            self._collect_tasks(data, os.path.dirname(path), contents, tasks, report, depth)
+    
+    def _collect_tasks(self, items, base_dir: str, contents: dict, tasks: list, report: dict, depth: int):
+        """Achata a lista de tarefas resolvendo blocos e inclusões com caminho literal"""
+        if not isinstance(items, list) or depth > 10:
+            return
+        for task in items:
+            if not isinstance(task, dict):
+                continue
+            if 'block' in task:
+                # rescue só roda em caso de falha; always roda sempre
+                self._collect_tasks(task.get('block'), base_dir, contents, tasks, report, depth + 1)
+                self._collect_tasks(task.get('always'), base_dir, contents, tasks, report, depth + 1)
+                continue
+            action = next((k for k in task if k not in self.TASK_KEYWORDS), None)
+            if action in self.ROLE_INCLUDES:
+                if action.endswith('include_role'):
+                    tasks.append({"name": task.get('name') or action, "action": action})
+                args = task[action] if isinstance(task[action], dict) else {}
+                self._collect_role(args.get('name'), base_dir, contents, tasks, report, depth)
+                continue
+            if action in self.STATIC_INCLUDES or action in self.DYNAMIC_INCLUDES:
+                if action in self.DYNAMIC_INCLUDES:
+                    tasks.append({"name": task.get('name') or action, "action": action})
+                target = task[action]
+                if isinstance(target, dict):
+                    target = target.get('file')
+                if isinstance(target, str) and '{{' not in target:
+                    self._collect_file(os.path.join(base_dir, target), contents, tasks, report, depth + 1)
+                continue
+            tasks.append({"name": task.get('name') or action or "unnamed task", "action": action})
+
+
+class ValidationCache:
+    """
+    Cache de validações que dependem de iniciar o Ansible (ansible-playbook --syntax-check,
+    ansible-inventory --list). O resultado é indexado pelo hash do conteúdo dos arquivos
+    envolvidos, da versão do Ansible e da sua configuração (ansible.cfg e caminhos de roles e
+    collections), então só é refeito quando algum deles muda. Só resultados válidos ficam em
+    cache: uma falha (role ou collection ausente, por exemplo) é verificada de novo a cada vez.
+    """
+    
+    # Variáveis de ambiente que mudam onde o Ansible procura configuração, roles e collections
+    CONFIG_ENV = ("ANSIBLE_CONFIG", "ANSIBLE_ROLES_PATH", "ANSIBLE_COLLECTIONS_PATH", "ANSIBLE_COLLECTIONS_PATHS")
+    
+    def __init__(self, cache_path: str, max_entries: int = 2000, timeout: float = 120):
+        """
+        Args:
+            cache_path (str): Arquivo JSON onde os resultados são persistidos
+            max_entries (int): Quantidade máxima de resultados mantidos
+            timeout (float): Prazo de cada comando de validação em segundos
+        """
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._results = {}
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        """Carrega os resultados do disco, se existirem"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r') as f:
+                    self._results = json.load(f).get('results', {})
+                logger.info(f"Cache de validação carregado com {len(self._results)} resultado(s)")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de validação: {str(e)}")
+            self._results = {}
+    
+    def save(self):
+        """Grava os resultados no disco de forma atômica, descartando os mais antigos"""
+        try:
+            with self._lock:
+                if len(self._results) > self.max_entries:
+                    newest = sorted(self._results.items(), key=lambda item: item[1]["checked_at"])[-self.max_entries:]
+                    self._results = dict(newest)
+                data = json.dumps({'results': self._results})
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de validação: {str(e)}")
+    
+    @classmethod
+    def config_files(cls) -> list:
+        """Arquivos ansible.cfg que o Ansible consultaria, na ordem de precedência"""
+        candidates = [os.environ.get("ANSIBLE_CONFIG"), os.path.join(os.getcwd(), "ansible.cfg"),
+                      os.path.expanduser("~/.ansible.cfg"), "/etc/ansible/ansible.cfg"]
+        return [path for path in candidates if path]
+    
+    @classmethod
+    def digest(cls, kind: str, files: list) -> str:
+        """Hash do tipo de validação, da versão e configuração do Ansible e do conteúdo de cada arquivo"""
+        digest = hashlib.sha256(f"{kind}\0{ANSIBLE_CORE_VERSION}".encode('utf-8'))
+        for name in cls.CONFIG_ENV:
+            digest.update(f"\0{name}={os.environ.get(name, '')}".encode('utf-8'))
+        for path in cls.config_files():
+            digest.update(b'\0' + path.encode('utf-8') + b'\0')
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(b'<ausente>')
+        for path in sorted(set(files)):
+            digest.update(b'\0' + path.encode('utf-8') + b'\0')
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(b'<ausente>')
+        return digest.hexdigest()
+    
+    def run(self, kind: str, files: list, command: list, persist: bool = True) -> dict:
+        """
+        Executa o comando de validação, ou devolve o resultado em cache para o mesmo conteúdo.
+        
+        Args:
+            kind (str): Tipo de validação (ex.: "syntax", "inventory")
+            files (list): Arquivos cujo conteúdo determina o resultado
+            command (list): Comando executado quando não há resultado em cache
+            persist (bool): Grava o cache em disco após uma nova validação
+        
+        Returns:
+            dict: {"output", "error", "exit_code", "hash", "checked_at", "cached"}
+        """
+        key = self.digest(kind, files)
+        with self._lock:
+            cached = self._results.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        
+        started = time.monotonic()
+        try:
+            process = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout, check=False)
+            output, error, exit_code = process.stdout, process.stderr, process.returncode
+        except subprocess.TimeoutExpired:
+            output, error, exit_code = "", f"Tempo limite de {self.timeout}s excedido", -1
+        except Exception as e:
+            output, error, exit_code = "", str(e), -1
+        result = {
+            "output": output,
+            "error": error,
+            "exit_code": exit_code,
+            "hash": key,
+            "checked_at": time.time(),
+            "duration": round(time.monotonic() - started, 3)
+        }
+        # Falhas (inclusive do próprio comando: timeout, binário ausente) não são guardadas
+        if exit_code == 0:
+            with self._lock:
+                self._results[key] = result
+            if persist:
+                self.save()
+        return dict(result, cached=False)
+
+
+class JobOutputBuffer:
+    """
+    Buffer de saída de um job, somente de acréscimo e dividido em blocos.
+    Evita a concatenação repetida de strings (custo quadrático em execuções longas) e
+    permite leituras incrementais: o cursor é a posição (em caracteres) já entregue ao cliente,
+    o que o mantém válido também depois que a saída é gravada no histórico de jobs.
+    """
+    
+    def __init__(self, initial: str = ""):
+        self._chunks = []
+        self._ends = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._joined = ("", 0)
+        if initial:
+            self.append(initial)
+    
+    def append(self, text: str):
+        """Acrescenta um bloco de saída e acorda quem estiver aguardando novos dados"""
+        if not text:
+            return
+        with self._changed:
+            self._chunks.append(text)
+            self._ends.append((self._ends[-1] if self._ends else 0) + len(text))
+            self._changed.notify_all()
+    
+    @property
+    def cursor(self) -> int:
+        """Cursor atual (tamanho total da saída)"""
+        with self._lock:
+            return self._ends[-1] if self._ends else 0
+    
+    def read(self, since: int = 0) -> tuple:
+        """
+        Lê a saída a partir de um cursor.
+        
+        Args:
+            since (int): Cursor devolvido pela leitura anterior (0 lê tudo)
+        
+        Returns:
+            tuple: (texto novo, próximo cursor)
+        """
+        with self._lock:
+            cursor = self._ends[-1] if self._ends else 0
+            since = max(0, min(since, cursor))
+            if since == 0:
+                return self._text_locked(), cursor
+            # Localiza o bloco que contém o cursor sem percorrer os anteriores
+            index = bisect.bisect_right(self._ends, since)
+            start = self._ends[index - 1] if index else 0
+            parts = self._chunks[index:]
+            if parts:
+                parts[0] = parts[0][since - start:]
+            return "".join(parts), cursor
+    
+    def wait(self, since: int, timeout: float = None) -> bool:
+        """Aguarda até existir saída após o cursor; retorna False se o tempo esgotar"""
+        with self._changed:
+            return self._changed.wait_for(lambda: bool(self._ends) and self._ends[-1] > since, timeout)
+    
+    def _text_locked(self) -> str:
+        # A junção completa é memorizada até o próximo acréscimo
+        text, count = self._joined
+        if count != len(self._chunks):
+            text = "".join(self._chunks)
+            self._joined = (text, len(self._chunks))
+        return text
+    
+    def __contains__(self, text: str) -> bool:
+        with self._lock:
+            return text in self._text_locked()
+    
+    def __str__(self) -> str:
+        with self._lock:
+            return self._text_locked()
+
+
+class SharedCache:
+    """
+    Cache chave/valor com expiração em SQLite, compartilhado por todos os processos do
+    servidor (um dicionário em memória ficaria restrito ao worker que o preencheu).
+    Os valores são gravados como JSON.
+    """
+    
+    def __init__(self, db_path: str, ttl: float = DASHBOARD_CACHE_TTL):
+        """
+        Args:
+            db_path (str): Caminho do banco SQLite
+            ttl (float): Validade padrão das entradas em segundos (0 = sem expiração)
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+    
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    def get(self, key: str, default=None):
+        """Valor de uma chave ou default, se ela não existir ou estiver vencida"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+    
+    def set(self, key: str, value, ttl: float = None):
+        """Grava uma chave; ttl=None usa a validade padrão e ttl=0 não expira"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), now + ttl if ttl else None)
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+    
+    def __setitem__(self, key: str, value):
+        self.set(key, value)
+    
+    def delete(self, key: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+# Cache compartilhado entre os processos (usado pelo dashboard)
+cache = SharedCache(SHARED_CACHE_DB_PATH)
+
+
+class JobStore:
+    """
+    Histórico persistente de jobs em SQLite, que também é a fila e o estado compartilhado
+    entre processos.
+    Os metadados ficam no banco (com índices por status, playbook, host e data) e a saída
+    de cada job finalizado é gravada compactada (gzip) em arquivo próprio. Enquanto o job
+    executa, o processo dono publica no banco a saída nova (tabela job_output), o progresso
+    e o estado por host, de modo que qualquer processo consegue consultá-lo ou cancelá-lo.
+    
+    Os workers (processos web e job runners deste nó, e job runners de outros nós pela API
+    /api/cluster/, ver RemoteJobStore) assumem jobs com um lease que
+    renovam a cada heartbeat; o job de um worker que terminou é finalizado ou, com novas
+    tentativas habilitadas (JOB_MAX_ATTEMPTS), devolvido à fila. Um job distribuído
+    é um job "pai" sem execução própria, com um job filho (shard) por grupo de hosts; o pai
+    acumula a saída dos shards e é finalizado quando o último deles termina.
+    """
+    
+    ACTIVE_STATUSES = ACTIVE_JOB_STATUSES
+    # Sistemas de arquivos em que o SQLite em WAL (memória compartilhada e locks) não é seguro
+    NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "glusterfs", "fuse.glusterfs",
+                           "ceph", "fuse.ceph", "9p", "lustre", "gpfs", "afs")
+    
+    def __init__(self, db_path: str, output_dir: str, retention_days: float = JOB_RETENTION_DAYS,
+                 max_jobs: int = JOB_HISTORY_MAX, lease_ttl: float = JOB_LEASE_TTL):
+        """
+        Args:
+            db_path (str): Caminho do banco SQLite
+            output_dir (str): Diretório dos arquivos de saída compactados
+            retention_days (float): Dias de histórico mantidos (0 desativa a expiração por idade)
+            max_jobs (int): Quantidade máxima de jobs mantidos (0 desativa o limite)
+            lease_ttl (float): Segundos de validade do lease de um job em execução
+        """
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.retention_days = retention_days
+        self.max_jobs = max_jobs
+        self.lease_ttl = lease_ttl
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+        # Motivo pelo qual este processo não deve executar jobs (ver AnsibleManager.start_workers)
+        self.unsafe_reason = None
+        fs_type = self._filesystem_type(os.path.dirname(db_path))
+        if fs_type in self.NETWORK_FILESYSTEMS:
+            self.unsafe_reason = (
+                f"O banco de jobs {db_path} está em um sistema de arquivos de rede ({fs_type}); o SQLite em WAL "
+                "exige disco local (outros nós devem usar AUTOMATO_JOB_COORDINATOR)"
+            )
+            logger.error(self.unsafe_reason)
+        self._init_schema()
+        self.recover()
+    
+    @staticmethod
+    def _filesystem_type(path: str) -> str:
+        """Tipo do sistema de arquivos que contém path (via /proc/mounts) ou None se indisponível"""
+        path = os.path.realpath(path)
+        best, fs_type = "", None
+        try:
+            with open("/proc/mounts", encoding="utf-8") as mounts:
+                for line in mounts:
+                    fields = line.split()
+                    if len(fields) < 3:
+                        continue
+                    # Pontos de montagem com espaço vêm escapados como \040
+                    mount_point = fields[1].replace("\\040", " ")
+                    inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                    if inside and len(mount_point) > len(best):
+                        best, fs_type = mount_point, fields[2]
+        except OSError:
+            return None
+        return fs_type
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_schema(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    playbook TEXT NOT NULL,
+                    playbook_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    hosts TEXT NOT NULL DEFAULT '[]',
+                    created_at REAL NOT NULL,
+                    finished_at REAL,
+                    output_path TEXT,
+                    output_size INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+                CREATE INDEX IF NOT EXISTS idx_jobs_playbook ON jobs(playbook);
+                CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+                CREATE TABLE IF NOT EXISTS job_hosts (
+                    job_id TEXT NOT NULL REFERENCES jobs(job_id) ON DELETE CASCADE,
+                    host TEXT NOT NULL,
+                    PRIMARY KEY (job_id, host)
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_hosts_host ON job_hosts(host);
+            """)
+            host_columns = {row["name"] for row in conn.execute("PRAGMA table_info(job_hosts)")}
+            if "status" not in host_columns:
+                conn.execute("ALTER TABLE job_hosts ADD COLUMN status TEXT")
+            job_columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "profile" not in job_columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN profile TEXT")
+            if "started_at" not in job_columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN started_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_profile ON jobs(profile)")
+            # Fila e estado compartilhado entre processos
+            for column, definition in (
+                ("priority", f"INTEGER NOT NULL DEFAULT {JOB_DEFAULT_PRIORITY}"),
+                ("extra_vars", "TEXT"),
+                ("owner", "TEXT"),
+                ("cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+                ("state", "TEXT"),
+                ("updated_at", "REAL"),
+                ("lease_expires_at", "REAL"),
+                ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+                ("parent_id", "TEXT"),
+                ("shard_count", "INTEGER NOT NULL DEFAULT 0")
+            ):
+                if column not in job_columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority, created_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_parent ON jobs(parent_id);
+                CREATE TABLE IF NOT EXISTS job_output (
+                    job_id TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    chunk TEXT NOT NULL,
+                    PRIMARY KEY (job_id, offset)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    role TEXT NOT NULL,
+                    hostname TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    capacity INTEGER NOT NULL DEFAULT 0,
+                    running INTEGER NOT NULL DEFAULT 0,
+                    started_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL
+                );
+            """)
+    
+    @staticmethod
+    def _owner_alive(owner: str):
+        """
+        Indica se o processo dono de um job ("host:pid") ainda existe.
+        
+        Returns:
+            bool: False se comprovadamente terminou; None se não há como verificar (outro hostname)
+        """
+        if not owner:
+            return False
+        hostname, _, pid = owner.rpartition(':')
+        if hostname != socket.gethostname():
+            # Dono em outro nó: só o job runner daquele nó verifica o processo (ver release)
+            return None
+        try:
+            os.kill(int(pid), 0)
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            pass
+        return True
+    
+    def recover(self, max_attempts: int = JOB_MAX_ATTEMPTS, dead_owners: tuple = ()) -> int:
+        """
+        Trata os jobs em execução cujo dono parou. Só o processo dono comprovadamente
+        inexistente (verificado neste nó ou, em outro nó, pelo job runner de lá: dead_owners)
+        permite devolver o job à fila, e apenas enquanto ele tiver tentativas e não tiver sido
+        cancelado. Com o lease vencido e o dono vivo (travado ou sem acesso ao banco) o
+        job é mantido: o dono volta a renová-lo ou, ao terminar, passa a ser recuperável. Um
+        dono que não pode ser verificado pode ainda estar executando, então o job com lease
+        vencido é marcado como "interrupted" e nunca reexecutado. Jobs na fila permanecem nela.
+        
+        Args:
+            max_attempts (int): Execuções permitidas por job
+            dead_owners (tuple): Donos de outro nó que o job runner daquele nó verificou como terminados
+        
+        Returns:
+            int: Quantidade de jobs recuperados
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT job_id, owner, lease_expires_at FROM jobs WHERE status = 'running' AND shard_count = 0"
+            ).fetchall()
+        orphans = []
+        for row in rows:
+            alive = False if row["owner"] in dead_owners else self._owner_alive(row["owner"])
+            expired = row["lease_expires_at"] is not None and row["lease_expires_at"] < now
+            if alive is False or (alive is None and expired):
+                orphans.append((row["job_id"], row["owner"], alive is False))
+        recovered = 0
+        for job_id, owner, dead in orphans:
+            with closing(self._connect()) as conn, conn:
+                # O dono pode ter renovado o lease (ou outro processo recuperado o job) nesse meio-tempo
+                row = conn.execute(
+                    "SELECT attempts, cancel_requested, parent_id FROM jobs WHERE job_id = ? AND status = 'running' "
+                    "AND owner IS ? AND (? OR lease_expires_at < ?)",
+                    (job_id, owner, dead, time.time())
+                ).fetchone()
+                if row is None:
+                    continue
+                recovered += 1
+                if dead and row["attempts"] < max_attempts and not row["cancel_requested"]:
+                    self._append_output(
+                        conn, job_id,
+                        f"\n==== WORKER {owner} PAROU; JOB DEVOLVIDO À FILA "
+                        f"(TENTATIVA {row['attempts'] + 1} DE {max_attempts}) ====\n\n"
+                    )
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, state = NULL, "
+                        "updated_at = ? WHERE job_id = ?", (time.time(), job_id)
+                    )
+                    logger.warning(f"Job {job_id} devolvido à fila: o worker {owner} parou")
+                    continue
+                output = self._archive_output(
+                    conn, job_id,
+                    "\nExecução interrompida: o processo que executava o job terminou.\n" if dead else
+                    f"\nExecução interrompida: o lease do worker {owner} venceu e ele não pode ser verificado.\n"
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = 'interrupted', finished_at = ?, extra_vars = NULL, "
+                    "lease_expires_at = NULL WHERE job_id = ?",
+                    (time.time(), job_id)
+                )
+                logger.warning(
+                    f"Job {job_id} marcado como interrompido: o worker {owner} "
+                    f"{'parou' if dead else 'não renovou o lease e não pode ser verificado'}"
+                )
+                if row["parent_id"]:
+                    self._merge_shard(conn, row["parent_id"], job_id, "interrupted", output)
+        return recovered
+    
+    def create(self, job_id: str, playbook_path: str, hosts: list, status: str = "running", profile: str = None,
+               priority: int = JOB_DEFAULT_PRIORITY, extra_vars: dict = None, output: str = "", shards: list = None):
+        """
+        Registra um novo job (com o perfil de execução usado). Um job "queued" fica na fila
+        compartilhada com tudo o que é preciso para qualquer worker executá-lo.
+        
+        Args:
+            shards (list): Para um job distribuído, um dict por shard com "job_id", "hosts",
+                "extra_vars" e "output"; o job registrado passa a ser apenas o pai deles
+        
+        Raises:
+            sqlite3.IntegrityError: Se já existe um job com esse ID
+        """
+        created_at = time.time()
+        with closing(self._connect()) as conn, conn:
+            rows = [(job_id, hosts, extra_vars, output, None, len(shards or ()))]
+            rows += [(shard["job_id"], shard["hosts"], shard["extra_vars"], shard["output"], job_id, 0)
+                     for shard in shards or ()]
+            for row_id, row_hosts, row_vars, row_output, parent_id, shard_count in rows:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, playbook, playbook_path, status, hosts, created_at, profile, "
+                    "priority, extra_vars, parent_id, shard_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row_id, os.path.basename(playbook_path), playbook_path, status, json.dumps(row_hosts), created_at,
+                     profile, priority, json.dumps(row_vars) if row_vars and not shard_count else None,
+                     parent_id, shard_count)
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO job_hosts (job_id, host) VALUES (?, ?)",
+                    [(row_id, host) for host in row_hosts]
+                )
+                if row_output:
+                    conn.execute("INSERT INTO job_output (job_id, offset, chunk) VALUES (?, 0, ?)", (row_id, row_output))
+    
+    def claim(self, owner: str, per_host_limit: int = 0) -> dict:
+        """
+        Reivindica atomicamente o job de maior prioridade da fila cujos hosts têm capacidade
+        livre (menos de per_host_limit jobs em execução em qualquer processo).
+        
+        Args:
+            owner (str): Identificação do worker ("host:pid")
+            per_host_limit (int): Jobs simultâneos por host (0 desativa o limite)
+        
+        Returns:
+            dict: Job reivindicado (com "extra_vars") ou None se não houver job disponível
+        """
+        with closing(self._connect()) as conn:
+            # Leitura sem lock de escrita: o caso comum é a fila vazia
+            if conn.execute("SELECT 1 FROM jobs WHERE status = 'queued' AND shard_count = 0 LIMIT 1").fetchone() is None:
+                return None
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs pai (distribuídos) não executam; apenas os seus shards
+                queued = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' AND shard_count = 0 ORDER BY priority, created_at, rowid"
+                ).fetchall()
+                load = {}
+                if per_host_limit > 0 and queued:
+                    load = {row[0]: row[1] for row in conn.execute(
+                        "SELECT jh.host, COUNT(*) FROM job_hosts jh JOIN jobs j ON j.job_id = jh.job_id "
+                        "WHERE j.status = 'running' AND j.shard_count = 0 GROUP BY jh.host"
+                    )}
+                for row in queued:
+                    hosts = json.loads(row["hosts"])
+                    if per_host_limit > 0 and any(load.get(host, 0) >= per_host_limit for host in hosts):
+                        continue
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', owner = ?, started_at = COALESCE(started_at, ?), "
+                        "updated_at = ?, lease_expires_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+                        (owner, now, now, now + self.lease_ttl, row["job_id"])
+                    )
+                    if row["parent_id"]:
+                        conn.execute(
+                            "UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ? AND status = 'queued'",
+                            (now, row["parent_id"])
+                        )
+                    conn.execute("COMMIT")
+                    job = self._row_to_dict(row)
+                    job.update(status="running", owner=owner, parent_id=row["parent_id"],
+                               extra_vars=json.loads(row["extra_vars"]) if row["extra_vars"] else None)
+                    return job
+                conn.execute("COMMIT")
+                return None
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def publish(self, job_id: str, offset: int, text: str, owner: str = None, **fields) -> bool:
+        """
+        Acrescenta a saída nova de um job em execução (a partir de offset) e atualiza colunas.
+        Com owner, só publica se o job ainda pertence a esse worker.
+        
+        Returns:
+            bool: False se o job passou para outro worker
+        """
+        with closing(self._connect()) as conn, conn:
+            if owner is not None and not self._owns(conn, job_id, owner):
+                return False
+            if text:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_output (job_id, offset, chunk) VALUES (?, ?, ?)",
+                    (job_id, offset, text)
+                )
+            fields["updated_at"] = time.time()
+            columns = ", ".join(f"{name} = ?" for name in fields)
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+        return True
+    
+    @staticmethod
+    def _owns(conn, job_id: str, owner: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM jobs WHERE job_id = ? AND owner = ? AND status = 'running'", (job_id, owner)
+        ).fetchone() is not None
+    
+    def renew(self, owner: str, job_ids: list) -> set:
+        """
+        Renova o lease dos jobs em execução de um worker.
+        
+        Returns:
+            set: IDs que não pertencem mais ao worker (finalizados ou recuperados por outro processo)
+        """
+        if not job_ids:
+            return set()
+        placeholders = ",".join("?" * len(job_ids))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ? WHERE owner = ? AND status = 'running' AND job_id IN ({placeholders})",
+                (time.time() + self.lease_ttl, owner, *job_ids)
+            )
+            kept = {row["job_id"] for row in conn.execute(
+                f"SELECT job_id FROM jobs WHERE owner = ? AND status = 'running' AND job_id IN ({placeholders})",
+                (owner, *job_ids)
+            )}
+        return set(job_ids) - kept
+    
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        Cancela um job a partir de qualquer processo. Um job na fila é finalizado na hora;
+        um job em execução recebe um pedido de cancelamento que o processo dono atende.
+        
+        Returns:
+            bool: False se o job não está ativo
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT status, shard_count, parent_id FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] not in self.ACTIVE_STATUSES:
+                return False
+            if row["shard_count"]:
+                # Job distribuído: cancela cada shard; o pai termina junto com o último deles
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+                shard_ids = [shard["job_id"] for shard in conn.execute(
+                    "SELECT job_id FROM jobs WHERE parent_id = ?", (job_id,)
+                )]
+                for shard_id in shard_ids:
+                    self._cancel_locked(conn, shard_id)
+                self._complete_parent(conn, job_id)
+                return True
+            cancelled = self._cancel_locked(conn, job_id)
+            if row["parent_id"]:
+                self._complete_parent(conn, row["parent_id"])
+            return cancelled
+    
+    def _cancel_locked(self, conn, job_id: str) -> bool:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        )
+        if cursor.rowcount:
+            self._archive_output(conn, job_id, "\nExecução cancelada antes de iniciar.\n")
+            conn.execute("UPDATE jobs SET extra_vars = NULL WHERE job_id = ?", (job_id,))
+            return True
+        cursor = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,)
+        )
+        return cursor.rowcount > 0
+    
+    def cancel_requests(self, job_ids: list) -> set:
+        """IDs, entre os informados, com pedido de cancelamento pendente"""
+        if not job_ids:
+            return set()
+        placeholders = ",".join("?" * len(job_ids))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT job_id FROM jobs WHERE cancel_requested = 1 AND job_id IN ({placeholders})", job_ids
+            ).fetchall()
+        return {row["job_id"] for row in rows}
+    
+    def queue_position(self, job_id: str):
+        """Posição (1 = próximo) de um job na fila compartilhada ou None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT priority, created_at FROM jobs WHERE job_id = ? AND status = 'queued'", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND shard_count = 0 AND "
+                "(priority < ? OR (priority = ? AND created_at < ?))",
+                (row["priority"], row["priority"], row["created_at"])
+            ).fetchone()[0]
+        return ahead + 1
+    
+    def count_active(self) -> dict:
+        """Quantidade de jobs na fila e em execução em todos os processos"""
+        counts = dict.fromkeys(self.ACTIVE_STATUSES, 0)
+        placeholders = ",".join("?" * len(self.ACTIVE_STATUSES))
+        with closing(self._connect()) as conn:
+            for row in conn.execute(
+                f"SELECT status, COUNT(*) AS total FROM jobs WHERE status IN ({placeholders}) AND shard_count = 0 "
+                "GROUP BY status",
+                self.ACTIVE_STATUSES
+            ):
+                counts[row["status"]] = row["total"]
+        return counts
+    
+    def heartbeat(self, worker_id: str, role: str, capacity: int, running: int):
+        """Registra (ou renova) um processo que executa jobs (deste ou de outro nó)"""
+        hostname, _, pid = worker_id.rpartition(':')
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO workers (worker_id, role, hostname, pid, capacity, running, started_at, heartbeat_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(worker_id) DO UPDATE SET "
+                "role = excluded.role, capacity = excluded.capacity, running = excluded.running, "
+                "heartbeat_at = excluded.heartbeat_at",
+                (worker_id, role, hostname, int(pid), capacity, running, now, now)
+            )
+            # Registros de processos parados há mais de um dia
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - 86400,))
+    
+    def unregister(self, worker_id: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+    
+    def running_owners(self, hostname: str) -> list:
+        """Donos ("host:pid") dos jobs em execução em um nó"""
+        with closing(self._connect()) as conn:
+            return [row["owner"] for row in conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'running' AND owner LIKE ?", (f"{hostname}:%",)
+            )]
+    
+    def release(self, owner: str) -> int:
+        """
+        Recupera os jobs de um worker de outro nó que comprovadamente terminou, conforme
+        verificado pelo job runner daquele nó: são tratados como os de um processo local
+        inexistente (devolvidos à fila, se houver tentativas, ou interrompidos).
+        
+        Returns:
+            int: Quantidade de jobs recuperados
+        """
+        return self.recover(dead_owners=(owner,))
+    
+    def live_workers(self, role: str = None, timeout: float = JOB_WORKER_TIMEOUT) -> list:
+        """Processos com heartbeat recente (opcionalmente de um papel: "web" ou "runner")"""
+        clause, params = "", [time.time() - timeout]
+        if role:
+            clause = "AND role = ?"
+            params.append(role)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM workers WHERE heartbeat_at >= ? {clause} ORDER BY started_at", params
+            ).fetchall()
+        return [
+            {
+                "worker_id": row["worker_id"],
+                "role": row["role"],
+                "hostname": row["hostname"],
+                "pid": row["pid"],
+                "capacity": row["capacity"],
+                "running": row["running"],
+                "started_at": datetime.fromtimestamp(row["started_at"]).isoformat(),
+                "heartbeat_at": datetime.fromtimestamp(row["heartbeat_at"]).isoformat()
+            }
+            for row in rows
+        ]
+    
+    def _live_output(self, conn, job_id: str) -> str:
+        return "".join(row["chunk"] for row in conn.execute(
+            "SELECT chunk FROM job_output WHERE job_id = ? ORDER BY offset", (job_id,)
+        ))
+    
+    def _append_output(self, conn, job_id: str, text: str):
+        """Acrescenta texto ao fim da saída publicada de um job"""
+        offset = conn.execute(
+            "SELECT COALESCE(SUM(length(chunk)), 0) FROM job_output WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+        conn.execute("INSERT INTO job_output (job_id, offset, chunk) VALUES (?, ?, ?)", (job_id, offset, text))
+    
+    def _complete_parent(self, conn, parent_id: str):
+        """Finaliza um job distribuído quando todos os seus shards terminaram"""
+        shards = conn.execute(
+            "SELECT job_id, status FROM jobs WHERE parent_id = ? ORDER BY rowid", (parent_id,)
+        ).fetchall()
+        if not shards or any(shard["status"] in self.ACTIVE_STATUSES for shard in shards):
+            return
+        statuses = {shard["status"] for shard in shards}
+        if "cancelled" in statuses:
+            status = "cancelled"
+        elif statuses == {"completed"}:
+            status = "completed"
+        else:
+            status = "failed"
+        conn.execute(
+            "UPDATE job_hosts SET status = (SELECT shard_hosts.status FROM job_hosts shard_hosts "
+            "JOIN jobs shard ON shard.job_id = shard_hosts.job_id "
+            "WHERE shard.parent_id = job_hosts.job_id AND shard_hosts.host = job_hosts.host) WHERE job_id = ?",
+            (parent_id,)
+        )
+        summary = ", ".join(f"{name}={sum(shard['status'] == name for shard in shards)}" for name in sorted(statuses))
+        self._archive_output(conn, parent_id, f"\n==== JOB DISTRIBUÍDO CONCLUÍDO: {summary} ====\n")
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = 100, finished_at = ? WHERE job_id = ?",
+            (status, time.time(), parent_id)
+        )
+    
+    def _archive_output(self, conn, job_id: str, suffix: str = "") -> str:
+        """Grava em arquivo a saída publicada de um job que termina fora do processo dono"""
+        output = self._live_output(conn, job_id) + suffix
+        output_path = self._output_file(job_id)
+        with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+            f.write(output)
+        conn.execute("DELETE FROM job_output WHERE job_id = ?", (job_id,))
+        conn.execute(
+            "UPDATE jobs SET output_path = ?, output_size = ?, state = NULL WHERE job_id = ?",
+            (output_path, len(output), job_id)
+        )
+        return output
+    
+    def _merge_shard(self, conn, parent_id: str, shard_id: str, status: str, output: str):
+        """Acrescenta ao job pai a saída de um shard que terminou e finaliza o pai, se for o último"""
+        self._append_output(conn, parent_id, f"\n==== SHARD {shard_id} ({status.upper()}) ====\n{output}")
+        self._complete_parent(conn, parent_id)
+    
+    def update(self, job_id: str, **fields):
+        """Atualiza colunas de um job (ex.: status, progress)"""
+        if not fields:
+            return
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+    
+    def _output_file(self, job_id: str) -> str:
+        safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', job_id)
+        return os.path.join(self.output_dir, f"{safe_id}.log.gz")
+    
+    def finish(self, job_id: str, status: str, progress: float, output: str, hosts_status: dict = None,
+               owner: str = None) -> bool:
+        """
+        Grava a saída compactada e registra o estado final do job (e de cada host, se houver).
+        Com owner, só finaliza se o job ainda pertence a esse worker. Um shard que termina
+        leva a sua saída para o job pai.
+        
+        Returns:
+            bool: False se o job passou para outro worker
+        """
+        with closing(self._connect()) as conn, conn:
+            if owner is not None and not self._owns(conn, job_id, owner):
+                return False
+            output_path = self._output_file(job_id)
+            with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+                f.write(output)
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, finished_at = ?, output_path = ?, output_size = ?, "
+                "extra_vars = NULL, state = NULL, lease_expires_at = NULL WHERE job_id = ?",
+                (status, progress, time.time(), output_path, len(output), job_id)
+            )
+            conn.execute("DELETE FROM job_output WHERE job_id = ?", (job_id,))
+            if hosts_status:
+                conn.executemany(
+                    "UPDATE job_hosts SET status = ? WHERE job_id = ? AND host = ?",
+                    [(host_status.get("status"), job_id, host) for host, host_status in hosts_status.items()]
+                )
+            parent = conn.execute("SELECT parent_id FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if parent and parent["parent_id"]:
+                self._merge_shard(conn, parent["parent_id"], job_id, status, output)
+        self.evict()
+        return True
+    
+    def _row_to_dict(self, row) -> dict:
+        # Duração medida a partir do início real da execução (sem o tempo de espera na fila)
+        duration = None
+        if row["finished_at"] and row["started_at"]:
+            duration = round(row["finished_at"] - row["started_at"], 3)
+        return {
+            "job_id": row["job_id"],
+            "playbook": row["playbook"],
+            "playbook_path": row["playbook_path"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "hosts": json.loads(row["hosts"]),
+            "profile": row["profile"],
+            "priority": row["priority"],
+            "owner": row["owner"],
+            "start_time": datetime.fromtimestamp(row["created_at"]).isoformat(),
+            "started_at": datetime.fromtimestamp(row["started_at"]).isoformat() if row["started_at"] else None,
+            "finished_at": datetime.fromtimestamp(row["finished_at"]).isoformat() if row["finished_at"] else None,
+            "duration": duration,
+            "output_size": row["output_size"]
+        }
+    
+    def get(self, job_id: str) -> dict:
+        """Metadados de um job (com o status de cada host, quando registrado) ou None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            host_rows = conn.execute(
+                "SELECT host, status FROM job_hosts WHERE job_id = ? AND status IS NOT NULL", (job_id,)
+            ).fetchall()
+        job = self._row_to_dict(row)
+        if host_rows:
+            job["hosts_status"] = {host_row["host"]: {"status": host_row["status"]} for host_row in host_rows}
+        if row["state"]:
+            # Estado publicado pelo processo que executa o job (tarefa atual, hosts, progresso do plano)
+            job.update(json.loads(row["state"]))
+        if row["cancel_requested"] and row["status"] in self.ACTIVE_STATUSES:
+            job["cancel_requested"] = True
+        if row["parent_id"]:
+            job["parent_id"] = row["parent_id"]
+        if row["shard_count"]:
+            job["shards"] = self._shards(job_id)
+            total_hosts = sum(len(shard["hosts"]) for shard in job["shards"]) or 1
+            if row["status"] in self.ACTIVE_STATUSES:
+                # Progresso do job distribuído ponderado pela quantidade de hosts de cada shard
+                job["progress"] = round(sum(
+                    (100 if shard["status"] not in self.ACTIVE_STATUSES else shard["progress"] or 0) * len(shard["hosts"])
+                    for shard in job["shards"]
+                ) / total_hosts, 1)
+        return job
+    
+    def _shards(self, parent_id: str) -> list:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT job_id, hosts, status, progress, owner, attempts FROM jobs WHERE parent_id = ? ORDER BY rowid",
+                (parent_id,)
+            ).fetchall()
+        return [
+            {
+                "job_id": row["job_id"],
+                "hosts": json.loads(row["hosts"]),
+                "status": row["status"],
+                "progress": row["progress"],
+                "owner": row["owner"],
+                "attempts": row["attempts"]
+            }
+            for row in rows
+        ]
+    
+    def version(self, job_id: str) -> tuple:
+        """
+        Marca de versão de um job: muda a cada publicação de saída ou estado, mudança de
+        status ou de algum dos seus shards. None se o job não existe.
+        """
+        return self.versions([job_id]).get(job_id)
+    
+    def versions(self, job_ids: list) -> dict:
+        """Marcas de versão (ver version) de vários jobs em uma consulta: job_id -> versão"""
+        if not job_ids:
+            return {}
+        placeholders = ",".join("?" * len(job_ids))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT j.job_id, j.status, j.progress, j.updated_at, j.finished_at, j.cancel_requested, j.owner, "
+                "(SELECT MAX(MAX(COALESCE(s.updated_at, 0), COALESCE(s.finished_at, 0))) FROM jobs s "
+                f"WHERE s.parent_id = j.job_id) FROM jobs j WHERE j.job_id IN ({placeholders})",
+                job_ids
+            ).fetchall()
+        return {row[0]: tuple(row)[1:] for row in rows}
+    
+    def read_output(self, job_id: str, since: int = 0) -> tuple:
+        """
+        Saída de um job a partir de um cursor: do arquivo compactado, se o job terminou,
+        ou dos blocos publicados enquanto ele executa.
+        
+        Returns:
+            tuple: (texto, próximo cursor)
+        """
+        output_path = self._output_file(job_id)
+        if not os.path.exists(output_path):
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT offset, chunk FROM job_output WHERE job_id = ? AND offset + length(chunk) > ? "
+                    "ORDER BY offset", (job_id, since)
+                ).fetchall()
+            if not rows:
+                return "", since
+            since = max(since, rows[0]["offset"])
+            text = "".join(row["chunk"] for row in rows)[since - rows[0]["offset"]:]
+            return text, since + len(text)
+        with gzip.open(output_path, 'rt', encoding='utf-8') as f:
+            output = f.read()
+        since = max(0, min(since, len(output)))
+        return output[since:], len(output)
+    
+    def list(self, status: str = None, playbook: str = None, host: str = None,
+             since: float = None, until: float = None, limit: int = 50, offset: int = 0,
+             profile: str = None) -> list:
+        """Consulta o histórico de jobs, do mais recente para o mais antigo"""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if playbook:
+            clauses.append("playbook = ?")
+            params.append(playbook)
+        if profile:
+            clauses.append("profile = ?")
+            params.append(profile)
+        if host:
+            clauses.append("job_id IN (SELECT job_id FROM job_hosts WHERE host = ?)")
+            params.append(host)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+    
+    def profile_stats(self, playbook: str = None) -> dict:
+        """
+        Duração dos jobs finalizados agrupada por perfil de execução, para comparar os perfis.
+        
+        Returns:
+            dict: perfil -> {"jobs", "completed", "avg_duration", "min_duration", "max_duration"}
+        """
+        clause, params = "", []
+        if playbook:
+            clause = "AND playbook = ?"
+            params.append(playbook)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT COALESCE(profile, 'default') AS profile, COUNT(*) AS jobs, "
+                "SUM(status = 'completed') AS completed, AVG(finished_at - started_at) AS avg_duration, "
+                "MIN(finished_at - started_at) AS min_duration, MAX(finished_at - started_at) AS max_duration "
+                f"FROM jobs WHERE finished_at IS NOT NULL AND started_at IS NOT NULL {clause} "
+                "GROUP BY COALESCE(profile, 'default')",
+                params
+            ).fetchall()
+        return {
+            row["profile"]: {
+                "jobs": row["jobs"],
+                "completed": row["completed"],
+                "avg_duration": round(row["avg_duration"], 3),
+                "min_duration": round(row["min_duration"], 3),
+                "max_duration": round(row["max_duration"], 3)
+            }
+            for row in rows
+        }
+    
+    def evict(self) -> int:
+        """
+        Remove jobs finalizados fora da política de retenção (idade e quantidade máxima).
+        
+        Returns:
+            int: Quantidade de jobs removidos
+        """
+        placeholders = ",".join("?" * len(self.ACTIVE_STATUSES))
+        expired = []
+        with closing(self._connect()) as conn, conn:
+            if self.retention_days > 0:
+                cutoff = time.time() - self.retention_days * 86400
+                expired += conn.execute(
+                    f"SELECT job_id FROM jobs WHERE created_at < ? AND status NOT IN ({placeholders})",
+                    (cutoff, *self.ACTIVE_STATUSES)
+                ).fetchall()
+            if self.max_jobs > 0:
+                expired += conn.execute(
+                    f"SELECT job_id FROM jobs WHERE status NOT IN ({placeholders}) "
+                    f"ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+                    (*self.ACTIVE_STATUSES, self.max_jobs)
+                ).fetchall()
+            job_ids = list({row["job_id"] for row in expired})
+            for job_id in job_ids:
+                conn.execute("DELETE FROM job_hosts WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        
+        for job_id in job_ids:
+            try:
+                os.remove(self._output_file(job_id))
+            except FileNotFoundError:
+                pass
+        if job_ids:
+            logger.info(f"{len(job_ids)} job(s) removido(s) do histórico pela política de retenção")
+        return len(job_ids)
+
+
+class RemoteJobStore:
+    """
+    Fila de jobs de um job runner em outro nó. Cada operação é uma chamada HTTP à API
+    /api/cluster/ do nó dono do jobs.db, que mantém o SQLite em disco local; o runner
+    assume, renova, publica e finaliza jobs como se usasse o JobStore diretamente.
+    Os processos deste nó que terminam com jobs são verificados aqui (recover) e liberados
+    no coordenador; um nó inteiro que para tem os seus jobs interrompidos quando o lease vence.
+    """
+    
+    unsafe_reason = None
+    
+    def __init__(self, url: str, token: str, lease_ttl: float = JOB_LEASE_TTL, timeout: float = 30):
+        """
+        Args:
+            url (str): Endereço do servidor web do nó dono do jobs.db
+            token (str): Token compartilhado do cluster (AUTOMATO_CLUSTER_TOKEN)
+            lease_ttl (float): Validade do lease (deve ser a mesma do coordenador)
+            timeout (float): Prazo de cada chamada em segundos
+        """
+        self.url = url
+        self.token = token
+        self.lease_ttl = lease_ttl
+        self.timeout = timeout
+    
+    def _call(self, method: str, *args, **kwargs):
+        request_ = urllib.request.Request(
+            f"{self.url}/api/cluster/{method}",
+            data=json.dumps({"args": args, "kwargs": kwargs}).encode('utf-8'),
+            headers={"Content-Type": "application/json", "X-Automato-Cluster-Token": self.token},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request_, timeout=self.timeout) as response:
+                return json.load(response)["result"]
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.load(e).get("error")
+            except Exception:
+                detail = e.reason
+            raise RuntimeError(f"O coordenador recusou {method} (HTTP {e.code}): {detail}") from None
+    
+    def claim(self, owner: str, per_host_limit: int = 0) -> dict:
+        job = self._call("claim", owner, per_host_limit)
+        if job and job.get("playbook_relpath"):
+            # O playbook é o mesmo arquivo da árvore sincronizada deste nó
+            job["playbook_path"] = os.path.join(BASE_DIR, job.pop("playbook_relpath"))
+        return job
+    
+    def read_output(self, job_id: str, since: int = 0) -> tuple:
+        return tuple(self._call("read_output", job_id, since))
+    
+    def publish(self, job_id: str, offset: int, text: str, owner: str = None, **fields) -> bool:
+        return self._call("publish", job_id, offset, text, owner=owner, **fields)
+    
+    def renew(self, owner: str, job_ids: list) -> set:
+        return set(self._call("renew", owner, job_ids)) if job_ids else set()
+    
+    def finish(self, job_id: str, status: str, progress: float, output: str, hosts_status: dict = None,
+               owner: str = None) -> bool:
+        return self._call("finish", job_id, status, progress, output, hosts_status=hosts_status, owner=owner)
+    
+    def cancel_requests(self, job_ids: list) -> set:
+        return set(self._call("cancel_requests", job_ids)) if job_ids else set()
+    
+    def request_cancel(self, job_id: str) -> bool:
+        return self._call("request_cancel", job_id)
+    
+    def heartbeat(self, worker_id: str, role: str, capacity: int, running: int):
+        self._call("heartbeat", worker_id, role, capacity, running)
+    
+    def unregister(self, worker_id: str):
+        self._call("unregister", worker_id)
+    
+    def live_workers(self, role: str = None) -> list:
+        return self._call("live_workers", role)
+    
+    def count_active(self) -> dict:
+        return self._call("count_active")
+    
+    def queue_position(self, job_id: str):
+        return self._call("queue_position", job_id)
+    
+    def recover(self, max_attempts: int = None) -> int:
+        """Libera no coordenador os jobs de processos deste nó que terminaram"""
+        released = 0
+        for owner in self._call("running_owners", socket.gethostname()):
+            if JobStore._owner_alive(owner) is False:
+                released += self._call("release", owner)
+        return released
+
+
+class JobScheduler:
+    """
+    Workers da fila de jobs compartilhada.
+    A fila fica no JobStore (SQLite), então vários processos podem enfileirar e executar
+    jobs: cada worker reivindica atomicamente o job de maior prioridade cujos hosts têm
+    capacidade livre ("per_host_limit" jobs por host, somando todos os processos). O número
+    de workers é o limite de execuções simultâneas deste processo; jobs cujos hosts estão
+    ocupados aguardam na fila sem bloquear os demais.
+    """
+    
+    def __init__(self, store, execute, workers: int = JOB_WORKERS, per_host_limit: int = JOB_PER_HOST_LIMIT,
+                 poll_interval: float = JOB_POLL_INTERVAL, can_claim=None):
+        """
+        Args:
+            store (JobStore): Fila e histórico compartilhados
+            execute (callable): Executa um job reivindicado (recebe o dict do job)
+            workers (int): Quantidade de jobs executados simultaneamente por este processo
+            per_host_limit (int): Jobs simultâneos por host (0 desativa o limite)
+            poll_interval (float): Intervalo em que workers ociosos consultam a fila
+            can_claim (callable): Indica se este processo deve assumir jobs agora (padrão: sempre)
+        """
+        self.store = store
+        self.execute = execute
+        self.can_claim = can_claim or (lambda: True)
+        self.workers = max(1, workers)
+        self.per_host_limit = per_host_limit
+        self.poll_interval = poll_interval
+        self._signals = 0
+        self._stopping = False
+        self._running = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+    
+    @staticmethod
+    def worker_id() -> str:
+        """Identificação deste processo como dono dos jobs que executa ("host:pid")"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+    
+    def start(self):
+        """Inicia os workers (apenas uma vez)"""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{index + 1}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(
+            f"Fila de jobs iniciada com {self.workers} worker(s) em {self.worker_id()}, "
+            f"limite por host: {self.per_host_limit or 'sem limite'}"
+        )
+    
+    def notify(self):
+        """Acorda um worker ocioso (após enfileirar um job ou liberar um host)"""
+        with self._changed:
+            self._signals += 1
+            self._changed.notify()
+    
+    def stop(self):
+        """Para de assumir novos jobs; os que já estão em execução continuam até o fim"""
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+    
+    @property
+    def running_count(self) -> int:
+        with self._lock:
+            return len(self._running)
+    
+    def position(self, job_id: str):
+        """Posição (1 = próximo) de um job na fila ou None"""
+        return self.store.queue_position(job_id)
+    
+    def stats(self) -> dict:
+        counts = self.store.count_active()
+        with self._lock:
+            return {
+                "workers": self.workers if self._threads else 0,
+                "running": len(self._running),
+                "running_total": counts["running"],
+                "queued": counts["queued"],
+                "per_host_limit": self.per_host_limit,
+                "worker_id": self.worker_id()
+            }
+    
+    def _worker_loop(self):
+        while not self._stopping:
+            try:
+                job = self.store.claim(self.worker_id(), self.per_host_limit) if self.can_claim() else None
+            except Exception as e:
+                logger.error(f"Erro ao consultar a fila de jobs: {str(e)}", exc_info=True)
+                job = None
+            if job is None:
+                # Jobs enfileirados por outros processos são vistos na próxima consulta
+                with self._changed:
+                    self._changed.wait_for(lambda: self._signals > 0 or self._stopping, self.poll_interval)
+                    self._signals = max(0, self._signals - 1)
+                continue
+            
+            job_id = job["job_id"]
+            with self._lock:
+                self._running.add(job_id)
+            try:
+                self.execute(job)
+            except Exception as e:
+                logger.error(f"Erro no worker ao executar o job {job_id}: {str(e)}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+                # Os hosts liberados podem destravar jobs da fila
+                self.notify()
+
+
+class JobChangeWatcher:
+    """
+    Sinal de mudança dos jobs acompanhados pelos streams deste processo.
+    Uma única thread consulta as versões de todos os jobs observados (JobStore.versions) a
+    cada intervalo e acorda os streams cujo job mudou, em vez de cada stream consultar o
+    status completo no banco. Sem streams abertos, a thread não consulta o banco.
+    """
+    
+    def __init__(self, store: JobStore, interval: float = JOB_SYNC_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._versions = {}
+        self._watchers = {}
+        self._changed = threading.Condition()
+        self._thread = None
+    
+    def wait(self, job_id: str, version, timeout: float):
+        """
+        Aguarda a versão do job ficar diferente de version (ou o timeout).
+        
+        Returns:
+            A versão atual (igual a version se nada mudou)
+        """
+        with self._changed:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch_loop, name="job-watcher", daemon=True)
+                self._thread.start()
+            self._watchers[job_id] = self._watchers.get(job_id, 0) + 1
+            try:
+                self._changed.wait_for(lambda: self._versions.get(job_id, version) != version, timeout)
+                return self._versions.get(job_id, version)
+            finally:
+                self._watchers[job_id] -= 1
+                if not self._watchers[job_id]:
+                    del self._watchers[job_id]
+                    self._versions.pop(job_id, None)
+    
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._changed:
+                job_ids = list(self._watchers)
+            if not job_ids:
+                continue
+            try:
+                versions = self.store.versions(job_ids)
+            except Exception as e:
+                logger.error(f"Erro ao consultar a versão dos jobs observados: {str(e)}", exc_info=True)
+                continue
+            with self._changed:
+                for job_id in job_ids:
+                    if job_id in self._watchers:
+                        self._versions[job_id] = versions.get(job_id)
+                self._changed.notify_all()
+
+
+class ReachabilityProber:
+    """
+    Teste de conectividade assíncrono.
+    Um único event loop abre conexões TCP não bloqueantes para a porta de gerenciamento
+    de cada host (SSH ou WinRM), lê o banner SSH ou faz o handshake TLS do WinRM e mede
+    a latência, em vez de disparar um processo de ping (ICMP) por host.
+    """
+    
+    SSH_PORT = 22
+    WINRM_HTTP_PORT = 5985
+    WINRM_HTTPS_PORT = 5986
+    
+    def __init__(self, concurrency: int = PROBE_CONNECT_CONCURRENCY, read_banner: bool = True,
+                 tls_handshake: bool = True):
+        """
+        Args:
+            concurrency (int): Número máximo de conexões abertas ao mesmo tempo
+            read_banner (bool): Lê o banner SSH para confirmar que o serviço responde
+            tls_handshake (bool): Conclui o handshake TLS nas portas WinRM HTTPS
+        """
+        self.concurrency = max(1, concurrency)
+        self.read_banner = read_banner
+        self.tls_handshake = tls_handshake
+        # O objetivo é saber se o WinRM atende, não validar o certificado (em geral autoassinado)
+        self._tls_context = ssl.create_default_context()
+        self._tls_context.check_hostname = False
+        self._tls_context.verify_mode = ssl.CERT_NONE
+    
+    def target(self, hostname: str, info: dict) -> tuple:
+        """
+        Resolve o endereço, a porta e o protocolo testados para um host.
+        
+        Returns:
+            tuple: (endereço, porta, protocolo) com protocolo 'ssh', 'winrm' ou 'tcp'
+        """
+        vars_ = info.get("vars") or {}
+        address = info.get("host") or hostname
+        if info.get("connection") == "winrm":
+            scheme = str(vars_.get("ansible_winrm_scheme", "https")).lower()
+            default_port = self.WINRM_HTTP_PORT if scheme == "http" else self.WINRM_HTTPS_PORT
+            port = int(vars_.get("ansible_port") or default_port)
+            return address, port, "tcp" if scheme == "http" else "winrm"
+        return address, int(vars_.get("ansible_port") or self.SSH_PORT), "ssh"
+    
+    async def _probe(self, hostname: str, info: dict, timeout: float, semaphore) -> dict:
+        """Testa um host e retorna {"reachable", "port", "latency_ms", ...}"""
+        if info.get("connection") == "local":
+            return {"reachable": True, "protocol": "local", "port": None, "latency_ms": 0.0, "error": None}
+        
+        address, port, protocol = self.target(hostname, info)
+        result = {
+            "reachable": False,
+            "address": address,
+            "port": port,
+            "protocol": protocol,
+            "latency_ms": None,
+            "error": None
+        }
+        use_tls = protocol == "winrm" and self.tls_handshake
+        
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(address, port, ssl=self._tls_context if use_tls else None),
+                    timeout
+                )
+                elapsed = loop.time() - started
+                result["latency_ms"] = round(elapsed * 1000, 1)
+                result["reachable"] = True
+                
+                if use_tls:
+                    ssl_object = writer.get_extra_info("ssl_object")
+                    result["tls"] = ssl_object.version() if ssl_object else None
+                elif protocol == "ssh" and self.read_banner:
+                    try:
+                        line = await asyncio.wait_for(reader.readline(), max(0.5, timeout - elapsed))
+                        banner = line.decode("ascii", "replace").strip()
+                        result["banner"] = banner
+                        if not banner.startswith("SSH-"):
+                            result["reachable"] = False
+                            result["error"] = "porta aberta, mas o serviço não é SSH"
+                    except asyncio.TimeoutError:
+                        # A porta aceitou a conexão; o banner atrasado não torna o host inacessível
+                        result["error"] = "banner SSH não recebido"
+            except asyncio.TimeoutError:
+                result["error"] = "timeout"
+            except ssl.SSLError as e:
+                result["error"] = f"falha no handshake TLS: {e.reason or str(e)}"
+            except OSError as e:
+                result["error"] = e.strerror or str(e)
+            finally:
+                if writer is not None:
+                    writer.close()
+                    try:
+                        await asyncio.wait_for(writer.wait_closed(), 1)
+                    except Exception:
+                        pass
+        return result
+    
+    def iter_probe(self, hosts: dict, timeout: float = 5):
+        """
+        Testa todos os hosts em um único event loop e gera os resultados na ordem em
+        que terminam. O loop roda em uma thread própria, então o chamador pode ser um
+        gerador do Flask (stream) ou código síncrono comum.
+        
+        Args:
+            hosts (dict): Hosts no formato retornado por load_inventory()
+            timeout (float): Prazo de conexão por host, em segundos
+        
+        Yields:
+            tuple: (hostname, resultado)
+        """
+        if not hosts:
+            return
+        
+        results = queue.Queue()
+        
+        async def probe_all():
+            semaphore = asyncio.Semaphore(self.concurrency)
+            
+            async def probe_one(hostname, info):
+                try:
+                    result = await self._probe(hostname, info, timeout, semaphore)
+                except Exception as e:
+                    logger.error(f"Erro ao testar conectividade de {hostname}: {str(e)}", exc_info=True)
+                    result = {"reachable": False, "latency_ms": None, "error": str(e)}
+                results.put((hostname, result))
+            
+            await asyncio.gather(*(probe_one(hostname, info) for hostname, info in hosts.items()))
+        
+        def run_loop():
+            try:
+                asyncio.run(probe_all())
+            except Exception as e:
+                logger.error(f"Erro no loop de teste de conectividade: {str(e)}", exc_info=True)
+        
+        threading.Thread(target=run_loop, name="reachability-prober", daemon=True).start()
+        
+        # Os hosts além do limite de concorrência esperam no semáforo, então o prazo cobre todas as "ondas"
+        waves = -(-len(hosts) // self.concurrency)
+        deadline = time.monotonic() + waves * (timeout * 2) + 5
+        pending = set(hosts)
+        while pending:
+            try:
+                hostname, result = results.get(timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Empty:
+                logger.warning(f"Tempo limite do teste de conectividade excedido, {len(pending)} host(s) sem resposta")
+                for hostname in pending:
+                    yield hostname, {"reachable": False, "latency_ms": None, "error": "timeout"}
+                return
+            pending.discard(hostname)
+            yield hostname, result
+    
+    def probe_many(self, hosts: dict, timeout: float = 5) -> dict:
+        """Testa todos os hosts e retorna um dicionário hostname -> resultado"""
+        return dict(self.iter_probe(hosts, timeout))
+
+
+class SSHConnectionPool:
+    """
+    Pool de conexões SSH persistentes (ControlMaster/ControlPersist).
+    Cada host tem um socket de controle em um diretório gerenciado pelo portal; o
+    Ansible (via ansible_ssh_args do inventário), a coleta de fatos e o teste de conexão
+    reutilizam esse socket em vez de repetir o handshake TCP+SSH. As conexões mestras
+    podem ser abertas antecipadamente, assim que os hosts são selecionados na interface.
+    """
+    
+    def __init__(self, resolve, control_dir: str = SSH_CONTROL_DIR, persist: int = SSH_CONTROL_PERSIST,
+                 max_workers: int = SSH_PREWARM_WORKERS, connect_timeout: int = 10):
+        """
+        Args:
+            resolve (callable): hostname -> {"address", "user", "port", "key_file", "password"} ou None
+            control_dir (str): Diretório dos sockets de controle
+            persist (int): Segundos que a conexão mestra fica aberta sem uso
+            max_workers (int): Conexões mestras abertas em paralelo no pré-aquecimento
+            connect_timeout (int): Prazo de conexão (ConnectTimeout) em segundos
+        
+        A verificação da chave do host segue o host_key_checking do Ansible: as mestras são
+        reaproveitadas pelos jobs, então não podem aceitar chaves que o Ansible recusaria.
+        """
+        self.resolve = resolve
+        self.control_dir = control_dir
+        self.control_path = os.path.join(control_dir, '%C')
+        self.persist = persist
+        self.max_workers = max(1, max_workers)
+        self.connect_timeout = connect_timeout
+        self._masters = {}
+        self._warming = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.available = shutil.which('ssh') is not None
+        self.ensure_dir()
+    
+    def ensure_dir(self):
+        """Cria o diretório dos sockets acessível apenas ao usuário do portal"""
+        try:
+            os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+            os.chmod(self.control_dir, 0o700)
+        except OSError as e:
+            logger.error(f"Erro ao preparar o diretório de sockets SSH {self.control_dir}: {str(e)}")
+    
+    @property
+    def ssh_args(self) -> str:
+        """Argumentos SSH (ansible_ssh_args) que fazem o Ansible usar os sockets do pool"""
+        return (f"-C -o ControlMaster=auto -o ControlPersist={self.persist}s "
+                f"-o ControlPath={self.control_path}")
+    
+    def client_options(self) -> list:
+        """Opções para um cliente ssh reutilizar a conexão mestra, se existir, sem criar uma nova"""
+        return ['-o', f'ControlPath={self.control_path}', '-o', 'ControlMaster=no']
+    
+    def _destination(self, target: dict) -> list:
+        """Porta e destino no mesmo formato usado pelo Ansible, para que o %C do socket coincida"""
+        args = ['-o', f"Port={target['port']}"]
+        if target.get('user'):
+            args += ['-o', f"User={target['user']}"]
+        return args + [target['address']]
+    
+    def _control(self, target: dict, command: str) -> bool:
+        """Executa ssh -O <command> no socket do host"""
+        try:
+            result = subprocess.run(
+                ['ssh', '-o', f'ControlPath={self.control_path}', '-O', command] + self._destination(target),
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                timeout=5, check=False
+            )
+            return result.returncode == 0
+        except Exception:
+            return False
+    
+    def is_alive(self, hostname: str) -> bool:
+        """Indica se há uma conexão mestra ativa para o host"""
+        target = self.resolve(hostname) if self.available else None
+        return bool(target) and self._control(target, 'check')
+    
+    def open(self, hostname: str) -> dict:
+        """
+        Abre (ou reaproveita) a conexão mestra de um host.
+        
+        Returns:
+            dict: {"status": "open" | "reused" | "failed" | "skipped", "error": str}
+        """
+        target = self.resolve(hostname) if self.available else None
+        if not target:
+            state = {"status": "skipped", "error": "host sem conexão SSH" if self.available else "cliente ssh não encontrado"}
+        elif self._control(target, 'check'):
+            state = {"status": "reused", "error": None}
+        else:
+            state = self._start_master(hostname, target)
+        state["updated_at"] = time.time()
+        with self._lock:
+            self._masters[hostname] = state
+        return dict(state)
+    
+    def _start_master(self, hostname: str, target: dict) -> dict:
+        """Inicia uma conexão mestra em segundo plano (ssh -M -N -f)"""
+        cmd = [
+            'ssh', '-M', '-N', '-f',
+            '-o', f'ControlPath={self.control_path}',
+            '-o', f'ControlPersist={self.persist}s',
+            '-o', f"StrictHostKeyChecking={'yes' if ANSIBLE_CONSTANTS.HOST_KEY_CHECKING else 'no'}",
+            '-o', f'ConnectTimeout={self.connect_timeout}'
+        ]
+        env = None
+        if target.get('key_file'):
+            cmd += ['-o', 'BatchMode=yes', '-o', 'IdentitiesOnly=yes', '-i', target['key_file']]
+        elif target.get('password'):
+            if not shutil.which('sshpass'):
+                return {"status": "skipped", "error": "autenticação por senha requer sshpass"}
+            env = dict(os.environ, SSHPASS=target['password'])
+            cmd = ['sshpass', '-e'] + cmd + ['-o', 'PubkeyAuthentication=no']
+        else:
+            cmd += ['-o', 'BatchMode=yes']
+        cmd += self._destination(target)
+        
+        # A mestra continua em segundo plano herdando os descritores; por isso o erro vai
+        # para um arquivo em vez de um pipe (um pipe só fecharia quando a mestra terminasse)
+        with tempfile.TemporaryFile() as err:
+            try:
+                result = subprocess.run(
+                    cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=err,
+                    env=env, timeout=self.connect_timeout + 5, check=False
+                )
+            except subprocess.TimeoutExpired:
+                return {"status": "failed", "error": "timeout"}
+            err.seek(0)
+            error = err.read().decode('utf-8', 'replace').strip()
+        
+        if result.returncode == 0:
+            logger.info(f"Conexão SSH mestra aberta para {hostname}")
+            return {"status": "open", "error": None}
+        logger.warning(f"Falha ao abrir conexão SSH mestra para {hostname}: {error}")
+        return {"status": "failed", "error": error.splitlines()[-1] if error else f"código {result.returncode}"}
+    
+    def prewarm(self, hostnames: list) -> dict:
+        """
+        Agenda a abertura das conexões mestras sem bloquear o chamador.
+        Hosts que já estão sendo aquecidos não são agendados de novo.
+        
+        Returns:
+            dict: hostname -> "warming"
+        """
+        if not self.available:
+            return {}
+        scheduled = {}
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ssh-prewarm")
+            for hostname in hostnames:
+                if hostname in self._warming:
+                    continue
+                future = self._executor.submit(self.open, hostname)
+                self._warming[hostname] = future
+                future.add_done_callback(lambda _f, h=hostname: self._warm_done(h))
+                scheduled[hostname] = "warming"
+        return scheduled
+    
+    def _warm_done(self, hostname: str):
+        with self._lock:
+            self._warming.pop(hostname, None)
+    
+    def status(self, hostnames: list = None) -> dict:
+        """Estado de cada conexão mestra conhecida (ou dos hosts informados)"""
+        with self._lock:
+            names = list(hostnames) if hostnames else list(self._masters)
+            warming = set(self._warming)
+            known = {h: dict(self._masters.get(h) or {}) for h in names}
+        result = {}
+        for hostname in names:
+            if hostname in warming:
+                result[hostname] = {"status": "warming"}
+                continue
+            state = known[hostname]
+            if state.get("status") in ("open", "reused") and not self.is_alive(hostname):
+                # ControlPersist expirou ou o host derrubou a conexão
+                state = {"status": "closed", "updated_at": state.get("updated_at")}
+            result[hostname] = state or {"status": "closed"}
+        return result
+    
+    def close(self, hostname: str) -> bool:
+        """Encerra a conexão mestra de um host"""
+        target = self.resolve(hostname) if self.available else None
+        with self._lock:
+            self._masters.pop(hostname, None)
+        return bool(target) and self._control(target, 'exit')
+    
+    def close_all(self):
+        """Encerra todas as conexões mestras abertas pelo portal"""
+        with self._lock:
+            hostnames = list(self._masters)
+        for hostname in hostnames:
+            self.close(hostname)
+
+
+# Classe AnsibleManager
+# Classe AnsibleManager
+class AnsibleManager:
+    def __init__(self):
+        self.base_path = Path(__file__).parent
+        # Altere o caminho do inventário para usar inventory.yml
+        self.inventory_path = self.base_path / "inventory" / "inventory.yml"
+        self.playbook_path = self.base_path / "playbooks"
+        self.arquivos_path = self.base_path / "arquivos"
+        self.running_playbooks = {}
+        self.job_store = JobStore(JOBS_DB_PATH, JOB_OUTPUT_DIR)
+        self.scheduler = JobScheduler(self.job_store, self._execute_job, can_claim=self._may_claim)
+        self._runner_check = (0, False)
+        self.job_watcher = JobChangeWatcher(self.job_store)
+        self._published = {}
+        self._sync_thread = None
+        self._sync_lock = threading.Lock()
+        self.worker_role = None
+        self.prober = ReachabilityProber()
+        self.plans = PlaybookPlanCache(os.path.join(CACHE_DIR, 'playbook_plans.json'))
+        self.validations = ValidationCache(os.path.join(CACHE_DIR, 'validation.json'))
+        self.validation_report = {"status": "idle", "total": 0, "checked": 0, "results": {}}
+        self.shared_cache = cache
+        self._validation_lock = threading.Lock()
+        self.ssh_pool = SSHConnectionPool(self._ssh_target)
+        self.inventory = InventoryModel(self.inventory_path, self.inventory_path.parent / "group_vars")
+        self.catalog = PlaybookCatalog(
+            self.playbook_path,
+            os.path.join(CACHE_DIR, 'playbook_catalog.json'),
+            self._extract_metadata_from_file
+        )
+        
+        self.inventory_path.parent.mkdir(parents=True, exist_ok=True)
+        self.playbook_path.mkdir(parents=True, exist_ok=True)
+        self.arquivos_path.mkdir(parents=True, exist_ok=True)
+        
+        for os_type in ["windows", "linux"]:
+            (self.playbook_path / os_type).mkdir(exist_ok=True)
+            (self.arquivos_path / os_type).mkdir(exist_ok=True)
+            for category in ["agents", "security", "baseline", "config"]:
+                (self.playbook_path / os_type / category).mkdir(exist_ok=True)
+        
+        # Criar playbooks específicos para coletar fatos
+        self.create_linux_facts_playbook()
+        self.create_windows_facts_playbook()
+        
+        logger.info(f"Inicializado com inventory_path: {self.inventory_path}")
+        logger.info(f"Inicializado com playbook_path: {self.playbook_path}")
+        logger.info(f"Inicializado com arquivos_path: {self.arquivos_path}")
+    
+    def _update_execution_status(self, job_id: str, line: str, formatted_line: str):
+        if job_id not in self.running_playbooks:
+            return
+        playbook = self.running_playbooks[job_id]
+        playbook["output"].append(formatted_line)
+        if "TASK" in line:
+            playbook["progress"] = min(95, playbook["progress"] + 5)
+        elif "PLAY RECAP" in line:
+            playbook["progress"] = 100
+            if "failed=0" in line and "unreachable=0" in line:
+                playbook["status"] = "completed"
+            else:
+                playbook["status"] = "failed"
+
+
+    def _write_facts_playbook(self, playbook_path: Path, content: str):
+        """Grava o playbook de coleta de fatos apenas se o conteúdo mudou"""
+        if playbook_path.exists() and playbook_path.read_text(encoding='utf-8') == content:
+            return
+        logger.info(f"Criando playbook {playbook_path.name}")
+        playbook_path.write_text(content, encoding='utf-8')
+
+    def create_linux_facts_playbook(self):
+        """Cria playbook para coleta de fatos de hosts Linux"""
+        content = """---
+- name: Coletar Informações do Host Linux
+  hosts: all
+  gather_facts: yes
+  become: no
+  
+  tasks:
+    - name: Coletar informações básicas do sistema
+      set_fact:
+        system_info: "{{ ansible_distribution }} {{ ansible_distribution_version }}{% if ansible_os_family == 'Debian' %} (Debian){% elif ansible_os_family == 'RedHat' %} (RedHat){% endif %}"
+
+    - name: Obter IP Público
+      uri:
+        url: https://api.ipify.org?format=json
+        return_content: yes
+      register: public_ip_response
+      ignore_errors: yes
+
+    # host_details é lido dos eventos estruturados do ansible-runner (ver gather_facts_batch)
+    - name: Criar JSON com informações
+      set_fact:
+        host_details:
+          hostname: "{{ ansible_hostname }}"
+          private_ip: "{{ ansible_default_ipv4.address | default(inventory_hostname) }}"
+          public_ip: "{{ public_ip_response.json.ip | default(ansible_default_ipv4.address) | default(inventory_hostname) }}"
+          system: "{{ system_info }}"
+"""
+        self._write_facts_playbook(self.playbook_path / "gather_facts_linux.yml", content)
+
+    def create_windows_facts_playbook(self):
+        """Cria playbook para coleta de fatos de hosts Windows"""
+        content = """---
+- name: Coletar Informações do Host Windows
+  hosts: all
+  gather_facts: yes
+  vars:
+    ansible_connection: winrm
+    ansible_winrm_transport: ntlm
+    ansible_winrm_server_cert_validation: ignore
+  
+  tasks:
+    - name: Obter IP Público Windows
+      win_uri:
+        url: https://api.ipify.org?format=json
+        return_content: yes
+      register: public_ip_response
+      ignore_errors: yes
+
+    # host_details é lido dos eventos estruturados do ansible-runner (ver gather_facts_batch)
+    - name: Criar JSON com informações Windows
+      set_fact:
+        host_details:
+          hostname: "{{ ansible_hostname }}"
+          private_ip: "{{ ansible_ip_addresses[0] | default(inventory_hostname) }}"
+          public_ip: "{{ public_ip_response.json.ip | default(inventory_hostname) }}"
+          system: "{{ ansible_distribution | default('Windows Server') }} {{ ansible_distribution_version | default('') }}"
+"""
+        self._write_facts_playbook(self.playbook_path / "gather_facts_windows.yml", content)
+
+    def get_execution_status(self, job_id: str, since: int = None) -> dict:
+        """
+        Status de um job. Com "since", devolve apenas a saída produzida após esse cursor.
+        O campo "cursor" deve ser enviado como "since" na próxima consulta.
+        """
+        job = self.running_playbooks.get(job_id)
+        if job is None:
+            # Jobs na fila, em outro processo ou finalizados são consultados no banco compartilhado
+            status = self.job_store.get(job_id)
+            if status is None:
+                return {"status": "not_found", "output": "", "progress": 0, "cursor": 0}
+            status["output"], status["cursor"] = self.job_store.read_output(job_id, since or 0)
+            if status["status"] == "queued":
+                status["queue_position"] = self.scheduler.position(job_id)
+            return status
+        status = {key: value for key, value in job.items() if key != "output"}
+        status["output"], status["cursor"] = job["output"].read(since or 0)
+        return status
+    
+    def job_version(self, job_id: str) -> tuple:
+        """Marca de versão do status de um job (ver get_execution_status), sem montar a resposta"""
+        job = self.running_playbooks.get(job_id)
+        if job is not None:
+            return (
+                self.scheduler.worker_id(), job["status"], job.get("progress"), job["output"].cursor,
+                job.get("tasks_started", 0), job.get("current_task"), (job.get("plan") or {}).get("done")
+            )
+        version = self.job_store.version(job_id)
+        if version and version[0] == "queued":
+            version += (self.scheduler.position(job_id),)
+        return version
+    
+    def gather_host_facts(self, hostname: str, timeout: float = None) -> dict:
+        """
+        Coleta os fatos de um único host (atalho para gather_facts_batch).
+        
+        Returns:
+            dict: hostname, public_ip, private_ip e system; valores básicos se a coleta falhar
+        """
+        info = self.load_inventory().get(hostname, {})
+        try:
+            result = self.gather_facts_batch([hostname], timeout=timeout).get(hostname, {})
+            if result.get("status") == "ok":
+                logger.info(f"Fatos extraídos com sucesso para {hostname}: {result['facts']}")
+                return result["facts"]
+            logger.warning(f"Coleta de fatos para {hostname} terminou com status {result.get('status')}")
+        except Exception as e:
+            logger.error(f"Erro ao coletar fatos do host {hostname}: {str(e)}", exc_info=True)
+        
+        basic_details = self.default_host_facts(hostname, info)
+        logger.warning(f"Usando informações básicas para {hostname}: {basic_details}")
+        return basic_details
+
+    # Campos obrigatórios do host_details gerado pelos playbooks de coleta de fatos
+    FACTS_SCHEMA = ("hostname", "private_ip", "public_ip", "system")
+
+    def gather_facts_batch(self, hostnames: list = None, forks: int = FACTS_BATCH_FORKS, timeout: float = None) -> dict:
+        """
+        Coleta os fatos de vários hosts com uma única execução do Ansible por
+        sistema operacional (Linux e Windows), paralelizando dentro do Ansible via forks.
+        
+        Args:
+            hostnames (list): Hosts a coletar; None coleta todo o inventário
+            forks (int): Número de forks do Ansible
+            timeout (float): Tempo limite de cada execução
+        
+        Returns:
+            dict: hostname -> {"status": "ok" | "failed" | "unreachable", "facts": dict ou None}
+        """
+        inventory = self.load_inventory()
+        if hostnames is None:
+            hostnames = list(inventory.keys())
+        
+        results = {}
+        known_hosts = []
+        for hostname in hostnames:
+            if hostname in inventory:
+                known_hosts.append(hostname)
+            else:
+                results[hostname] = {"status": "failed", "facts": None, "error": "Host não encontrado no inventário"}
+        
+        windows_hosts = [h for h in known_hosts if inventory[h].get("connection") == "winrm"]
+        linux_hosts = [h for h in known_hosts if inventory[h].get("connection") != "winrm"]
+        
+        runs = []
+        if linux_hosts:
+            runs.append((self.playbook_path / "gather_facts_linux.yml", linux_hosts, {}))
+        if windows_hosts:
+            runs.append((
+                self.playbook_path / "gather_facts_windows.yml",
+                windows_hosts,
+                {'ansible_winrm_transport': 'ntlm', 'ansible_winrm_server_cert_validation': 'ignore'}
+            ))
+        
+        if not runs:
+            return results
+        
+        logger.info(f"Coleta de fatos em lote para {len(known_hosts)} host(s) com forks={forks}")
+        with ThreadPoolExecutor(max_workers=len(runs), thread_name_prefix="facts-batch") as executor:
+            futures = [
+                executor.submit(self._run_facts_playbook, playbook, run_hosts, extravars, forks, timeout)
+                for playbook, run_hosts, extravars in runs
+            ]
+            for future in futures:
+                results.update(future.result())
+        
+        return results
+
+    def _run_facts_playbook(self, playbook: Path, hostnames: list, extravars: dict, forks: int, timeout: float = None) -> dict:
+        """
+        Executa um playbook de coleta de fatos via ansible-runner e monta o resultado por
+        host a partir dos eventos estruturados, sem analisar o texto da saída.
+        """
+        results = {h: {"status": "failed", "facts": None} for h in hostnames}
+        
+        def handle_event(event):
+            event_type = event.get('event')
+            event_data = event.get('event_data', {})
+            hostname = event_data.get('host')
+            if hostname not in results:
+                return False
+            
+            if event_type == 'runner_on_unreachable':
+                results[hostname] = {"status": "unreachable", "facts": None}
+            elif event_type == 'runner_on_failed' and not event_data.get('ignore_errors'):
+                res = event_data.get('res', {})
+                results[hostname] = {"status": "failed", "facts": None, "error": res.get('msg', '')}
+            elif event_type == 'runner_on_ok':
+                details = event_data.get('res', {}).get('ansible_facts', {}).get('host_details')
+                if details is not None:
+                    facts = self._validate_host_details(details)
+                    if facts:
+                        results[hostname] = {"status": "ok", "facts": facts}
+                    else:
+                        results[hostname] = {"status": "failed", "facts": None, "error": "host_details fora do esquema esperado"}
+            # Os eventos não são gravados em disco; só o que foi extraído aqui interessa
+            return False
+        
+        private_data_dir = tempfile.mkdtemp(prefix="facts_")
+        try:
+            logger.info(f"Coletando fatos com {playbook.name} para {len(hostnames)} host(s)")
+            runner = ansible_runner.run(
+                private_data_dir=private_data_dir,
+                playbook=str(playbook),
+                inventory=str(self.inventory_path),
+                limit=','.join(hostnames),
+                forks=max(1, min(forks, len(hostnames))),
+                extravars=extravars or None,
+                event_handler=handle_event,
+                suppress_output_file=True,
+                quiet=True,
+                # O ansible-runner trata 0 como sem limite: prazos abaixo de 1 s viram 1 s
+                timeout=max(1, math.ceil(timeout)) if timeout else None
+            )
+            if runner.status == 'timeout':
+                logger.warning(f"Tempo limite excedido na coleta de fatos em lote ({playbook.name})")
+        except Exception as e:
+            logger.error(f"Erro ao executar coleta de fatos em lote: {str(e)}", exc_info=True)
+            return {h: {"status": "failed", "facts": None, "error": str(e)} for h in hostnames}
+        finally:
+            shutil.rmtree(private_data_dir, ignore_errors=True)
+        
+        return results
+
+    @classmethod
+    def _validate_host_details(cls, details) -> dict:
+        """Valida host_details contra FACTS_SCHEMA; retorna None se não estiver conforme"""
+        if not isinstance(details, dict):
+            return None
+        facts = {}
+        for key in cls.FACTS_SCHEMA:
+            value = details.get(key)
+            if not isinstance(value, str) or not value.strip():
+                return None
+            facts[key] = value.strip()
+        return facts
+
+    def create_gather_facts_playbook(self, playbook_path):
+        """Cria playbook para coleta de fatos"""
+        logger.info(f"Criando playbook gather_facts.yml em {playbook_path}")
+        content = """---
+- name: Coletar Informações do Host
+  hosts: all
+  gather_facts: yes
+  become: no
+  
+  tasks:
+    - name: Coletar informações básicas do sistema
+      set_fact:
+        system_info: "{{ ansible_distribution }} {{ ansible_distribution_version }}{% if ansible_os_family == 'Debian' %} (Debian){% elif ansible_os_family == 'RedHat' %} (RedHat){% endif %}"
+
+    - name: Formatar informações do sistema
+      set_fact:
+        formatted_info:
+          hostname: "{{ ansible_hostname }}"
+          private_ip: "{{ ansible_default_ipv4.address | default('N/A') }}"
+          system: "{{ system_info }}"
+
+    - name: Obter IP Público
+      uri:
+        url: https://api.ipify.org?format=json
+        return_content: yes
+      register: public_ip_response
+      ignore_errors: yes
+
+    - name: Criar JSON com informações
+      set_fact:
+        host_details:
+          hostname: "{{ formatted_info.hostname }}"
+          private_ip: "{{ formatted_info.private_ip }}"
+          public_ip: "{{ public_ip_response.json.ip | default('N/A') }}"
+          system: "{{ formatted_info.system }}"
+
+    - name: Debug informações coletadas
+      debug:
+        var: host_details
 """
         with open(playbook_path, 'w') as f:
             f.write(content)
@@ -2014,79 +4482,403 @@ class AnsibleManager:
                 'os_version': '22.04'
             }        
 
-    def handle_ansible_event(self, job_id: str, event: dict):
-        """Processa eventos do Ansible e atualiza o status da execução do playbook"""
-        if job_id not in self.running_playbooks:
-            return
+    # Eventos do ansible-runner com o resultado de uma tarefa em um host
+    HOST_RESULT_EVENTS = {
+        "runner_on_ok": "ok",
+        "runner_on_failed": "failed",
+        "runner_on_skipped": "skipped",
+        "runner_on_unreachable": "unreachable"
+    }
+    
+    @staticmethod
+    def _stats_by_host(event_data: dict) -> dict:
+        """Converte os contadores do evento playbook_on_stats (stat -> host -> n) em host -> stat -> n"""
+        names = {"ok": "ok", "changed": "changed", "failures": "failed", "dark": "unreachable",
+                 "skipped": "skipped", "rescued": "rescued", "ignored": "ignored"}
+        stats = {}
+        for key, name in names.items():
+            for host, count in (event_data.get(key) or {}).items():
+                stats.setdefault(host, dict.fromkeys(names.values(), 0))[name] = count
+        return stats
+    
+    def handle_ansible_event(self, job_id: str, event: dict) -> bool:
+        """
+        Processa um evento estruturado do ansible-runner e atualiza o job.
+        Status, progresso e resultado por host vêm dos campos tipados do evento; o texto
+        (event["stdout"]) só é usado para montar a saída exibida.
+        
+        Returns:
+            bool: False, para o runner não gravar o evento em disco
+        """
+        job = self.running_playbooks.get(job_id)
+        if job is None:
+            return False
             
         try:
-            formatted_output = AnsibleOutputFormatter.format_event(event)
-            
-            if formatted_output:
-                if 'output' not in self.running_playbooks[job_id]:
-                    self.running_playbooks[job_id]['output'] = ''
-                self.running_playbooks[job_id]['output'] += formatted_output
-            
-            if event['event'] == 'playbook_on_stats':
-                self.running_playbooks[job_id]['progress'] = 100
-                stats = event.get('event_data', {}).get('stats', {})
-                failed_hosts = sum(
-                    1 for host_stats in stats.values() 
-                    if host_stats.get('failures', 0) > 0 or host_stats.get('unreachable', 0) > 0
-                )
-                self.running_playbooks[job_id]['status'] = 'failed' if failed_hosts > 0 else 'completed'
-            else:
-                elapsed = (datetime.now() - self.running_playbooks[job_id]['start_time']).total_seconds()
-                self.running_playbooks[job_id]['progress'] = min(95, (elapsed / 60) * 100)
+            for line in (event.get("stdout") or "").splitlines():
+                if line.strip():
+                    job["output"].append(AnsibleOutputFormatter.format_output(line.strip()))
+            
+            event_type = event.get("event")
+            event_data = event.get("event_data") or {}
+            hosts_status = job.setdefault("hosts_status", {})
+            
+            plan = job.get("plan")
+            
+            if event_type == "playbook_on_play_start":
+                if plan:
+                    plan["play"] += 1
+                    plan["host_done"] = {}
+            
+            elif event_type == "playbook_on_task_start":
+                job["current_task"] = event_data.get("task") or event_data.get("name")
+                job["tasks_started"] = job.get("tasks_started", 0) + 1
+                if not (plan and plan["total"]):
+                    # Sem plano (playbook fora do padrão) o progresso é apenas estimado
+                    job["progress"] = min(95, job["tasks_started"] * 5)
+            
+            elif event_type in self.HOST_RESULT_EVENTS and event_data.get("host"):
+                result = self.HOST_RESULT_EVENTS[event_type]
+                if result == "failed" and event_data.get("ignore_errors"):
+                    result = "ignored"
+                host_status = hosts_status.setdefault(event_data["host"], {
+                    "status": "running", "ok": 0, "changed": 0, "failed": 0,
+                    "skipped": 0, "unreachable": 0, "ignored": 0
+                })
+                host_status[result] += 1
+                if result == "ok" and (event_data.get("res") or {}).get("changed"):
+                    host_status["changed"] += 1
+                if result in ("failed", "unreachable"):
+                    host_status["status"] = result
+                host_status["last_task"] = event_data.get("task")
+                host_status["duration"] = event_data.get("duration")
+                if plan and plan["total"]:
+                    self._advance_plan(plan, event_data["host"], result)
+                    job["progress"] = min(99, round(plan["done"] * 100 / plan["total"], 1))
+            
+            elif event_type == "playbook_on_no_hosts_matched":
+                job["no_hosts_matched"] = True
+            
+            elif event_type == "playbook_on_stats":
+                stats_by_host = self._stats_by_host(event_data)
+                job["stats_hosts"] = len(stats_by_host)
+                for host, stats in stats_by_host.items():
+                    if stats["unreachable"]:
+                        status = "unreachable"
+                    elif stats["failed"]:
+                        status = "failed"
+                    else:
+                        status = "ok"
+                    hosts_status.setdefault(host, {}).update(stats, status=status)
+                job["progress"] = 100
+                if job["status"] != "cancelled":
+                    failed = any(h.get("status") in ("failed", "unreachable") for h in hosts_status.values())
+                    job["status"] = "failed" if failed else "completed"
                 
         except Exception as e:
             logger.error(f"Erro ao processar evento Ansible: {str(e)}", exc_info=True)
+        return False
+    
+    def _vars_files(self, directory) -> list:
+        """Arquivos de group_vars/host_vars (e vars/ de playbooks) que o Ansible carrega a partir de um diretório"""
+        files = []
+        for vars_dir in ('group_vars', 'host_vars'):
+            root = os.path.join(str(directory), vars_dir)
+            for current, _, names in os.walk(root):
+                files.extend(os.path.join(current, name) for name in names if name.endswith(('.yml', '.yaml', '.json')))
+        return files
+    
+    def syntax_check(self, playbook_path: str, persist: bool = True) -> dict:
+        """
+        Executa ansible-playbook --syntax-check com cache pelo conteúdo do playbook, de tudo
+        o que ele importa (plano) e das variáveis de grupo/host ao lado dele.
+        
+        Returns:
+            dict: {"output", "error", "exit_code", "hash", "checked_at", "cached"}
+        """
+        playbook_path = os.path.abspath(playbook_path)
+        try:
+            files = list(self.plans.get(playbook_path)["files"])
+        except Exception:
+            files = [playbook_path]
+        files.extend(self._vars_files(os.path.dirname(playbook_path)))
+        return self.validations.run(
+            'syntax', files, ['ansible-playbook', '--syntax-check', playbook_path], persist=persist
+        )
+    
+    def inventory_check(self) -> dict:
+        """Executa ansible-inventory --list com cache pelo conteúdo do inventário e de group_vars/host_vars"""
+        inventory_path = str(self.inventory_path)
+        files = [inventory_path] + self._vars_files(self.inventory_path.parent)
+        return self.validations.run('inventory', files, ['ansible-inventory', '-i', inventory_path, '--list'])
+    
+    def validate_catalog(self) -> bool:
+        """
+        Inicia a validação de sintaxe de todos os playbooks do catálogo em segundo plano,
+        com um worker por CPU. Playbooks que não mudaram vêm direto do cache.
+        
+        Returns:
+            bool: False se já existe uma validação do catálogo em andamento
+        """
+        with self._validation_lock:
+            if self.validation_report.get("status") == "running":
+                return False
+            paths = sorted(os.path.abspath(p) for p in self.playbook_path.rglob('*.yml') if p.is_file())
+            self.validation_report = {
+                "status": "running",
+                "started_at": time.time(),
+                "finished_at": None,
+                "total": len(paths),
+                "checked": 0,
+                "cached": 0,
+                "invalid": 0,
+                "results": {}
+            }
+        threading.Thread(target=self._validate_catalog, args=(paths,), daemon=True, name="catalog-validation").start()
+        return True
+    
+    def _validate_catalog(self, paths: list):
+        """Valida os playbooks em paralelo e grava o cache uma única vez ao final"""
+        report = self.validation_report
+        self._share_validation(report)
+        last_shared = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=CATALOG_VALIDATION_WORKERS) as executor:
+                futures = {executor.submit(self.syntax_check, path, False): path for path in paths}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"exit_code": -1, "error": str(e), "hash": None, "cached": False}
+                    valid = result["exit_code"] == 0
+                    with self._validation_lock:
+                        report["results"][path] = {
+                            "valid": valid,
+                            "exit_code": result["exit_code"],
+                            "error": "" if valid else result["error"].strip(),
+                            "hash": result["hash"],
+                            "cached": result["cached"]
+                        }
+                        report["checked"] += 1
+                        report["cached"] += int(result["cached"])
+                        report["invalid"] += int(not valid)
+                    if time.monotonic() - last_shared >= 1:
+                        last_shared = time.monotonic()
+                        self._share_validation(report)
+            report["status"] = "completed"
+        except Exception as e:
+            logger.error(f"Erro ao validar o catálogo de playbooks: {str(e)}", exc_info=True)
+            report["status"] = "failed"
+        finally:
+            report["finished_at"] = time.time()
+            self.validations.save()
+            self._share_validation(report)
+        logger.info(
+            f"Validação do catálogo: {report['checked']} playbook(s), {report['invalid']} inválido(s), "
+            f"{report['cached']} do cache em {report['finished_at'] - report['started_at']:.1f}s"
+        )
+    
+    def _share_validation(self, report: dict):
+        """Publica o relatório da validação no cache compartilhado, para os demais processos"""
+        with self._validation_lock:
+            snapshot = dict(report, results=dict(report["results"]))
+        self.shared_cache.set("catalog_validation", snapshot, ttl=0)
+    
+    def validation_snapshot(self) -> dict:
+        """Relatório da validação mais recente do catálogo, feita por este ou por outro processo"""
+        with self._validation_lock:
+            report = dict(self.validation_report, results=dict(self.validation_report["results"]))
+        shared = self.shared_cache.get("catalog_validation")
+        if shared and shared.get("started_at", 0) > (report.get("started_at") or 0):
+            return shared
+        return report
+    
+    def _plan_hosts(self, pattern: str, hosts: list) -> list:
+        """Hosts do job alcançados pelo padrão "hosts" de um play (nomes, grupos, curingas, ! e &)"""
+        if '{{' in pattern:
+            return list(hosts)
+        selected = set(hosts)
+        result = None
+        for term in re.split(r'[:,]', pattern):
+            term = term.strip()
+            if not term:
+                continue
+            operator, name = (term[0], term[1:]) if term[0] in '!&' else ('', term)
+            if name in ('all', '*'):
+                matched = selected
+            elif name in selected:
+                matched = {name}
+            elif any(char in name for char in '*?['):
+                matched = {h for h in selected if fnmatch.fnmatch(h, name)}
+            else:
+                matched = set(self.inventory.hosts_in_group(name)) & selected
+            if operator == '!':
+                result = (selected if result is None else result) - matched
+            elif operator == '&':
+                result = (selected if result is None else result) & matched
+            else:
+                result = (result or set()) | matched
+        return [h for h in hosts if h in (result or ())]
+    
+    def _plan_progress(self, playbook_path: str, hosts: list) -> dict:
+        """
+        Unidades de progresso previstas para um job (tarefas × hosts de cada play), a partir
+        do plano em cache do playbook. Retorna None se o plano não puder ser calculado.
+        """
+        try:
+            plan = self.plans.get(playbook_path)
+        except Exception as e:
+            logger.error(f"Erro ao calcular o plano de {playbook_path}: {str(e)}", exc_info=True)
+            return None
+        plays = [[len(self._plan_hosts(play["hosts"], hosts)), len(play["tasks"])] for play in plan["plays"]]
+        return {
+            "hash": plan["hash"],
+            "total": sum(host_count * task_count for host_count, task_count in plays),
+            "done": 0,
+            "plays": plays,
+            "play": -1,
+            "host_done": {}
+        }
+    
+    @staticmethod
+    def _advance_plan(plan: dict, host: str, result: str):
+        """Conta o resultado de uma tarefa em um host; um host que falha sai do play"""
+        done_in_play = plan["host_done"][host] = plan["host_done"].get(host, 0) + 1
+        plan["done"] += 1
+        if result in ("failed", "unreachable") and 0 <= plan["play"] < len(plan["plays"]):
+            # As tarefas restantes do host neste play não vão rodar
+            plan["done"] += max(0, plan["plays"][plan["play"]][1] - done_in_play)
+        plan["done"] = min(plan["done"], plan["total"])
+    
+    def _run_ansible(self, job_id: str, playbook_path: str, limit: str, extravars: dict, event_handler):
+        """
+        Executa um playbook pelo ansible-runner, entregando cada evento estruturado a
+        event_handler. O runner consulta o status do job e interrompe a execução quando
+        ele é cancelado.
+        
+        Returns:
+            ansible_runner.Runner: Resultado da execução (status e rc)
+        """
+        private_data_dir = tempfile.mkdtemp(prefix="job_")
+        # O runner executa o Ansible em um pseudo-terminal; sem cor a saída fica igual à do pipe
+        envvars = {"ANSIBLE_NOCOLOR": "True"}
+        config_path = self._job_config_path(job_id)
+        if config_path:
+            envvars["ANSIBLE_CONFIG"] = config_path
+        try:
+            return ansible_runner.run(
+                private_data_dir=private_data_dir,
+                playbook=playbook_path,
+                inventory=str(self.inventory_path),
+                limit=limit,
+                extravars=extravars or None,
+                envvars=envvars,
+                event_handler=event_handler,
+                cancel_callback=lambda: self.running_playbooks.get(job_id, {}).get("status") == "cancelled",
+                suppress_output_file=True,
+                quiet=True
+            )
+        finally:
+            shutil.rmtree(private_data_dir, ignore_errors=True)
 
     def load_inventory(self) -> dict:
+        """Hosts do inventário (hostname -> info), servidos pelo modelo em memória"""
         try:
             if not self.inventory_path.exists():
                 logger.error(f"Arquivo de inventário não encontrado: {self.inventory_path}")
                 return {}
-            data_loader = DataLoader()
-            inventory = InventoryManager(loader=data_loader, sources=str(self.inventory_path))
-            hosts_info = {}
-            for host in inventory.get_hosts():
-                host_vars = host.get_vars()
-                ansible_vars = {
-                    k: v for k, v in host_vars.items() 
-                    if k.startswith('ansible_') and 
-                    k not in {'ansible_password', 'ansible_ssh_pass', 'ansible_become_pass'}
-                }
-                hosts_info[host.name] = {
-                    "name": host.name,
-                    "connection": ansible_vars.get("ansible_connection", "ssh"),
-                    "host": ansible_vars.get("ansible_host", host.name),
-                    "user": ansible_vars.get("ansible_user", ""),
-                    "vars": ansible_vars
-                }
-                logger.info(f"Host carregado: {host.name}")
-                logger.debug(f"Variáveis do host {host.name}: {ansible_vars}")
-            return hosts_info
+            return self.inventory.hosts()
         except Exception as e:
             logger.error(f"Erro ao carregar inventário: {str(e)}", exc_info=True)
             return {}
 
-    def test_host(self, hostname: str, info: dict) -> bool:
+    def _ssh_target(self, hostname: str) -> dict:
+        """Dados de conexão SSH de um host para o pool de conexões (None se não for SSH)"""
+        info = self.inventory.hosts().get(hostname)
+        if not info or info.get("connection") != "ssh":
+            return None
+        vars_ = info.get("vars") or {}
+        target = {
+            "address": info.get("host") or hostname,
+            "user": vars_.get("ansible_user"),
+            "port": int(vars_.get("ansible_port") or 22),
+            "key_file": vars_.get("ansible_ssh_private_key_file"),
+            "password": None
+        }
+        if not target["key_file"]:
+            # As senhas não ficam no modelo em memória; vêm do banco do inventário
+            server = inventory_store.get(target["address"]) or {}
+            target["password"] = server.get("ssh_pass")
+        return target
+
+    def test_host(self, hostname: str, info: dict, timeout: float = PROBE_CONNECT_TIMEOUT) -> bool:
+        """Verifica se a porta de gerenciamento do host (SSH ou WinRM) aceita conexões"""
         try:
-            if info.get("connection") == "local":
-                logger.debug(f"Host {hostname} é local, assumindo válido")
-                return True
-            host_to_test = info.get("host", hostname)
-            logger.debug(f"Testando conectividade para {host_to_test}")
-            param = "-n" if platform.system().lower() == "windows" else "-c"
-            command = ["ping", param, "1", host_to_test]
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5, text=True, check=False)
-            is_reachable = result.returncode == 0
-            logger.info(f"Host {hostname} ({'acessível' if is_reachable else 'inacessível'})")
-            return is_reachable
+            result = self.prober.probe_many({hostname: info}, timeout)[hostname]
+            if result["reachable"]:
+                logger.info(f"Host {hostname} acessível (porta {result.get('port')}, {result.get('latency_ms')} ms)")
+            else:
+                logger.info(f"Host {hostname} inacessível: {result.get('error')}")
+            return result["reachable"]
         except Exception as e:
             logger.error(f"Erro ao testar host {hostname}: {str(e)}", exc_info=True)
             return False
+
+    @staticmethod
+    def default_host_facts(hostname: str, info: dict) -> dict:
+        """Fatos padrão usados quando não é possível coletar os fatos reais do host"""
+        return {
+            "hostname": hostname,
+            "public_ip": hostname,
+            "private_ip": hostname,
+            "system": "Windows Server" if info.get("connection") == "winrm" else "Linux"
+        }
+
+    @staticmethod
+    def merge_host_facts(facts: dict, host_facts: dict) -> dict:
+        """Substitui os valores padrão apenas pelos fatos coletados que forem válidos"""
+        merged = dict(facts)
+        for key in ("hostname", "public_ip", "private_ip", "system"):
+            if host_facts and host_facts.get(key) and host_facts[key] != "N/A":
+                merged[key] = host_facts[key]
+        return merged
+
+    def probe_host(self, hostname: str, info: dict, host_timeout: float = PROBE_HOST_TIMEOUT) -> dict:
+        """
+        Testa a conectividade e coleta os fatos de um único host respeitando um prazo.
+        
+        Args:
+            hostname (str): Nome do host no inventário
+            info (dict): Informações do host retornadas por load_inventory()
+            host_timeout (float): Prazo total em segundos para o host (conexão + fatos)
+        
+        Returns:
+            dict: {"valid": bool, "facts": dict}
+        """
+        deadline = time.monotonic() + host_timeout
+        facts = self.default_host_facts(hostname, info)
+        
+        is_valid = self.test_host(hostname, info, timeout=min(PROBE_CONNECT_TIMEOUT, host_timeout))
+        
+        remaining = deadline - time.monotonic()
+        if is_valid and remaining > 0:
+            try:
+                host_facts = self.gather_host_facts(hostname, timeout=remaining)
+                if host_facts and isinstance(host_facts, dict):
+                    facts = self.merge_host_facts(facts, host_facts)
+                    logger.info(f"Fatos coletados para {hostname}: {facts}")
+                else:
+                    logger.warning(f"Fatos inválidos para {hostname}: {host_facts}")
+            except Exception as e:
+                logger.error(f"Erro coletando fatos para {hostname}: {str(e)}", exc_info=True)
+        elif is_valid:
+            logger.warning(f"Prazo esgotado para {hostname} antes da coleta de fatos")
+        
+        return {
+            "valid": is_valid,
+            "facts": facts
+        }
         
     @app.route("/api/host/<hostname>")
     def get_host_facts(hostname):
@@ -2098,14 +4890,14 @@ class AnsibleManager:
             logger.info(f"Solicitada coleta de fatos para o host: {hostname}")
             
             # Busca informações do inventário primeiro
-            hosts_inventory = ansible_mgr.load_inventory()
-            if hostname not in hosts_inventory:
+            host_info = ansible_mgr.inventory.get(hostname)
+            if host_info is None:
                 return jsonify({
                     "error": f"Host {hostname} não encontrado no inventário"
                 }), 404
                 
-            # Coleta os fatos do host
-            host_facts = ansible_mgr.gather_host_facts(hostname)
+            # Fatos do cache (atualizados em segundo plano se estiverem vencidos)
+            host_facts = facts_cache.get(hostname, host_info).get("facts")
             
             if not host_facts:
                 return jsonify({
@@ -2124,68 +4916,20 @@ class AnsibleManager:
                 "system": "Sistema não identificado"
             }), 500
 
-    def get_playbooks(self) -> list:
+    def in_playbook_dir(self, path: str) -> bool:
+        """Indica se o caminho (após resolver links e "..") fica dentro do diretório de playbooks"""
+        root = os.path.realpath(self.playbook_path)
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+    
+    def get_playbooks(self, os_type: str = None, category: str = None, name: str = None) -> list:
+        """Playbooks do catálogo indexado, opcionalmente filtrados por sistema, categoria e nome"""
         try:
-            logger.debug(f"Buscando playbooks em: {self.playbook_path}")
-            playbooks = []
             if not self.playbook_path.exists():
                 logger.error(f"Diretório de playbooks não encontrado: {self.playbook_path}")
                 return []
-
-            folder_to_category = {
-                "agents": "agentes",
-                "baseline": "baseline",
-                "config": "configuracoes",
-                "security": "seguranca"
-            }
-            ignored_files = {"gather_facts.yml", "README.md"}
-
-            linux_dir = self.playbook_path / "linux"
-            if linux_dir.exists():
-                for os_dir in linux_dir.iterdir():
-                    if os_dir.is_dir():
-                        os_name = os_dir.name
-                        for category_dir in os_dir.iterdir():
-                            if category_dir.is_dir() and category_dir.name in folder_to_category:
-                                category_name = category_dir.name
-                                ui_category = folder_to_category.get(category_name, "outros")
-                                for file in category_dir.glob("*.yml"):
-                                    if file.name not in ignored_files:
-                                        try:
-                                            meta = self._extract_metadata_from_file(
-                                                file,
-                                                default_os="linux",
-                                                default_category=ui_category
-                                            )
-                                            playbooks.append(meta)
-                                            logger.debug(f"Adicionada playbook de linux/{os_name}/{category_name}: {file.name}")
-                                        except Exception as e:
-                                            logger.error(f"Erro ao processar playbook {file.name}: {str(e)}", exc_info=True)
-
-            windows_dir = self.playbook_path / "windows"
-            if windows_dir.exists():
-                for os_dir in windows_dir.iterdir():
-                    if os_dir.is_dir():
-                        os_name = os_dir.name
-                        for category_dir in os_dir.iterdir():
-                            if category_dir.is_dir() and category_dir.name in folder_to_category:
-                                category_name = category_dir.name
-                                ui_category = folder_to_category.get(category_name, "outros")
-                                for file in category_dir.glob("*.yml"):
-                                    if file.name not in ignored_files:
-                                        try:
-                                            meta = self._extract_metadata_from_file(
-                                                file,
-                                                default_os="windows",
-                                                default_category=ui_category
-                                            )
-                                            playbooks.append(meta)
-                                            logger.debug(f"Adicionada playbook de windows/{os_name}/{category_name}: {file.name}")
-                                        except Exception as e:
-                                            logger.error(f"Erro ao processar playbook {file.name}: {str(e)}", exc_info=True)
-
-            logger.info(f"Total de playbooks encontradas: {len(playbooks)}")
-            return sorted(playbooks, key=lambda x: x["name"])
+            playbooks = self.catalog.list(os_type=os_type, category=category, name=name)
+            logger.debug(f"Total de playbooks encontradas: {len(playbooks)}")
+            return playbooks
         except Exception as e:
             logger.error(f"Erro ao listar playbooks: {str(e)}", exc_info=True)
             return []
@@ -2239,227 +4983,813 @@ class AnsibleManager:
                 "os": default_os,
                 "description": f"Playbook {file_path.stem}"
             }
-    def run_playbook(self, playbook_path: str, hosts: list) -> str:
+    def run_playbook(self, playbook_path: str, hosts: list, priority: int = JOB_DEFAULT_PRIORITY,
+                     profile: str = None) -> str:
         """Executa um playbook com os hosts especificados."""
-        return self.run_playbook_with_vars(playbook_path, hosts, None)
+        return self.run_playbook_with_vars(playbook_path, hosts, None, priority, profile)
         
             
-    def run_playbook_with_vars(self, playbook_path: str, hosts: list, extra_vars: dict = None) -> str:
-        """Executa um playbook com variáveis extras."""
+    def run_playbook_with_vars(self, playbook_path: str, hosts: list, extra_vars: dict = None,
+                               priority: int = JOB_DEFAULT_PRIORITY, profile: str = None,
+                               shard_size: int = None) -> str:
+        """
+        Enfileira a execução de um playbook com variáveis extras.
+        O job começa como "queued" na fila compartilhada e passa a "running" quando um worker
+        (deste ou de outro processo) o assume.
+        O perfil de execução (EXECUTION_PROFILES) é aplicado por um ansible.cfg próprio do job.
+        Com mais hosts que shard_size (padrão JOB_SHARD_SIZE), o job é dividido em shards de
+        até shard_size hosts, executados em paralelo pelos workers disponíveis.
+        """
+        profile = profile or DEFAULT_EXECUTION_PROFILE
+        if profile not in EXECUTION_PROFILES:
+            raise ValueError(f"Perfil de execução desconhecido: {profile}")
+        extra_vars = extra_vars if isinstance(extra_vars, dict) else None
+        shard_size = JOB_SHARD_SIZE if shard_size is None else shard_size
+        
         job_id = f"{os.path.basename(playbook_path)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        initial_output = f"Iniciando execução do playbook: {playbook_path}\nHosts: {', '.join(hosts)}\n\n"
+        # O job vai para a fila compartilhada; qualquer worker (deste ou de outro processo) pode executá-lo
+        for attempt in range(5):
+            try:
+                self.job_store.create(
+                    job_id, playbook_path, hosts, status="queued", profile=profile, priority=priority,
+                    extra_vars=extra_vars, output=initial_output,
+                    shards=self._shard_jobs(job_id, playbook_path, hosts, extra_vars, shard_size)
+                )
+                break
+            except sqlite3.IntegrityError:
+                job_id = f"{os.path.basename(playbook_path)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(2)}"
+        else:
+            raise RuntimeError("Não foi possível gerar um ID único para o job")
+        # Enquanto o job espera na fila as conexões SSH dos hosts já vão sendo abertas
+        self.ssh_pool.prewarm(hosts)
+        
+        self.start_workers()
+        if self.worker_role and self._may_claim():
+            self.scheduler.notify()
+        else:
+            self._wake_runners()
+        return job_id
+    
+    @staticmethod
+    def _shard_jobs(job_id: str, playbook_path: str, hosts: list, extra_vars: dict, shard_size: int) -> list:
+        """Shards de um job distribuído (um por grupo de shard_size hosts) ou None"""
+        if shard_size <= 0 or len(hosts) <= shard_size:
+            return None
+        shards = []
+        for index, start in enumerate(range(0, len(hosts), shard_size), 1):
+            shard_hosts = hosts[start:start + shard_size]
+            shard_vars = extra_vars
+            if extra_vars and isinstance(extra_vars.get('hosts_config'), dict):
+                # Baseline: cada shard leva apenas a configuração dos seus hosts
+                shard_vars = dict(extra_vars, hosts_config={
+                    host: config for host, config in extra_vars['hosts_config'].items() if host in shard_hosts
+                })
+            shards.append({
+                "job_id": f"{job_id}_shard{index}",
+                "hosts": shard_hosts,
+                "extra_vars": shard_vars,
+                "output": f"Shard {index} do job {job_id}: {playbook_path}\nHosts: {', '.join(shard_hosts)}\n\n"
+            })
+        return shards
+    
+    def start_workers(self, role: str = None):
+        """
+        Inicia a sincronização do estado dos jobs deste processo e, se ele executa jobs,
+        os workers da fila (apenas uma vez). Sem papel explícito, processos web executam
+        jobs exceto no modo "daemon", e só enquanto não há job runner ativo (ver _may_claim).
         
-        def run():
+        Args:
+            role (str): "runner" para o daemon de execução ou "web"
+        """
+        with self._sync_lock:
+            if self._sync_thread is not None:
+                return
+            if role is None and JOB_EXECUTION_MODE != "daemon":
+                role = "web"
+            if role and self.job_store.unsafe_reason:
+                logger.error(f"{self.job_store.unsafe_reason}; este processo não executará jobs")
+                role = None
+            self.worker_role = role
+            if role:
+                self.scheduler.start()
+            self._sync_thread = threading.Thread(target=self._sync_loop, name="job-sync", daemon=True)
+            self._sync_thread.start()
+    
+    def use_store(self, store):
+        """Troca a fila de jobs deste processo (job runner de outro nó: RemoteJobStore)"""
+        self.job_store = store
+        self.scheduler.store = store
+        self.job_watcher.store = store
+    
+    def _may_claim(self) -> bool:
+        """
+        Processos web deixam a fila para os job runners enquanto houver algum ativo, para que
+        um reinício da web não interrompa jobs (consulta renovada a cada JOB_HEARTBEAT_INTERVAL).
+        """
+        if self.worker_role != "web":
+            return True
+        return not self._runner_live()
+    
+    def _runner_live(self) -> bool:
+        checked_at, live = self._runner_check
+        if time.monotonic() - checked_at >= JOB_HEARTBEAT_INTERVAL:
+            live = bool(self.job_store.live_workers(role="runner"))
+            self._runner_check = (time.monotonic(), live)
+        return live
+    
+    def _wake_runners(self):
+        """Avisa os job runners (sockets Unix em RUNNER_SOCKET_DIR) que há um job novo na fila"""
+        for socket_path in Path(RUNNER_SOCKET_DIR).glob('*.sock'):
             try:
-                # Verificar existência do inventário e playbook
-                if not os.path.exists(self.inventory_path):
-                    logger.error(f"Arquivo de inventário não encontrado: {self.inventory_path}")
-                    self.running_playbooks[job_id]["status"] = "failed"
-                    self.running_playbooks[job_id]["output"] += f"\nErro: Arquivo de inventário não encontrado"
-                    return
-                    
-                if not os.path.exists(playbook_path):
-                    logger.error(f"Arquivo de playbook não encontrado: {playbook_path}")
-                    self.running_playbooks[job_id]["status"] = "failed"
-                    self.running_playbooks[job_id]["output"] += f"\nErro: Arquivo de playbook não encontrado"
-                    return
-                
-                # Verificar se é um playbook baseline com hosts múltiplos
-                is_baseline = 'baseline' in playbook_path.lower() or 'configuracao-base' in playbook_path.lower()
-                has_multiple_hosts = len(hosts) > 1
-                has_host_configs = extra_vars and isinstance(extra_vars, dict) and extra_vars.get('hosts_config')
-                
-                cmd = [
-                    'ansible-playbook',
-                    playbook_path,
-                    '-i', str(self.inventory_path),
-                    '--limit', ','.join(hosts)
-                ]
-                
-                # Para baseline com múltiplos hosts e configuração por host
-                if is_baseline and has_multiple_hosts and has_host_configs:
-                    logger.info(f"Executando baseline para múltiplos hosts: {', '.join(hosts)}")
-                    hosts_config = extra_vars.get('hosts_config', {})
-                    
-                    # Modificar o output para incluir identificação clara dos hosts
-                    self.running_playbooks[job_id]["output"] += f"\n==== EXECUTANDO BASELINE EM MÚLTIPLOS HOSTS ====\n"
-                    
-                    # Para cada host no baseline
-                    for host_idx, hostname in enumerate(hosts):
-                        host_config = hosts_config.get(hostname, {})
-                        if not host_config:
-                            logger.warning(f"Configuração não encontrada para o host {hostname}")
-                            continue
-                        
-                        # Adicionar separador claro no output
-                        self.running_playbooks[job_id]["output"] += f"\n\n==== HOST {host_idx+1}/{len(hosts)}: {hostname} ====\n"
-                        
-                        # Criar tempfile com configuração específica para este host
-                        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as vars_file:
-                            json.dump(host_config, vars_file)
-                            vars_path = vars_file.name
-                        
-                        # Construir comando específico para este host
-                        host_cmd = [
-                            'ansible-playbook',
-                            playbook_path,
-                            '-i', str(self.inventory_path),
-                            '--limit', hostname,
-                            '-e', f"@{vars_path}"
-                        ]
-                        
-                        logger.info(f"Executando comando para {hostname}: {' '.join(host_cmd)}")
-                        self.running_playbooks[job_id]["output"] += f"Comando para {hostname}: {' '.join(host_cmd)}\n\n"
-                        
-                        # Executar comando para este host
-                        process = subprocess.Popen(
-                            host_cmd, 
-                            stdout=subprocess.PIPE, 
-                            stderr=subprocess.STDOUT, 
-                            universal_newlines=True, 
-                            bufsize=1
-                        )
-                        
-                        # Coletar output com prefixo do hostname para fácil identificação
-                        for line in iter(process.stdout.readline, ''):
-                            if line.strip():
-                                # Prefixo para ajudar a identificar a qual host a linha pertence
-                                if not (line.startswith('PLAY') or line.startswith('TASK')):
-                                    line = f"[{hostname}] {line}"
-                                self.running_playbooks[job_id]["output"] += line
-                                self.running_playbooks[job_id]["progress"] = min(95, self.running_playbooks[job_id]["progress"] + 1)
-                        
-                        # Aguardar término do processo deste host
-                        process.wait()
-                        os.unlink(vars_path)  # Limpar arquivo temporário
-                        
-                        # Atualizar progresso
-                        progress_increment = 95 / len(hosts)
-                        current_progress = host_idx * progress_increment + (progress_increment if process.returncode == 0 else 0)
-                        self.running_playbooks[job_id]["progress"] = min(95, current_progress)
-                    
-                    # Adicionar resumo final
-                    self.running_playbooks[job_id]["output"] += f"\n\n==== BASELINE CONCLUÍDO PARA TODOS OS HOSTS ====\n"
-                    self.running_playbooks[job_id]["status"] = "completed"
-                    self.running_playbooks[job_id]["progress"] = 100
+                with closing(socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)) as sock:
+                    sock.setblocking(False)
+                    sock.sendto(b'1', str(socket_path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de um runner que terminou sem removê-lo
+                socket_path.unlink(missing_ok=True)
+            except OSError:
+                # Fila do socket cheia: o runner já tem avisos pendentes
+                pass
+    
+    def listen_wakeups(self) -> str:
+        """
+        Abre o socket Unix deste job runner e acorda um worker da fila a cada aviso da web.
+        Sem o socket, o runner continua atendendo a fila por consulta periódica.
+        
+        Returns:
+            str: Caminho do socket ou None se não foi possível criá-lo
+        """
+        os.makedirs(RUNNER_SOCKET_DIR, exist_ok=True)
+        socket_path = os.path.join(RUNNER_SOCKET_DIR, f"{self.scheduler.worker_id().replace(':', '-')}.sock")
+        try:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(socket_path)
+        except OSError as e:
+            logger.warning(f"Socket de aviso do job runner indisponível ({socket_path}): {str(e)}")
+            return None
+        
+        def receive():
+            while True:
+                try:
+                    sock.recv(64)
+                    self.scheduler.notify()
+                except OSError:
                     return
-                    
-                # Caso não seja baseline com múltiplos hosts, executa normalmente
-                if extra_vars and isinstance(extra_vars, dict):
-                    extra_vars_str = json.dumps(extra_vars)
-                    cmd.extend(['-e', extra_vars_str])
-                    logger.info(f"Executando com variáveis extras: {extra_vars_str}")
-                
-                # Registro detalhado do comando
-                logger.info(f"Executando comando: {' '.join(cmd)}")
-                self.running_playbooks[job_id]["output"] += f"Comando: {' '.join(cmd)}\n\n"
-                
-                # Executar o comando Ansible
-                process = subprocess.Popen(
-                    cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.STDOUT, 
-                    universal_newlines=True, 
-                    bufsize=1
-                )
-                process.job_id = job_id
-                if not hasattr(subprocess.Popen, 'running_processes'):
-                    subprocess.Popen.running_processes = []
-                subprocess.Popen.running_processes.append(process)
+        
+        threading.Thread(target=receive, name="runner-wakeup", daemon=True).start()
+        return socket_path
+    
+    def _execute_job(self, job: dict):
+        """Executa um job reivindicado da fila compartilhada por um worker deste processo"""
+        job_id = job["job_id"]
+        output, cursor = self.job_store.read_output(job_id)
+        self.running_playbooks[job_id] = {
+            "status": "running",
+            "output": JobOutputBuffer(output),
+            "progress": 0,
+            "priority": job["priority"],
+            "profile": job["profile"],
+            "plan": self._plan_progress(job["playbook_path"], job["hosts"]),
+            "start_time": datetime.now()
+        }
+        self._published[job_id] = (cursor, None)
+        self._run_job(
+            job_id,
+            lambda: self._run_playbook_job(job_id, job["playbook_path"], job["hosts"], job.get("extra_vars"))
+        )
+    
+    def _run_playbook_job(self, job_id: str, playbook_path: str, hosts: list, extra_vars: dict = None):
+        """Corpo da execução de um job: playbook normal ou baseline paralelo por host"""
+        try:
+            # Verificar existência do inventário e playbook
+            if not os.path.exists(self.inventory_path):
+                logger.error(f"Arquivo de inventário não encontrado: {self.inventory_path}")
+                self.running_playbooks[job_id]["status"] = "failed"
+                self.running_playbooks[job_id]["output"].append(f"\nErro: Arquivo de inventário não encontrado")
+                return
                 
-                # Coletar e processar a saída
-                for line in iter(process.stdout.readline, ''):
-                    line = line.strip()
-                    if line:
-                        logger.debug(f"Saída Ansible: {line}")
-                        formatted_line = AnsibleOutputFormatter.format_output(line)
-                        self._update_execution_status(job_id, line, formatted_line)
+            if not os.path.exists(playbook_path):
+                logger.error(f"Arquivo de playbook não encontrado: {playbook_path}")
+                self.running_playbooks[job_id]["status"] = "failed"
+                self.running_playbooks[job_id]["output"].append(f"\nErro: Arquivo de playbook não encontrado")
+                return
+            
+            # Verificar se é um playbook baseline com configuração por host
+            is_baseline = 'baseline' in playbook_path.lower() or 'configuracao-base' in playbook_path.lower()
+            has_host_configs = extra_vars and isinstance(extra_vars, dict) and extra_vars.get('hosts_config')
+            
+            # Baseline com configuração por host, mesmo com um único host (ex.: shard de um host):
+            # cada host recebe as suas próprias variáveis
+            if is_baseline and has_host_configs:
+                logger.info(f"Executando baseline por host: {', '.join(hosts)}")
+                width = extra_vars.get('baseline_width') or BASELINE_PARALLELISM
+                self._run_baseline_parallel(job_id, playbook_path, hosts, extra_vars.get('hosts_config', {}), int(width))
+                return
                 
-                # Aguardar conclusão do processo
-                process.wait()
-                exit_code = process.returncode
+            # Caso não seja baseline com múltiplos hosts, executa normalmente. As variáveis extras
+            # (que podem conter segredos) vão só para o runner, nunca para o log ou a saída do job
+            logger.info(f"Executando {playbook_path} em {', '.join(hosts)} (job_id: {job_id})")
+            
+            # Executar pelo ansible-runner; status e progresso vêm dos eventos
+            runner = self._run_ansible(
+                job_id, playbook_path, ','.join(hosts),
+                extra_vars if isinstance(extra_vars, dict) else None,
+                lambda event: self.handle_ansible_event(job_id, event)
+            )
+            job = self.running_playbooks[job_id]
+            
+            if job["status"] == "cancelled":
+                job["output"].append("\n\nExecução cancelada.\n")
+            elif runner.rc == 0:
+                logger.info(f"Playbook executado com sucesso (job_id: {job_id})")
+                job["status"] = "completed"
+                job["progress"] = 100
+            else:
+                logger.error(f"Falha na execução do playbook (job_id: {job_id}, status: {runner.status}, rc: {runner.rc})")
+                job["status"] = "failed"
                 
-                # Atualizar status com base no código de saída
-                if exit_code == 0:
-                    logger.info(f"Playbook executado com sucesso (job_id: {job_id})")
-                    self.running_playbooks[job_id]["status"] = "completed"
-                else:
-                    logger.error(f"Falha na execução do playbook (job_id: {job_id}, exit_code: {exit_code})")
-                    self.running_playbooks[job_id]["status"] = "failed"
-                    
-                    # Adicionar informações de diagnóstico
-                    if "No hosts matched" in self.running_playbooks[job_id]["output"]:
-                        self.running_playbooks[job_id]["output"] += "\n\nERRO: Nenhum host correspondeu ao padrão especificado. Verifique se os hosts existem no inventário."
-                    elif "Could not match supplied host pattern" in self.running_playbooks[job_id]["output"]:
-                        self.running_playbooks[job_id]["output"] += "\n\nERRO: Padrão de host fornecido não corresponde a nenhum host no inventário."
-                    
-                    subprocess.Popen.running_processes.remove(process)
+                # Diagnóstico pelos eventos: play sem hosts ou execução encerrada sem resumo por host
+                if job.get("no_hosts_matched"):
+                    job["output"].append("\n\nERRO: Nenhum host correspondeu ao padrão especificado. Verifique se os hosts existem no inventário.")
+                elif not job.get("stats_hosts"):
+                    job["output"].append(
+                        f"\n\nERRO: O Ansible terminou sem executar em nenhum host (status: {runner.status}, rc: {runner.rc}). "
+                        "Verifique se os hosts selecionados existem no inventário."
+                    )
 
+        except Exception as e:
+            logger.error(f"Erro na execução da playbook: {str(e)}", exc_info=True)
+            self.running_playbooks[job_id]["status"] = "failed"
+            self.running_playbooks[job_id]["output"].append(f"\nErro: {str(e)}")
+    
+    def _sync_loop(self):
+        """
+        Publica periodicamente o estado dos jobs deste processo, renova os seus leases e
+        atende cancelamentos vindos de outros. Também devolve à fila os jobs de workers parados.
+        """
+        last_recover = last_heartbeat = 0
+        # O lease é renovado algumas vezes dentro da sua validade
+        heartbeat_interval = min(JOB_HEARTBEAT_INTERVAL, self.job_store.lease_ttl / 3)
+        recover_interval = min(JOB_RECOVER_INTERVAL, self.job_store.lease_ttl)
+        while True:
+            try:
+                self.sync_jobs()
+                if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                    last_heartbeat = time.monotonic()
+                    self.renew_leases()
+                    if self.worker_role:
+                        self.job_store.heartbeat(
+                            self.scheduler.worker_id(), self.worker_role,
+                            self.scheduler.workers, len(self.running_playbooks)
+                        )
+                if time.monotonic() - last_recover >= recover_interval:
+                    last_recover = time.monotonic()
+                    self.job_store.recover()
             except Exception as e:
-                logger.error(f"Erro na execução da playbook: {str(e)}", exc_info=True)
-                self.running_playbooks[job_id]["status"] = "failed"
-                self.running_playbooks[job_id]["output"] += f"\nErro: {str(e)}"
+                logger.error(f"Erro ao sincronizar o estado dos jobs: {str(e)}", exc_info=True)
+            time.sleep(JOB_SYNC_INTERVAL)
+    
+    def renew_leases(self):
+        """Renova o lease dos jobs em execução neste processo e interrompe os que foram perdidos"""
+        local_ids = list(self.running_playbooks)
+        for job_id in self.job_store.renew(self.scheduler.worker_id(), local_ids):
+            self._lose_job(job_id)
+    
+    def _lose_job(self, job_id: str):
+        """Interrompe localmente um job que, com o lease vencido, foi finalizado por outro processo"""
+        job = self.running_playbooks.get(job_id)
+        if job is None or job.get("lost"):
+            return
+        logger.warning(f"Lease do job {job_id} perdido; a execução local será interrompida")
+        job["lost"] = True
+        if job["status"] in ACTIVE_JOB_STATUSES:
+            job["status"] = "cancelled"
+        job["output"].append("\nLease do job perdido: o job foi finalizado por outro processo.\n")
+    
+    def sync_jobs(self):
+        """Publica no banco compartilhado a saída nova e o estado dos jobs em execução neste processo"""
+        local_jobs = list(self.running_playbooks.items())
+        if not local_jobs:
+            return
+        for job_id in self.job_store.cancel_requests([job_id for job_id, _ in local_jobs]):
+            job = self.running_playbooks.get(job_id)
+            if job is not None and job["status"] in ACTIVE_JOB_STATUSES:
+                logger.info(f"Cancelamento do job {job_id} solicitado por outro processo")
+                job["status"] = "cancelled"
+        for job_id, job in local_jobs:
+            self._publish_job(job_id, job)
+    
+    def _publish_job(self, job_id: str, job: dict):
+        cursor, last_state = self._published.get(job_id, (0, None))
+        text, next_cursor = job["output"].read(cursor)
+        plan = job.get("plan")
+        try:
+            state = json.dumps({
+                "current_task": job.get("current_task"),
+                "tasks_started": job.get("tasks_started", 0),
+                "hosts_status": job.get("hosts_status"),
+                "plan": {"total": plan["total"], "done": plan["done"]} if plan else None
+            }, default=str)
+        except RuntimeError:
+            # hosts_status alterado durante a serialização; fica para a próxima publicação
+            state = last_state
+        fields = {}
+        if state != last_state:
+            fields.update(state=state, progress=job.get("progress", 0))
+        if job.get("lost"):
+            return
+        if (text or fields) and not self.job_store.publish(
+            job_id, cursor, text, owner=self.scheduler.worker_id(), **fields
+        ):
+            self._lose_job(job_id)
+            return
+        self._published[job_id] = (next_cursor, state)
+    
+    def _job_config_path(self, job_id: str) -> str:
+        """
+        ansible.cfg do perfil de execução de um job, gerado uma vez por job e usado como
+        ANSIBLE_CONFIG. O perfil padrão não gera arquivo (retorna None).
+        """
+        job = self.running_playbooks[job_id]
+        settings = EXECUTION_PROFILES[job.get("profile") or "default"]["config"]
+        if not settings:
+            return None
         
-        # Inicializar o estado da execução
-        self.running_playbooks[job_id] = {
-            "status": "running",
-            "output": f"Iniciando execução do playbook: {playbook_path}\nHosts: {', '.join(hosts)}\n\n",
-            "progress": 0,
-            "start_time": datetime.now()
+        if not job.get("config_path"):
+            config = configparser.ConfigParser(interpolation=None)
+            for section, options in settings.items():
+                config[section] = {name: str(value) for name, value in options.items()}
+            os.makedirs(JOB_CONFIG_DIR, exist_ok=True)
+            config_path = os.path.join(JOB_CONFIG_DIR, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', job_id)}.cfg")
+            with open(config_path, 'w') as f:
+                config.write(f)
+            job["config_path"] = config_path
+            job["output"].append(f"Perfil de execução: {job['profile']} ({config_path})\n")
+        return job["config_path"]
+    
+    def _run_job(self, job_id: str, run):
+        """Executa o corpo de um job e sempre o finaliza no histórico"""
+        try:
+            if self.running_playbooks.get(job_id, {}).get("status") == "cancelled":
+                return
+            run()
+        finally:
+            self._finalize_job(job_id)
+    
+    def _finalize_job(self, job_id: str):
+        """Grava o estado final e a saída do job no histórico e o remove da memória"""
+        job = self.running_playbooks.get(job_id)
+        if job is None:
+            return
+        if job.get("status") in ACTIVE_JOB_STATUSES:
+            job["status"] = "failed"
+        if job.get("config_path"):
+            try:
+                os.remove(job["config_path"])
+            except OSError:
+                pass
+        try:
+            # Um job perdido já foi finalizado por outro processo, que mantém o histórico
+            if job.get("lost") or not self.job_store.finish(
+                job_id, job["status"], job.get("progress", 0), str(job["output"]), job.get("hosts_status"),
+                owner=self.scheduler.worker_id()
+            ):
+                logger.warning(f"Job {job_id} não pertence mais a este worker; resultado local descartado")
+            self.running_playbooks.pop(job_id, None)
+            self._published.pop(job_id, None)
+        except Exception as e:
+            # Sem histórico gravado, o job permanece em memória para não perder a saída
+            logger.error(f"Erro ao gravar o job {job_id} no histórico: {str(e)}", exc_info=True)
+    
+    def _run_baseline_parallel(self, job_id: str, playbook_path: str, hosts: list, hosts_config: dict, width: int):
+        """
+        Executa o baseline em vários hosts ao mesmo tempo, um ansible-playbook por host.
+        Cada linha de saída recebe o prefixo [host]; progresso e status são calculados por host,
+        e a falha de um host não atrasa nem interrompe os demais.
+        
+        Args:
+            job_id (str): ID do job
+            playbook_path (str): Playbook de baseline
+            hosts (list): Hosts selecionados
+            hosts_config (dict): Variáveis de cada host (hostname -> dict)
+            width (int): Quantidade de hosts executados simultaneamente
+        """
+        job = self.running_playbooks[job_id]
+        output = job["output"]
+        job["hosts_status"] = {
+            hostname: {"status": "queued" if hosts_config.get(hostname) else "skipped", "exit_code": None}
+            for hostname in hosts
         }
+        targets = [h for h, st in job["hosts_status"].items() if st["status"] == "queued"]
+        width = max(1, min(width, len(targets)))
+        lock = threading.Lock()
         
-        # Executar em thread separada
-        thread = threading.Thread(target=run)
-        thread.daemon = True
-        thread.start()
+        output.append(f"\n==== EXECUTANDO BASELINE EM {len(hosts)} HOSTS ({width} EM PARALELO) ====\n")
         
-        return job_id
+        def update_progress():
+            done = sum(1 for h in job["hosts_status"].values() if h["status"] not in ("queued", "running"))
+            job["progress"] = min(95, done * 95 / len(hosts))
+        
+        def run_host(hostname):
+            host_status = job["hosts_status"][hostname]
+            if job["status"] == "cancelled":
+                host_status["status"] = "cancelled"
+                return
+            
+            # As variáveis do host vão só para o runner (podem conter segredos)
+            logger.info(f"Executando baseline {playbook_path} no host {hostname} (job_id: {job_id})")
+            output.append(f"[{hostname}] Iniciando baseline\n")
+            host_status["status"] = "running"
+            
+            def on_event(event):
+                # Cada linha entra inteira no buffer, com o prefixo do host
+                for line in (event.get("stdout") or "").splitlines():
+                    if line.strip():
+                        output.append(f"[{hostname}] {line}\n")
+                if event.get("event") == "playbook_on_stats":
+                    host_status["stats"] = self._stats_by_host(event.get("event_data") or {}).get(hostname)
+                return False
+            
+            try:
+                runner = self._run_ansible(job_id, playbook_path, hostname, hosts_config[hostname], on_event)
+                host_status["exit_code"] = runner.rc
+                if runner.status == "canceled":
+                    host_status["status"] = "cancelled"
+                else:
+                    host_status["status"] = "ok" if runner.rc == 0 else "failed"
+            except Exception as e:
+                logger.error(f"Erro no baseline do host {hostname}: {str(e)}", exc_info=True)
+                output.append(f"[{hostname}] Erro: {str(e)}\n")
+                host_status["status"] = "failed"
+            finally:
+                with lock:
+                    update_progress()
+                output.append(f"[{hostname}] ==== HOST {hostname}: {host_status['status'].upper()} ====\n")
+        
+        for hostname, host_status in job["hosts_status"].items():
+            if host_status["status"] == "skipped":
+                logger.warning(f"Configuração não encontrada para o host {hostname}")
+                output.append(f"[{hostname}] Configuração não encontrada, host ignorado\n")
+        
+        with ThreadPoolExecutor(max_workers=width, thread_name_prefix=f"baseline-{job_id}") as executor:
+            list(executor.map(run_host, targets))
+        
+        # Resumo final por host
+        summary = {}
+        for host_status in job["hosts_status"].values():
+            summary[host_status["status"]] = summary.get(host_status["status"], 0) + 1
+        output.append(
+            "\n\n==== BASELINE CONCLUÍDO: "
+            + ", ".join(f"{status}={count}" for status, count in sorted(summary.items()))
+            + " ====\n"
+        )
+        if job["status"] != "cancelled":
+            job["status"] = "failed" if summary.get("failed") else "completed"
+        job["progress"] = 100
     
     def cancel_playbook(self, job_id: str) -> bool:
-        if job_id in self.running_playbooks:
-            self.running_playbooks[job_id]["status"] = "cancelled"
-            return True
-        return False
+        job = self.running_playbooks.get(job_id)
+        if job is not None:
+            job["status"] = "cancelled"
+        # Jobs na fila são finalizados no banco; jobs de outros processos são cancelados pelo dono
+        return self.job_store.request_cancel(job_id) or job is not None
 
 
 ansible_mgr = AnsibleManager()
-def cancel_playbook(self, job_id: str) -> bool:
+
+
+class HostProbeEngine:
+    """
+    Motor de sondagem de hosts com concorrência limitada.
+    Distribui o teste de conectividade e a coleta de fatos entre um pool de workers
+    e entrega o resultado de cada host assim que ele termina.
     """
-    Cancela a execução de um playbook em andamento.
     
-    Args:
-        job_id (str): ID do job a ser cancelado
+    def __init__(self, manager, max_workers: int = PROBE_MAX_WORKERS, host_timeout: float = PROBE_HOST_TIMEOUT):
+        """
+        Args:
+            manager (AnsibleManager): Gerenciador usado para testar e coletar fatos
+            max_workers (int): Número máximo de hosts sondados ao mesmo tempo
+            host_timeout (float): Prazo em segundos para cada host
+        """
+        self.manager = manager
+        self.max_workers = max(1, max_workers)
+        self.host_timeout = max(1.0, host_timeout)
     
-    Returns:
-        bool: True se o cancelamento foi bem-sucedido, False caso contrário
+    def iter_probe(self, hosts: dict, max_workers: int = None, host_timeout: float = None, batch_facts: bool = True):
+        """
+        Sonda os hosts em paralelo e gera os resultados na ordem em que terminam.
+        
+        Com batch_facts=True (padrão) o teste de conectividade roda no ReachabilityProber
+        (conexões TCP assíncronas, sem pool de threads); os hosts inacessíveis são entregues
+        na hora e os fatos dos acessíveis são coletados em uma única execução do Ansible
+        (gather_facts_batch). Com batch_facts=False cada host executa seu próprio
+        ansible-playbook dentro do pool.
+        
+        Args:
+            hosts (dict): Hosts no formato retornado por load_inventory()
+            max_workers (int): Sobrescreve o limite de concorrência padrão
+            host_timeout (float): Sobrescreve o prazo por host padrão
+            batch_facts (bool): Coleta os fatos em lote em vez de um playbook por host
+        
+        Yields:
+            tuple: (hostname, {"valid": bool, "facts": dict, "reachability": dict})
+        """
+        if not hosts:
+            return
+        
+        workers = max(1, min(max_workers or self.max_workers, len(hosts)))
+        timeout = max(1.0, host_timeout or self.host_timeout)
+        
+        def failure(hostname, error):
+            return {
+                "valid": False,
+                "facts": self.manager.default_host_facts(hostname, hosts[hostname]),
+                "error": error
+            }
+        
+        if not batch_facts:
+            yield from self._iter_pool(
+                lambda hostname, info: self.manager.probe_host(hostname, info, timeout),
+                hosts, workers, timeout, failure
+            )
+            return
+        
+        # Fase 1: conectividade de todos os hosts em um único event loop (TCP na porta SSH/WinRM)
+        reachable, reachability = {}, {}
+        connect_timeout = min(PROBE_CONNECT_TIMEOUT, timeout)
+        for hostname, status in self.manager.prober.iter_probe(hosts, connect_timeout):
+            reachability[hostname] = status
+            if status["reachable"]:
+                reachable[hostname] = hosts[hostname]
+            else:
+                yield hostname, {
+                    "valid": False,
+                    "facts": self.manager.default_host_facts(hostname, hosts[hostname]),
+                    "reachability": status
+                }
+        
+        if not reachable:
+            return
+        
+        # Fase 2: uma única execução do Ansible (por SO) para todos os hosts acessíveis
+        waves = -(-len(reachable) // max(1, FACTS_BATCH_FORKS))
+        try:
+            batch = self.manager.gather_facts_batch(list(reachable), timeout=waves * timeout)
+        except Exception as e:
+            logger.error(f"Erro na coleta de fatos em lote: {str(e)}", exc_info=True)
+            batch = {}
+        
+        for hostname, info in reachable.items():
+            entry = batch.get(hostname) or {}
+            facts = self.manager.merge_host_facts(
+                self.manager.default_host_facts(hostname, info),
+                entry.get("facts")
+            )
+            yield hostname, {
+                "valid": True,
+                "facts": facts,
+                "reachability": reachability[hostname]
+            }
+    
+    def _iter_pool(self, func, hosts: dict, workers: int, timeout: float, on_failure):
+        """
+        Executa func(hostname, info) para cada host em um pool limitado e gera os
+        resultados à medida que ficam prontos. Hosts que falham ou estouram o prazo
+        recebem on_failure(hostname, erro).
+        """
+        # Os hosts além do limite esperam na fila, então o prazo global cobre todas as "ondas"
+        waves = -(-len(hosts) // workers)
+        overall_timeout = waves * timeout + 5
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="host-probe")
+        futures = {
+            executor.submit(func, hostname, info): hostname
+            for hostname, info in hosts.items()
+        }
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=overall_timeout):
+                pending.discard(future)
+                hostname = futures[future]
+                try:
+                    yield hostname, future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao sondar host {hostname}: {str(e)}", exc_info=True)
+                    yield hostname, on_failure(hostname, str(e))
+        except FuturesTimeoutError:
+            logger.warning(f"Tempo limite da sondagem excedido, {len(pending)} host(s) sem resposta")
+            for future in pending:
+                yield futures[future], on_failure(futures[future], "timeout")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def probe_all(self, hosts: dict, max_workers: int = None, host_timeout: float = None, batch_facts: bool = True) -> dict:
+        """Sonda todos os hosts e retorna um dicionário hostname -> resultado"""
+        return dict(self.iter_probe(hosts, max_workers, host_timeout, batch_facts))
+
+
+probe_engine = HostProbeEngine(ansible_mgr)
+
+
+class HostFactsCache:
     """
-    try:
-        if job_id not in self.running_playbooks:
-            logger.warning(f"Job {job_id} não encontrado para cancelamento")
-            return False
+    Cache persistente dos fatos de cada host, com TTL e semântica stale-while-revalidate.
+    As leituras nunca bloqueiam em SSH/WinRM: entradas ausentes ou vencidas são devolvidas
+    como estão e a atualização é feita por uma thread em segundo plano.
+    """
+    
+    def __init__(self, manager, engine, cache_path: str, ttl: float = FACTS_CACHE_TTL,
+                 refresh_interval: float = FACTS_REFRESH_INTERVAL):
+        """
+        Args:
+            manager (AnsibleManager): Fonte do inventário e dos fatos padrão
+            engine (HostProbeEngine): Motor usado para atualizar os fatos
+            cache_path (str): Arquivo JSON onde o cache é persistido
+            ttl (float): Segundos até uma entrada ser considerada vencida
+            refresh_interval (float): Intervalo entre as varreduras da thread de atualização
+        """
+        self.manager = manager
+        self.engine = engine
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._entries = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._refreshing = set()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._load()
+    
+    def _load(self):
+        """Carrega o cache do disco, se existir"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r') as f:
+                    self._entries = json.load(f).get('hosts', {})
+                logger.info(f"Cache de fatos carregado com {len(self._entries)} host(s)")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de fatos: {str(e)}")
+            self._entries = {}
+    
+    def save(self):
+        """Grava o cache no disco de forma atômica"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with self._lock:
+                data = json.dumps({'hosts': self._entries}, indent=2)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de fatos: {str(e)}")
+    
+    def _is_stale(self, entry: dict) -> bool:
+        return time.time() - entry.get('updated_at', 0) > self.ttl
+    
+    def start(self):
+        """Inicia a thread de atualização em segundo plano (apenas uma vez)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name="facts-refresher", daemon=True)
+            self._thread.start()
+        logger.info("Thread de atualização do cache de fatos iniciada")
+    
+    def snapshot(self, hosts: dict) -> dict:
+        """
+        Retorna imediatamente o estado em cache de todos os hosts informados.
+        Hosts sem entrada ou com entrada vencida são agendados para atualização.
         
-        # Marca o status como cancelado
-        self.running_playbooks[job_id]["status"] = "cancelled"
+        Args:
+            hosts (dict): Hosts no formato retornado por load_inventory()
         
-        # Encontrar o processo do Ansible associado ao job
-        if hasattr(subprocess.Popen, 'running_processes'):
-            for process in subprocess.Popen.running_processes:
-                if hasattr(process, 'job_id') and process.job_id == job_id:
-                    try:
-                        # Enviar sinal para interromper o processo
-                        os.kill(process.pid, signal.SIGINT)
-                        logger.info(f"Processo do Ansible para job {job_id} interrompido")
-                        subprocess.Popen.running_processes.remove(process)
-                    except ProcessLookupError:
-                        logger.warning(f"Processo do job {job_id} não encontrado")
-                    except Exception as e:
-                        logger.error(f"Erro ao interromper processo do job {job_id}: {str(e)}")
+        Returns:
+            dict: hostname -> {"valid", "facts", "updated_at", "stale"}
+        """
+        self.start()
+        result = {}
+        to_refresh = []
+        with self._lock:
+            for hostname, info in hosts.items():
+                entry = self._entries.get(hostname)
+                if entry is None:
+                    to_refresh.append(hostname)
+                    result[hostname] = {
+                        "valid": False,
+                        "facts": self.manager.default_host_facts(hostname, info),
+                        "updated_at": None,
+                        "stale": True,
+                        "pending": True
+                    }
+                    continue
+                stale = self._is_stale(entry)
+                if stale:
+                    to_refresh.append(hostname)
+                result[hostname] = dict(entry, stale=stale)
         
-        return True
+        if to_refresh:
+            self.request_refresh(to_refresh)
+        return result
     
-    except Exception as e:
-        logger.error(f"Erro ao cancelar job {job_id}: {str(e)}")
-        return False
+    def revision(self, hosts: dict) -> tuple:
+        """
+        Versão do snapshot desses hosts neste processo: muda quando uma entrada é gravada
+        ou removida e quando alguma vence. Hosts vencidos são atualizados pela thread.
+        """
+        self.start()
+        with self._lock:
+            stale = sum(1 for h in hosts if h not in self._entries or self._is_stale(self._entries[h]))
+            return os.getpid(), self.version, stale
     
+    def get(self, hostname: str, info: dict) -> dict:
+        """Retorna a entrada de um único host (ver snapshot)"""
+        return self.snapshot({hostname: info})[hostname]
+    
+    def store(self, hostname: str, result: dict, persist: bool = True):
+        """Grava o resultado de uma sondagem no cache"""
+        with self._lock:
+            self._entries[hostname] = {
+                "valid": result.get("valid", False),
+                "facts": result.get("facts", {}),
+                "reachability": result.get("reachability"),
+                "updated_at": time.time()
+            }
+            self.version += 1
+        if persist:
+            self.save()
+    
+    def invalidate(self, hostname: str):
+        """Remove um host do cache (chamado quando o host é adicionado, alterado ou removido)"""
+        with self._lock:
+            removed = self._entries.pop(hostname, None) is not None
+            self._pending.discard(hostname)
+            self.version += removed
+        if removed:
+            logger.info(f"Cache de fatos invalidado para {hostname}")
+            self.save()
+    
+    def request_refresh(self, hostnames):
+        """Agenda a atualização dos hosts na thread de segundo plano"""
+        with self._lock:
+            self._pending.update(hostnames)
+        self.start()
+        self._wakeup.set()
+    
+    def refresh(self, hosts: dict) -> dict:
+        """
+        Atualiza os hosts informados de forma síncrona e grava o resultado no cache.
+        
+        Args:
+            hosts (dict): Hosts no formato retornado por load_inventory()
+        
+        Returns:
+            dict: hostname -> resultado da sondagem
+        """
+        results = {}
+        for hostname, host_result in self.engine.iter_probe(hosts):
+            self.store(hostname, host_result, persist=False)
+            results[hostname] = host_result
+        self.save()
+        return results
+    
+    def _refresh_loop(self):
+        """Mantém o cache aquecido: atualiza hosts pendentes e vencidos periodicamente"""
+        while True:
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            try:
+                inventory = self.manager.load_inventory()
+                with self._lock:
+                    # Remove do cache hosts que saíram do inventário
+                    for hostname in [h for h in self._entries if h not in inventory]:
+                        del self._entries[hostname]
+                        self.version += 1
+                    due = {
+                        h for h in inventory
+                        if h in self._pending or h not in self._entries or self._is_stale(self._entries[h])
+                    } - self._refreshing
+                    self._pending.clear()
+                    self._refreshing.update(due)
+                
+                if due:
+                    logger.info(f"Atualizando cache de fatos para {len(due)} host(s)")
+                    try:
+                        self.refresh({h: inventory[h] for h in due})
+                    finally:
+                        with self._lock:
+                            self._refreshing.difference_update(due)
+            except Exception as e:
+                logger.error(f"Erro na atualização do cache de fatos: {str(e)}", exc_info=True)
+
+
+facts_cache = HostFactsCache(ansible_mgr, probe_engine, os.path.join(CACHE_DIR, 'host_facts.json'))
 @app.route('/debug-inventory', methods=['GET'])
 def debug_inventory():
     """Função para depurar o inventário e verificar problemas."""
@@ -2523,21 +5853,8 @@ def debug_inventory():
                 'content': inventory_data
             }), 400
         
-        # Testar o arquivo de inventário com ansible-inventory
-        try:
-            process = subprocess.run(
-                ['ansible-inventory', '-i', inventory_path, '--list'], 
-                capture_output=True, 
-                text=True, 
-                check=False
-            )
-            ansible_inventory_output = process.stdout
-            ansible_inventory_error = process.stderr
-            ansible_inventory_exit_code = process.returncode
-        except Exception as e:
-            ansible_inventory_output = ""
-            ansible_inventory_error = str(e)
-            ansible_inventory_exit_code = -1
+        # Testar o arquivo de inventário com ansible-inventory (em cache pelo conteúdo)
+        inventory_check = ansible_mgr.inventory_check()
         
         # Retornar informações detalhadas para depuração
         return jsonify({
@@ -2554,9 +5871,10 @@ def debug_inventory():
             },
             'ansible_hosts': ansible_hosts,
             'ansible_inventory_test': {
-                'output': ansible_inventory_output,
-                'error': ansible_inventory_error,
-                'exit_code': ansible_inventory_exit_code
+                'output': inventory_check['output'],
+                'error': inventory_check['error'],
+                'exit_code': inventory_check['exit_code'],
+                'cached': inventory_check['cached']
             },
             'raw_content': inventory_content,
             'parsed_content': inventory_data
@@ -2627,21 +5945,9 @@ def validate_playbook():
                 'content': playbook_path
             }), 400
         
-        # Testar o playbook com ansible-playbook --syntax-check
-        try:
-            process = subprocess.run(
-                ['ansible-playbook', '--syntax-check', playbook_path], 
-                capture_output=True, 
-                text=True, 
-                check=False
-            )
-            syntax_check_output = process.stdout
-            syntax_check_error = process.stderr
-            syntax_check_exit_code = process.returncode
-        except Exception as e:
-            syntax_check_output = ""
-            syntax_check_error = str(e)
-            syntax_check_exit_code = -1
+        # Testar o playbook com ansible-playbook --syntax-check (em cache pelo conteúdo)
+        syntax_check = ansible_mgr.syntax_check(playbook_path)
+        syntax_check_exit_code = syntax_check['exit_code']
         
         # Retornar informações detalhadas
         return jsonify({
@@ -2656,9 +5962,10 @@ def validate_playbook():
                 'hosts_patterns': hosts_patterns
             },
             'syntax_check': {
-                'output': syntax_check_output,
-                'error': syntax_check_error,
-                'exit_code': syntax_check_exit_code
+                'output': syntax_check['output'],
+                'error': syntax_check['error'],
+                'exit_code': syntax_check_exit_code,
+                'cached': syntax_check['cached']
             },
             'raw_content': playbook_content,
             'parsed_content': playbook_data
@@ -2698,10 +6005,10 @@ def run_playbook(self, playbook_path: str, hosts: list) -> str:
         except Exception as e:
             logger.error(f"Erro na execução da playbook: {str(e)}", exc_info=True)
             self.running_playbooks[job_id]["status"] = "failed"
-            self.running_playbooks[job_id]["output"] += f"\nErro: {str(e)}"
+            self.running_playbooks[job_id]["output"].append(f"\nErro: {str(e)}")
     self.running_playbooks[job_id] = {
         "status": "running",
-        "output": "",
+        "output": JobOutputBuffer(),
         "progress": 0,
         "start_time": datetime.now()
     }
@@ -2713,65 +6020,336 @@ def run_playbook(self, playbook_path: str, hosts: list) -> str:
 
 
 # Funções auxiliares para gerenciamento de inventário
+def _load_legacy_servers():
+    """Lê os servidores do inventory.json (ou, na falta dele, do inventory.yml) para a migração"""
+    inventory_json_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.json')
+    if os.path.exists(inventory_json_path):
+        with open(inventory_json_path, 'r') as file:
+            return json.load(file).get('servers', [])
+    
+    linux_hosts, windows_hosts = parse_inventory()
+    servers = []
+    for host in linux_hosts:
+        servers.append(parse_server_line(host, 'linux'))
+    for host in windows_hosts:
+        servers.append(parse_server_line(host, 'windows'))
+    return servers
+
+def _host_os_info(host):
+    """Tipo, distribuição e versão do sistema de um servidor (aceita o formato combinado linux-ubuntu-22.04)"""
+    os_value = host.get('os', 'linux') or 'linux'
+    os_info = {'os_type': 'linux', 'os_distribution': 'ubuntu', 'os_version': '22.04'}
+    
+    if '-' in os_value:
+        parts = os_value.split('-')
+        if len(parts) >= 3:
+            os_info = {
+                'os_type': parts[0],
+                'os_distribution': parts[1],
+                'os_version': '-'.join(parts[2:])
+            }
+    else:
+        os_info['os_type'] = os_value
+        if 'os_distribution' in host:
+            os_info['os_distribution'] = host['os_distribution']
+        if 'os_version' in host:
+            os_info['os_version'] = host['os_version']
+    return os_info
+
+class InventoryStore:
+    """
+    Fonte única do inventário, em SQLite.
+    Cada servidor é uma linha indexada por IP, sistema/distribuição e grupo; as credenciais
+    ficam numa tabela própria referenciada pelo host. O inventory.yml e o script de inventário
+    dinâmico (dynamic_inventory.py) são gerados a partir daqui.
+    Na primeira execução os dados são migrados do inventory.json.
+    """
+    
+    SECRET_FIELDS = ('ssh_pass', 'windows_password', 'ssh_key_content')
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._init_schema()
+        self._migrate()
+    
+    @property
+    def version(self) -> int:
+        """Versão do inventário, incrementada no banco a cada apply (vale para todos os processos)"""
+        with closing(self._connect()) as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_schema(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS hosts (
+                    host TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    os_type TEXT NOT NULL,
+                    os_distribution TEXT,
+                    os_version TEXT,
+                    ssh_user TEXT,
+                    data TEXT NOT NULL,
+                    source_hash TEXT,
+                    host_vars TEXT,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_hosts_position ON hosts(position);
+                CREATE INDEX IF NOT EXISTS idx_hosts_os ON hosts(os_type, os_distribution, os_version);
+                -- Filtros só por distribuição ou só por versão não usam o índice composto
+                CREATE INDEX IF NOT EXISTS idx_hosts_distribution ON hosts(os_distribution, os_version);
+                CREATE INDEX IF NOT EXISTS idx_hosts_version ON hosts(os_version);
+                CREATE TABLE IF NOT EXISTS credentials (
+                    host TEXT PRIMARY KEY,
+                    secrets TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS host_groups (
+                    host TEXT NOT NULL,
+                    group_name TEXT NOT NULL,
+                    PRIMARY KEY (host, group_name)
+                );
+                CREATE INDEX IF NOT EXISTS idx_host_groups_group ON host_groups(group_name);
+            """)
+    
+    def _migrate(self):
+        """Importa o inventário legado se o banco ainda estiver vazio"""
+        if self.count():
+            return
+        try:
+            servers = _load_legacy_servers()
+        except Exception as e:
+            logger.error(f"Erro ao ler inventário legado para migração: {str(e)}", exc_info=True)
+            return
+        if servers:
+            self.apply({server['host']: server for server in servers if server.get('host')})
+            logger.info(f"Inventário migrado para o banco: {len(servers)} servidor(es)")
+    
+    def _row_to_server(self, row, secrets_json) -> dict:
+        server = json.loads(row["data"])
+        if secrets_json:
+            server.update(json.loads(secrets_json))
+        return server
+    
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM hosts").fetchone()[0]
+    
+    def all(self) -> list:
+        """Todos os servidores (com credenciais), na ordem de inclusão"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT h.data, c.secrets FROM hosts h LEFT JOIN credentials c ON c.host = h.host ORDER BY h.position"
+            ).fetchall()
+        return [self._row_to_server(row, row["secrets"]) for row in rows]
+    
+    def get(self, ip: str) -> dict:
+        """Um servidor pelo IP ou None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT h.data, c.secrets FROM hosts h LEFT JOIN credentials c ON c.host = h.host WHERE h.host = ?",
+                (ip,)
+            ).fetchone()
+        return self._row_to_server(row, row["secrets"]) if row else None
+    
+    def find(self, os_type: str = None, distribution: str = None, version: str = None, group: str = None) -> list:
+        """Servidores filtrados por sistema, distribuição, versão e/ou grupo (consultas indexadas)"""
+        clauses, params = [], []
+        if os_type:
+            clauses.append("h.os_type = ?")
+            params.append(os_type.lower())
+        if distribution:
+            clauses.append("h.os_distribution = ?")
+            params.append(distribution.lower())
+        if version:
+            clauses.append("h.os_version = ?")
+            params.append(version)
+        if group:
+            clauses.append("h.host IN (SELECT host FROM host_groups WHERE group_name = ?)")
+            params.append(group)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT h.data, c.secrets FROM hosts h LEFT JOIN credentials c ON c.host = h.host {where} ORDER BY h.position",
+                params
+            ).fetchall()
+        return [self._row_to_server(row, row["secrets"]) for row in rows]
+    
+    def apply(self, changes: dict):
+        """
+        Aplica inclusões/alterações e remoções numa única transação.
+        
+        Args:
+            changes (dict): ip -> dados do servidor, ou ip -> None para remover
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            position = conn.execute("SELECT COALESCE(MAX(position), 0) FROM hosts").fetchone()[0]
+            for ip, server in changes.items():
+                if server is None:
+                    for table in ("hosts", "credentials", "host_groups"):
+                        conn.execute(f"DELETE FROM {table} WHERE host = ?", (ip,))
+                    continue
+                
+                os_info = _host_os_info(server)
+                data = {k: v for k, v in server.items() if k not in self.SECRET_FIELDS}
+                secrets = {k: server[k] for k in self.SECRET_FIELDS if k in server}
+                existing = conn.execute("SELECT position FROM hosts WHERE host = ?", (ip,)).fetchone()
+                if existing:
+                    conn.execute(
+                        "UPDATE hosts SET os_type = ?, os_distribution = ?, os_version = ?, ssh_user = ?, "
+                        "data = ?, updated_at = ? WHERE host = ?",
+                        (os_info['os_type'].lower(), str(os_info['os_distribution']).lower(), str(os_info['os_version']),
+                         server.get('ssh_user', ''), json.dumps(data), now, ip)
+                    )
+                else:
+                    position += 1
+                    conn.execute(
+                        "INSERT INTO hosts (host, position, os_type, os_distribution, os_version, ssh_user, data, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (ip, position, os_info['os_type'].lower(), str(os_info['os_distribution']).lower(),
+                         str(os_info['os_version']), server.get('ssh_user', ''), json.dumps(data), now)
+                    )
+                conn.execute("INSERT OR REPLACE INTO credentials (host, secrets) VALUES (?, ?)", (ip, json.dumps(secrets)))
+            # Dentro da transação de escrita: o incremento não se perde entre processos
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+    
+    def rendered(self) -> dict:
+        """Blocos já renderizados do inventory.yml (ip -> (hash da origem, grupo, variáveis))"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT h.host, h.source_hash, h.host_vars, g.group_name FROM hosts h "
+                "LEFT JOIN host_groups g ON g.host = h.host WHERE h.source_hash IS NOT NULL"
+            ).fetchall()
+        return {
+            row["host"]: (row["source_hash"], row["group_name"], json.loads(row["host_vars"]) if row["host_vars"] else None)
+            for row in rows
+        }
+    
+    def save_rendered(self, rendered: dict):
+        """Grava o bloco renderizado e o grupo de cada host (usados pelo inventário dinâmico)"""
+        if not rendered:
+            return
+        with closing(self._connect()) as conn, conn:
+            for ip, (source_hash, group, host_vars) in rendered.items():
+                conn.execute(
+                    "UPDATE hosts SET source_hash = ?, host_vars = ? WHERE host = ?",
+                    (source_hash, json.dumps(host_vars) if host_vars is not None else None, ip)
+                )
+                conn.execute("DELETE FROM host_groups WHERE host = ?", (ip,))
+                if group:
+                    conn.execute("INSERT INTO host_groups (host, group_name) VALUES (?, ?)", (ip, group))
+
+inventory_store = InventoryStore(INVENTORY_DB_PATH)
+
 def get_current_hosts():
     """Obtém a lista de hosts atual do sistema"""
     try:
-        inventory_json_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.json')
-        if os.path.exists(inventory_json_path):
-            with open(inventory_json_path, 'r') as file:
-                return json.load(file).get('servers', [])
-        
-        linux_hosts, windows_hosts = parse_inventory()
-        servers = []
-        for host in linux_hosts:
-            servers.append(parse_server_line(host, 'linux'))
-        for host in windows_hosts:
-            servers.append(parse_server_line(host, 'windows'))
-        
-        with open(inventory_json_path, 'w') as file:
-            json.dump({'servers': servers}, file, indent=2)
-        
-        return servers
+        return inventory_store.all()
     except Exception as e:
         logger.error(f"Erro ao buscar hosts: {str(e)}")
         return []
 
-def add_host(host_data):
-    """Adiciona um novo host ao sistema"""
-    try:
-        inventory_json_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.json')
-        
-        if os.path.exists(inventory_json_path):
-            with open(inventory_json_path, 'r') as file:
-                inventory = json.load(file)
-        else:
-            inventory = {'servers': []}
-        
-        # Certifique-se de que todos os campos necessários estão presentes
-        if 'host' not in host_data:
+class InventoryBatch:
+    """
+    Transação de alterações no inventário.
+    As operações (add/update/remove) são acumuladas em memória e, ao final do bloco "with",
+    aplicadas no banco do inventário numa única transação; o inventory.yml é regenerado
+    uma única vez. Se ocorrer uma exceção dentro do bloco, nada é gravado.
+    
+    Exemplo:
+        with InventoryBatch() as batch:
+            for server in servers:
+                batch.add(server)
+    """
+    
+    # Serializa as transações para que duas requisições não sobrescrevam uma à outra
+    _lock = threading.RLock()
+    
+    def __init__(self, store=None):
+        self.store = store or inventory_store
+        self.changed = set()
+        self.total = None
+        self._pending = {}
+    
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and self._pending:
+                self.commit()
+        finally:
+            self._lock.release()
+        return False
+    
+    def _current(self, ip: str):
+        if ip in self._pending:
+            return self._pending[ip]
+        return self.store.get(ip)
+    
+    def add(self, host_data: dict) -> bool:
+        """Adiciona um host (ou atualiza os campos informados, se ele já existir)"""
+        ip = host_data.get('host')
+        if not ip:
             logger.error("Dados do host não contêm o campo 'host'")
             return False
-            
-        # Verifique se não há host duplicado
-        for existing_host in inventory['servers']:
-            if existing_host['host'] == host_data['host']:
-                logger.warning(f"Host {host_data['host']} já existe no inventário")
-                # Atualize o host existente em vez de adicionar um novo
-                existing_host.update(host_data)
-                break
+        current = self._current(ip)
+        if current:
+            logger.warning(f"Host {ip} já existe no inventário")
+            merged = dict(current)
+            merged.update(host_data)
+            self._pending[ip] = merged
         else:
-            # Adiciona o novo host se não existir
-            inventory['servers'].append(host_data)
-            logger.info(f"Host adicionado: {host_data['host']}")
-        
-        # Salva o arquivo JSON atualizado
-        with open(inventory_json_path, 'w') as file:
-            json.dump(inventory, file, indent=2)
-        
-        # Atualiza o arquivo de inventário YAML
-        update_inventory_file()
-        
+            self._pending[ip] = dict(host_data)
+            logger.info(f"Host adicionado: {ip}")
+        self.changed.add(ip)
+        return True
+    
+    def update(self, host_data: dict) -> bool:
+        """Substitui os dados de um host existente; retorna False se ele não existir"""
+        ip = host_data.get('host')
+        if not ip or not self._current(ip):
+            return False
+        self._pending[ip] = dict(host_data)
+        self.changed.add(ip)
+        logger.info(f"Host atualizado: {ip}")
+        return True
+    
+    def remove(self, ip: str) -> bool:
+        """Remove um host; retorna False se ele não existir"""
+        if not self._current(ip):
+            return False
+        self._pending[ip] = None
+        self.changed.add(ip)
+        logger.info(f"Host removido: {ip}")
         return True
+    
+    def commit(self):
+        """Aplica as alterações no banco numa única transação e regenera o inventory.yml uma única vez"""
+        self.store.apply(self._pending)
+        self._pending = {}
+        
+        servers = self.store.all()
+        self.total = len(servers)
+        if not update_inventory_file(servers):
+            raise RuntimeError("Falha ao atualizar o arquivo inventory.yml")
+        for ip in self.changed:
+            facts_cache.invalidate(ip)
+        logger.info(f"Inventário gravado: {len(self.changed)} host(s) alterado(s), {self.total} no total")
+
+def add_host(host_data):
+    """Adiciona um novo host ao sistema"""
+    try:
+        with InventoryBatch() as batch:
+            return batch.add(host_data)
     except Exception as e:
         logger.error(f"Erro ao adicionar host: {str(e)}")
         return False
@@ -2779,26 +6357,8 @@ def add_host(host_data):
 def update_host(host_data):
     """Atualiza um host existente"""
     try:
-        inventory_json_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.json')
-        
-        if os.path.exists(inventory_json_path):
-            with open(inventory_json_path, 'r') as file:
-                inventory = json.load(file)
-            
-            for i, host in enumerate(inventory['servers']):
-                if host['host'] == host_data['host']:
-                    inventory['servers'][i] = host_data
-                    break
-            
-            with open(inventory_json_path, 'w') as file:
-                json.dump(inventory, file, indent=2)
-            
-            update_inventory_file()
-            
-            logger.info(f"Host atualizado: {host_data['host']}")
-            return True
-        
-        return False
+        with InventoryBatch() as batch:
+            return batch.update(host_data)
     except Exception as e:
         logger.error(f"Erro ao atualizar host: {str(e)}")
         return False
@@ -2806,23 +6366,9 @@ def update_host(host_data):
 def remove_host(ip):
     """Remove um host do sistema"""
     try:
-        inventory_json_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.json')
-        
-        if os.path.exists(inventory_json_path):
-            with open(inventory_json_path, 'r') as file:
-                inventory = json.load(file)
-            
-            inventory['servers'] = [host for host in inventory['servers'] if host['host'] != ip]
-            
-            with open(inventory_json_path, 'w') as file:
-                json.dump(inventory, file, indent=2)
-            
-            update_inventory_file()
-            
-            logger.info(f"Host removido: {ip}")
+        with InventoryBatch() as batch:
+            batch.remove(ip)
             return True
-        
-        return False
     except Exception as e:
         logger.error(f"Erro ao remover host: {str(e)}")
         return False
@@ -2881,11 +6427,13 @@ def test_ssh_connection():
                 logger.error(f"Não foi possível corrigir permissões para {key_file}: {str(e)}")
         
         # Testar conexão SSH
+        # Reaproveita a conexão mestra do pool, se houver; sem ela o teste abre uma conexão própria
         cmd = [
             "ssh", 
             "-o", "BatchMode=yes",
             "-o", "StrictHostKeyChecking=no",
             "-o", "ConnectTimeout=10",
+            *ansible_mgr.ssh_pool.client_options(),
             "-v",  # Modo verbose para obter mais informações de diagnóstico
             "-i", key_file,
             f"{username}@{host}",
@@ -2905,6 +6453,8 @@ def test_ssh_connection():
         )
         
         if process.returncode == 0:
+            # Host validado: deixa a conexão mestra pronta para a próxima execução
+            ansible_mgr.ssh_pool.prewarm([host])
             return jsonify({
                 'success': True,
                 'message': 'Conexão SSH bem-sucedida',
@@ -2997,6 +6547,9 @@ def fix_ssh_keys():
             'message': f"Erro: {str(e)}"
         }), 500
         
+# Impressões digitais de chaves já validadas com ssh-keygen (hash do conteúdo -> fingerprint)
+_verified_ssh_keys = {}
+
 def setup_ssh_key(key_content, hostname, username):
     """
     Configura uma chave SSH para uso com Ansible:
@@ -3039,6 +6592,17 @@ def setup_ssh_key(key_content, hostname, username):
         if not key_content.strip().startswith("-----BEGIN"):
             return None, "Formato de chave SSH inválido"
         
+        # Chave já gravada com o mesmo conteúdo e permissões 600: nada a reescrever nem validar
+        key_hash = hashlib.sha256(key_content.encode('utf-8')).hexdigest()
+        try:
+            if os.stat(key_file).st_mode & 0o777 == 0o600:
+                with open(key_file, 'rb') as f:
+                    if hashlib.sha256(f.read()).hexdigest() == key_hash:
+                        logger.debug(f"Chave SSH inalterada para {hostname}: {key_file}")
+                        return str(key_file), None
+        except FileNotFoundError:
+            pass
+        
         # Salvar a chave no arquivo
         with open(key_file, 'w') as f:
             f.write(key_content)
@@ -3067,6 +6631,11 @@ def setup_ssh_key(key_content, hostname, username):
         # Registrar o caminho da chave
         logger.info(f"Chave SSH salva em {key_file} com permissões {file_stat.st_mode & 0o777:o}")
         
+        # Chaves cuja impressão digital já foi verificada não são validadas de novo
+        if key_hash in _verified_ssh_keys:
+            logger.info(f"Chave SSH já validada anteriormente: {_verified_ssh_keys[key_hash]}")
+            return str(key_file), None
+        
         # Testar a chave (opcional)
         try:
             # Comando para testar a existência e leitura da chave
@@ -3085,6 +6654,7 @@ def setup_ssh_key(key_content, hostname, username):
             
             if result.returncode == 0:
                 logger.info(f"Chave SSH validada com sucesso: {result.stdout.strip()}")
+                _verified_ssh_keys[key_hash] = result.stdout.strip()
             else:
                 logger.warning(f"Validação da chave SSH falhou: {result.stderr}")
                 # Não bloqueamos por falha na validação
@@ -3415,12 +6985,97 @@ def save_ssh_key_with_permissions(key_content, hostname):
         return None
     
     
-def update_inventory_file():
-    """Atualiza o arquivo inventory.yml com base nos dados do inventory.json"""
+# Blocos já renderizados do inventory.yml (ip -> (hash da origem, grupo, variáveis do host))
+# e hash do último conteúdo gravado, para regenerar o arquivo de forma incremental
+_rendered_inventory_hosts = {}
+_written_inventory_state = {"hash": None, "signature": None}
+_rendered_inventory_lock = threading.Lock()
+# Emissor YAML em C (libyaml) quando disponível; a saída é idêntica à do emissor em Python
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+def _render_inventory_host(host):
+    """
+    Monta o bloco de um host no inventory.yml.
+    
+    Returns:
+        tuple: (grupo, variáveis do host) ou (None, None) se o sistema não for suportado
+    """
+    ip = host.get('host')
+    os_info = _host_os_info(host)
+    
+    # Linux hosts
+    if os_info['os_type'].lower() == 'linux':
+        host_data = {}
+        
+        # User
+        if host.get('ssh_user'):
+            host_data['ansible_user'] = host['ssh_user']
+        
+        # Password
+        if host.get('ssh_pass'):
+            host_data['ansible_ssh_pass'] = host['ssh_pass']
+            host_data['ansible_become_pass'] = host['ssh_pass']
+            host_data['ansible_become'] = True
+            host_data['ansible_become_method'] = 'sudo'
+        
+        # SSH Key
+        if host.get('ssh_key_content'):
+            key_path, error = setup_ssh_key(
+                host['ssh_key_content'], 
+                ip, 
+                host.get('ssh_user', 'root')
+            )
+            
+            if key_path:
+                host_data['ansible_ssh_private_key_file'] = key_path
+            else:
+                logger.error(f"Erro ao configurar chave SSH para {ip}: {error}")
+        
+        # Python interpreter
+        python_config = get_python_interpreter(os_info['os_distribution'], os_info['os_version'])
+        
+        if 'python_interpreters' in python_config:
+            host_data['python_interpreters'] = python_config['python_interpreters']
+        
+        if 'ansible_python_interpreter' in python_config:
+            host_data['ansible_python_interpreter'] = python_config['ansible_python_interpreter']
+        
+        # OS info
+        host_data['os_distribution'] = os_info['os_distribution']
+        host_data['os_version'] = os_info['os_version']
+        return 'linux', host_data
+    
+    # Windows hosts
+    if os_info['os_type'].lower() == 'windows':
+        host_data = {}
+        
+        if host.get('ssh_user'):
+            host_data['ansible_user'] = host['ssh_user']
+        
+        if host.get('windows_password') or host.get('ssh_pass'):
+            host_data['ansible_password'] = host.get('windows_password') or host.get('ssh_pass')
+        
+        host_data['ansible_connection'] = 'winrm'
+        host_data['ansible_winrm_transport'] = 'ntlm'
+        host_data['ansible_winrm_server_cert_validation'] = 'ignore'
+        return 'windows', host_data
+    
+    return None, None
+
+def update_inventory_file(hosts=None):
+    """
+    Atualiza o arquivo inventory.yml com base no banco do inventário.
+    A regeneração é incremental: só hosts cujos dados mudaram são renderizados de novo
+    (incluindo a gravação da chave SSH), e o arquivo só é reescrito se o conteúdo final mudar.
+    
+    Args:
+        hosts (list): Servidores já carregados (evita reler o banco)
+    """
     global INVENTORY_FILE
     
     try:
-        hosts = get_current_hosts()
+        if hosts is None:
+            hosts = get_current_hosts()
         
         # Estrutura YAML do inventário
         inventory = {
@@ -3430,7 +7085,9 @@ def update_inventory_file():
                         'hosts': {},
                         'vars': {
                             'ansible_connection': 'ssh',
-                            'ansible_port': 22
+                            'ansible_port': 22,
+                            # Multiplexação pelos sockets do pool de conexões SSH
+                            'ansible_ssh_args': ansible_mgr.ssh_pool.ssh_args
                         }
                     },
                     'windows': {
@@ -3446,106 +7103,72 @@ def update_inventory_file():
             }
         }
         
-        # Processar cada host
-        for host in hosts:
-            ip = host.get('host')
-            if not ip:
-                logger.warning(f"Host sem IP encontrado: {host}")
-                continue
-                
-            # Processar OS info
-            os_value = host.get('os', 'linux')
-            os_info = {'os_type': 'linux', 'os_distribution': 'ubuntu', 'os_version': '22.04'}
-            
-            # Extrair informações de OS
-            if '-' in os_value:
-                parts = os_value.split('-')
-                if len(parts) >= 3:
-                    os_info = {
-                        'os_type': parts[0],
-                        'os_distribution': parts[1],
-                        'os_version': '-'.join(parts[2:])
-                    }
-            else:
-                os_info['os_type'] = os_value
-                if 'os_distribution' in host:
-                    os_info['os_distribution'] = host['os_distribution']
-                if 'os_version' in host:
-                    os_info['os_version'] = host['os_version']
-            
-            # Linux hosts
-            if os_info['os_type'].lower() == 'linux':
-                group = 'linux'
-                host_data = {}
-                
-                # User
-                if host.get('ssh_user'):
-                    host_data['ansible_user'] = host['ssh_user']
-                
-                # Password
-                if host.get('ssh_pass'):
-                    host_data['ansible_ssh_pass'] = host['ssh_pass']
-                    host_data['ansible_become_pass'] = host['ssh_pass']
-                    host_data['ansible_become'] = True
-                    host_data['ansible_become_method'] = 'sudo'
-                
-                # SSH Key
-                if host.get('ssh_key_content'):
-                    key_path, error = setup_ssh_key(
-                        host['ssh_key_content'], 
-                        ip, 
-                        host.get('ssh_user', 'root')
-                    )
-                    
-                    if key_path:
-                        host_data['ansible_ssh_private_key_file'] = key_path
-                    else:
-                        logger.error(f"Erro ao configurar chave SSH para {ip}: {error}")
-                
-                # Python interpreter
-                python_config = get_python_interpreter(os_info['os_distribution'], os_info['os_version'])
-                
-                if 'python_interpreters' in python_config:
-                    host_data['python_interpreters'] = python_config['python_interpreters']
-                
-                if 'ansible_python_interpreter' in python_config:
-                    host_data['ansible_python_interpreter'] = python_config['ansible_python_interpreter']
+        with _rendered_inventory_lock:
+            # Após reiniciar, os blocos renderizados vêm do banco do inventário
+            if not _rendered_inventory_hosts:
+                _rendered_inventory_hosts.update(inventory_store.rendered())
+            
+            rendered = {}
+            seen = set()
+            for host in hosts:
+                ip = host.get('host')
+                if not ip:
+                    logger.warning(f"Host sem IP encontrado: {host}")
+                    continue
+                seen.add(ip)
                 
-                # OS info
-                host_data['os_distribution'] = os_info['os_distribution']
-                host_data['os_version'] = os_info['os_version']
+                # Reaproveita o bloco se os dados do host não mudaram (e a chave ainda existe)
+                source_hash = hashlib.sha256(json.dumps(host, sort_keys=True).encode('utf-8')).hexdigest()
+                cached = _rendered_inventory_hosts.get(ip)
+                key_file = cached[2].get('ansible_ssh_private_key_file') if cached and cached[2] else None
+                if not cached or cached[0] != source_hash or (key_file and not os.path.exists(key_file)):
+                    group, host_data = _render_inventory_host(host)
+                    cached = (source_hash, group, host_data)
+                    _rendered_inventory_hosts[ip] = cached
+                    rendered[ip] = cached
                 
-                # Adicionar ao inventário
-                inventory['all']['children'][group]['hosts'][ip] = host_data
+                _, group, host_data = cached
+                if group:
+                    inventory['all']['children'][group]['hosts'][ip] = host_data
+            
+            for ip in set(_rendered_inventory_hosts) - seen:
+                del _rendered_inventory_hosts[ip]
+            inventory_store.save_rendered(rendered)
+            
+            content = (
+                "# Arquivo de Inventário Ansible (YAML)\n"
+                "# Gerado automaticamente pela Automato Platform\n\n"
+                + yaml.dump(inventory, Dumper=_YAML_DUMPER, default_flow_style=False, sort_keys=False)
+            )
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
             
-            # Windows hosts
-            elif os_info['os_type'].lower() == 'windows':
-                group = 'windows'
-                host_data = {}
-                
-                if host.get('ssh_user'):
-                    host_data['ansible_user'] = host['ssh_user']
-                
-                if host.get('windows_password') or host.get('ssh_pass'):
-                    host_data['ansible_password'] = host.get('windows_password') or host.get('ssh_pass')
-                
-                host_data['ansible_connection'] = 'winrm'
-                host_data['ansible_winrm_transport'] = 'ntlm'
-                host_data['ansible_winrm_server_cert_validation'] = 'ignore'
-                
-                inventory['all']['children'][group]['hosts'][ip] = host_data
-        
-        # Salvar o inventário
-        inventory_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.yml')
-        
-        with open(inventory_path, 'w') as file:
-            file.write("# Arquivo de Inventário Ansible (YAML)\n")
-            file.write("# Gerado automaticamente pela Automato Platform\n\n")
-            yaml.dump(inventory, file, default_flow_style=False, sort_keys=False)
+            # Salvar o inventário
+            inventory_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.yml')
+            try:
+                st = os.stat(inventory_path)
+                signature = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                signature = None
+            
+            if (content_hash == _written_inventory_state["hash"]
+                    and signature == _written_inventory_state["signature"]):
+                logger.info(f"Arquivo de inventário YAML sem alterações ({len(rendered)} host(s) renderizado(s))")
+                INVENTORY_FILE = inventory_path
+                return True
+            
+            # Grava em arquivo temporário e substitui, para que o Ansible nunca leia um arquivo pela metade
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(inventory_path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as file:
+                file.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, inventory_path)
+            st = os.stat(inventory_path)
+            _written_inventory_state.update(hash=content_hash, signature=(st.st_mtime_ns, st.st_size))
         
         INVENTORY_FILE = inventory_path
+        ansible_mgr.inventory.invalidate()
         
-        logger.info(f"Arquivo de inventário YAML atualizado: {INVENTORY_FILE}")
+        logger.info(f"Arquivo de inventário YAML atualizado: {INVENTORY_FILE} ({len(rendered)} host(s) renderizado(s))")
         return True
     
     except Exception as e:
@@ -3637,69 +7260,206 @@ def page_not_found(e):
 def server_error(e):
     return render_template("errors/500.html"), 500
 
+def conditional_json(version, build, last_modified: float = None):
+    """
+    Resposta JSON condicional. A ETag deriva da versão dos dados e da URL (filtros e cursor
+    incluídos): se o cliente já tem essa versão (If-None-Match ou If-Modified-Since), a
+    resposta é 304 sem montar nem serializar o corpo.
+    
+    Args:
+        version: Qualquer valor que mude sempre que o corpo mudar (lido antes de montá-lo)
+        build (callable): Monta os dados da resposta
+        last_modified (float): Timestamp da última alteração, quando houver
+    """
+    etag = hashlib.sha256(f"{request.full_path}|{version}".encode('utf-8')).hexdigest()[:32]
+    if request.if_none_match:
+        # A compressão acrescenta o encoding à ETag (ver compress_response)
+        fresh = any(request.if_none_match.contains(tag) for tag in (etag, f"{etag}-gzip", f"{etag}-br"))
+    elif last_modified is not None and request.if_modified_since:
+        fresh = int(last_modified) <= request.if_modified_since.timestamp()
+    else:
+        fresh = False
+    response = app.response_class(status=304) if fresh else jsonify(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+    # Sempre revalidar: o navegador reaproveita o corpo em cache quando a resposta é 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Comprime com brotli (se disponível) ou gzip as respostas de texto/JSON maiores que COMPRESS_MIN_SIZE"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.content_length is not None and response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    if encoding == 'br':
+        data = brotli.compress(data, quality=min(COMPRESS_LEVEL, 11))
+    else:
+        data = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # Cada codificação é uma representação distinta e precisa de ETag própria
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
 # Rotas da API
+def _probe_params():
+    """Lê os limites de concorrência e prazo por host da query string"""
+    max_workers = request.args.get("workers", type=int)
+    host_timeout = request.args.get("timeout", type=float)
+    batch_facts = request.args.get("batch", "1") != "0"
+    return max_workers, host_timeout, batch_facts
+
 @app.route("/api/hosts")
 def get_hosts():
     try:
         logger.info("Iniciando requisição /api/hosts")
         hosts = ansible_mgr.load_inventory()
-        result = {}
-        for hostname, info in hosts.items():
-            logger.debug(f"Processando host: {hostname}")
-            is_valid = ansible_mgr.test_host(hostname, info)
-            
-            # Valores padrão caso não consiga coletar fatos
-            facts = {
-                "hostname": hostname,
-                "public_ip": hostname,
-                "private_ip": hostname,
-                "system": "Windows Server" if info.get("connection") == "winrm" else "Linux"
-            }
-            
-            if is_valid:
-                try:
-                    host_facts = ansible_mgr.gather_host_facts(hostname)
-                    if host_facts and isinstance(host_facts, dict):
-                        # Verificar se obtivemos valores válidos e garantir que sejam usados
-                        if "hostname" in host_facts and host_facts["hostname"] and host_facts["hostname"] != "N/A":
-                            facts["hostname"] = host_facts["hostname"]
-                        
-                        if "public_ip" in host_facts and host_facts["public_ip"] and host_facts["public_ip"] != "N/A":
-                            facts["public_ip"] = host_facts["public_ip"]
-                        
-                        if "private_ip" in host_facts and host_facts["private_ip"] and host_facts["private_ip"] != "N/A":
-                            facts["private_ip"] = host_facts["private_ip"]
-                        
-                        if "system" in host_facts and host_facts["system"] and host_facts["system"] != "N/A":
-                            facts["system"] = host_facts["system"]
-                            
-                        logger.info(f"Fatos coletados para {hostname}: {facts}")
-                    else:
-                        logger.warning(f"Fatos inválidos para {hostname}: {host_facts}")
-                except Exception as e:
-                    logger.error(f"Erro coletando fatos para {hostname}: {str(e)}", exc_info=True)
-            
-            result[hostname] = {
-                "valid": is_valid,
-                "facts": facts
-            }
-            
+        
+        # ?refresh=1 força uma sondagem síncrona; caso contrário responde com o cache
+        if request.args.get("refresh") == "1":
+            max_workers, host_timeout, batch_facts = _probe_params()
+            result = probe_engine.probe_all(hosts, max_workers, host_timeout, batch_facts)
+            for hostname, host_result in result.items():
+                facts_cache.store(hostname, host_result, persist=False)
+            facts_cache.save()
+        else:
+            # Sem mudança no inventário nem no cache de fatos, o cliente recebe 304
+            return conditional_json(
+                (ansible_mgr.inventory.content_hash, facts_cache.revision(hosts)),
+                lambda: facts_cache.snapshot(hosts)
+            )
         logger.info(f"Retornando dados para {len(result)} hosts")
         return jsonify(result)
     except Exception as e:
         logger.error(f"Erro processando hosts: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
+
+@app.route("/api/hosts/stream")
+def stream_hosts():
+    """
+    Versão em streaming de /api/hosts. Cada linha da resposta é um objeto JSON (NDJSON)
+    com o resultado de um host, emitido assim que a sondagem daquele host termina.
+    A última linha traz {"done": true, "total": N}.
+    """
+    try:
+        hosts = ansible_mgr.load_inventory()
+        max_workers, host_timeout, batch_facts = _probe_params()
+    except Exception as e:
+        logger.error(f"Erro ao preparar streaming de hosts: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        count = 0
+        for hostname, host_result in probe_engine.iter_probe(hosts, max_workers, host_timeout, batch_facts):
+            count += 1
+            facts_cache.store(hostname, host_result, persist=False)
+            yield json.dumps({"host": hostname, **host_result}) + "\n"
+        facts_cache.save()
+        yield json.dumps({"done": True, "total": count}) + "\n"
+    
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route("/api/facts/batch", methods=["POST"])
+def gather_facts_batch():
+    """
+    Coleta os fatos de vários hosts em uma única execução do Ansible.
+    Corpo opcional: {"hosts": [...], "forks": N}. Sem "hosts", coleta todo o inventário.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        hosts = data.get("hosts")
+        if hosts is not None and not isinstance(hosts, list):
+            return jsonify({"error": "O campo 'hosts' deve ser uma lista"}), 400
+        
+        forks = data.get("forks", FACTS_BATCH_FORKS)
+        results = ansible_mgr.gather_facts_batch(hosts, forks=int(forks))
+        return jsonify(results)
+    except Exception as e:
+        logger.error(f"Erro na coleta de fatos em lote: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
     
 @app.route("/api/playbooks")
 def get_playbooks():
     try:
-        playbooks = ansible_mgr.get_playbooks()
-        logger.debug(f"Retornando {len(playbooks)} playbooks")
-        return jsonify(playbooks)
+        if request.args.get('refresh') in ('1', 'true'):
+            ansible_mgr.catalog.scan()
+        return conditional_json(ansible_mgr.catalog.digest, lambda: ansible_mgr.get_playbooks(
+            os_type=request.args.get('os'),
+            category=request.args.get('category'),
+            name=request.args.get('name') or request.args.get('q')
+        ))
     except Exception as e:
         logger.error(f"Erro na rota /api/playbooks: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/playbooks/plan")
+def get_playbook_plan():
+    """Plano de execução em cache de um playbook (?path=); com ?hosts=a,b inclui as unidades tarefa × host"""
+    try:
+        playbook_path = request.args.get('path')
+        if not playbook_path:
+            return jsonify({"error": "Parâmetro path é obrigatório"}), 400
+        # Só playbooks do catálogo: o plano fica em cache e lê qualquer arquivo incluído
+        if not ansible_mgr.in_playbook_dir(playbook_path):
+            return jsonify({"error": "O playbook deve estar no diretório de playbooks"}), 400
+        if not os.path.isfile(playbook_path):
+            return jsonify({"error": f"Playbook {playbook_path} não encontrado"}), 404
+        plan = dict(ansible_mgr.plans.get(playbook_path))
+        hosts = [h for h in request.args.get('hosts', '').split(',') if h]
+        if hosts:
+            progress = ansible_mgr._plan_progress(playbook_path, hosts)
+            plan["units"] = progress["total"] if progress else None
+        return jsonify(plan)
+    except Exception as e:
+        logger.error(f"Erro ao calcular plano do playbook: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/playbooks/validate", methods=["POST"])
+def validate_playbook_catalog():
+    """Inicia a validação de sintaxe de todo o catálogo em segundo plano"""
+    try:
+        if not ansible_mgr.validate_catalog():
+            return jsonify({"error": "Validação do catálogo já em andamento"}), 409
+        report = ansible_mgr.validation_report
+        return jsonify({"status": report["status"], "total": report["total"]}), 202
+    except Exception as e:
+        logger.error(f"Erro ao iniciar validação do catálogo: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/playbooks/validation")
+def get_playbook_validation():
+    """Relatório da última validação do catálogo; com ?path= retorna apenas o resultado daquele playbook"""
+    try:
+        report = ansible_mgr.validation_snapshot()
+        playbook_path = request.args.get('path')
+        if playbook_path:
+            result = report["results"].get(os.path.abspath(playbook_path))
+            if result is None:
+                return jsonify({"error": f"Playbook {playbook_path} não consta no relatório"}), 404
+            return jsonify(result)
+        return jsonify(report)
+    except Exception as e:
+        logger.error(f"Erro ao consultar validação do catálogo: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/run", methods=["POST"])
 def run_playbook():
     try:
@@ -3712,6 +7472,18 @@ def run_playbook():
         playbook_path = data.get("playbook")
         hosts = data.get("hosts", [])
         extra_vars = data.get("extra_vars")
+        priority = data.get("priority", JOB_DEFAULT_PRIORITY)
+        profile = data.get("profile") or DEFAULT_EXECUTION_PROFILE
+        shard_size = data.get("shard_size", JOB_SHARD_SIZE)
+        
+        if not isinstance(priority, int):
+            return jsonify({"error": "Prioridade deve ser um número inteiro"}), 400
+        
+        if not isinstance(shard_size, int) or isinstance(shard_size, bool) or shard_size < 0:
+            return jsonify({"error": "shard_size deve ser um número inteiro maior ou igual a zero"}), 400
+        
+        if profile not in EXECUTION_PROFILES:
+            return jsonify({"error": f"Perfil de execução inválido. Disponíveis: {', '.join(EXECUTION_PROFILES)}"}), 400
         
         if not playbook_path:
             logger.error("Caminho do playbook não fornecido")
@@ -3737,22 +7509,16 @@ def run_playbook():
             logger.error(f"Arquivo de playbook não encontrado: {playbook_path}")
             return jsonify({"error": f"Playbook {playbook_path} não encontrado"}), 404
         
-        # Verificar o conteúdo do playbook para garantir que pode ser executado
+        # Validação prévia pelo plano em cache: o YAML só é relido se o playbook ou algum
+        # arquivo incluído por ele mudou desde a última execução
         try:
-            with open(playbook_path, 'r') as f:
-                playbook_content = yaml.safe_load(f)
-                
-            if not playbook_content or not isinstance(playbook_content, list):
-                logger.error(f"Formato de playbook inválido: {playbook_path}")
-                return jsonify({"error": "Formato de playbook inválido"}), 400
-                
-            # Verificar se o playbook tem pelo menos um play
-            if not any('hosts' in play for play in playbook_content if isinstance(play, dict)):
-                logger.error(f"Playbook sem seção 'hosts' válida: {playbook_path}")
-                return jsonify({"error": "Playbook não contém uma seção 'hosts' válida"}), 400
+            plan = ansible_mgr.plans.get(playbook_path)
         except Exception as e:
             logger.error(f"Erro ao ler playbook {playbook_path}: {str(e)}")
             return jsonify({"error": f"Erro ao ler playbook: {str(e)}"}), 400
+        if plan["errors"]:
+            logger.error(f"Playbook inválido {playbook_path}: {plan['errors']}")
+            return jsonify({"error": plan["errors"][0], "errors": plan["errors"]}), 400
         
         # Logs detalhados para depuração
         logger.info(f"Executando playbook: {playbook_path}")
@@ -3771,12 +7537,23 @@ def run_playbook():
         # Executar o playbook
         if extra_vars:
             logger.info(f"Executando com variáveis extras: {extra_vars}")
-            job_id = ansible_mgr.run_playbook_with_vars(playbook_path, valid_hosts, extra_vars)
-        else:
-            job_id = ansible_mgr.run_playbook(playbook_path, valid_hosts)
+        job_id = ansible_mgr.run_playbook_with_vars(playbook_path, valid_hosts, extra_vars, priority, profile, shard_size)
         
         logger.info(f"Job ID gerado: {job_id}")
-        return jsonify({"job_id": job_id, "hosts": valid_hosts}), 200
+        response = {
+            "job_id": job_id,
+            "hosts": valid_hosts,
+            "status": "queued",
+            "profile": profile,
+            "plan": {"hash": plan["hash"], "tasks": plan["task_count"], "warnings": plan["warnings"]}
+        }
+        if shard_size and len(valid_hosts) > shard_size:
+            response["shards"] = -(-len(valid_hosts) // shard_size)
+        if not ansible_mgr.worker_role and not ansible_mgr.job_store.live_workers(role="runner"):
+            # Modo daemon sem job runner ativo: o job fica na fila até um runner iniciar
+            logger.warning(f"Job {job_id} enfileirado sem nenhum job runner ativo")
+            response["warning"] = "Nenhum job runner ativo; o job aguardará na fila"
+        return jsonify(response), 200
     except Exception as e:
         logger.error(f"Erro no endpoint /api/run: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
@@ -3784,13 +7561,240 @@ def run_playbook():
 @app.route("/api/status/<job_id>")
 def get_status(job_id):
     try:
-        status = ansible_mgr.get_execution_status(job_id)
-        logger.debug(f"Retornando status para job {job_id}: {status}")
-        return jsonify(status)
+        since = request.args.get('since', type=int)
+        return conditional_json(
+            ansible_mgr.job_version(job_id), lambda: ansible_mgr.get_execution_status(job_id, since)
+        )
     except Exception as e:
         logger.error(f"Erro ao obter status do job {job_id}: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+def _sse_message(event: str, data: dict, event_id=None) -> str:
+    """Formata uma mensagem Server-Sent Events"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+# Vagas de stream deste processo (o servidor de streams as redefine conforme a sua capacidade)
+stream_slots = threading.BoundedSemaphore(STREAM_MAX_CONNECTIONS)
+
+@app.route("/api/stream/<job_id>")
+def stream_status(job_id):
+    """
+    Stream (Server-Sent Events) da execução de um job.
+    Eventos: "output" (texto novo e cursor), "progress" (status e progresso), "task" (tarefa
+    atual), "host" (mudança de status de um host) e "end".
+    O cursor é enviado como id do evento, então o EventSource retoma de onde parou ao reconectar.
+    O cabeçalho Last-Event-ID (reconexão) tem precedência sobre o parâmetro since (conexão inicial).
+    """
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', 0, type=int)
+    
+    local = job_id in ansible_mgr.running_playbooks
+    stored = ansible_mgr.get_execution_status(job_id, since)
+    if stored["status"] == "not_found":
+        return jsonify({"error": f"Job {job_id} não encontrado"}), 404
+    if stored["status"] not in ACTIVE_JOB_STATUSES and not local:
+        # Job já finalizado: entrega a saída restante do histórico e encerra o stream
+        messages = []
+        if stored["output"]:
+            messages.append(_sse_message("output", {"output": stored["output"], "cursor": stored["cursor"]}, stored["cursor"]))
+        messages.append(_sse_message("end", {
+            "status": stored["status"], "progress": stored["progress"], "cursor": stored["cursor"]
+        }, stored["cursor"]))
+        return Response("".join(messages), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+    # Cada stream ocupa uma thread até o fim do job (ver STREAM_MAX_CONNECTIONS)
+    if not stream_slots.acquire(blocking=False):
+        logger.warning(f"Limite de streams simultâneos atingido; stream do job {job_id} recusado")
+        response = jsonify({"error": "Limite de streams simultâneos atingido; consulte /api/status"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    def generate(cursor):
+        last_state = None
+        last_task = None
+        last_hosts = {}
+        last_sent = time.time()
+        version = None
+        while True:
+            job = ansible_mgr.running_playbooks.get(job_id)
+            if job is not None:
+                # Job deste processo: aguarda nova saída no buffer; o timeout curto também
+                # captura mudanças de status e progresso
+                job["output"].wait(cursor, timeout=1.0)
+            else:
+                # Job na fila ou em outro processo: aguarda o sinal de mudança compartilhado
+                # e só então lê o status completo no banco
+                new_version = ansible_mgr.job_watcher.wait(job_id, version, timeout=STREAM_HEARTBEAT_INTERVAL)
+                if new_version == version:
+                    last_sent = time.time()
+                    yield ": keep-alive\n\n"
+                    continue
+                version = new_version
+            current = ansible_mgr.get_execution_status(job_id, cursor)
+            if current["cursor"] != cursor:
+                cursor = current["cursor"]
+                last_sent = time.time()
+                yield _sse_message("output", {"output": current["output"], "cursor": cursor}, cursor)
+            
+            state = (current.get("status"), current.get("progress"))
+            if state != last_state:
+                last_state = state
+                last_sent = time.time()
+                yield _sse_message("progress", {"status": state[0], "progress": state[1]})
+            
+            task = current.get("current_task")
+            if task and task != last_task:
+                last_task = task
+                last_sent = time.time()
+                yield _sse_message("task", {"task": task, "tasks_started": current.get("tasks_started", 0)})
+            
+            for host, host_status in list((current.get("hosts_status") or {}).items()):
+                # O histórico guarda só o status final; os demais campos vêm do último evento
+                host_status = {**last_hosts.get(host, {}), **host_status}
+                if last_hosts.get(host) != host_status:
+                    last_hosts[host] = host_status
+                    last_sent = time.time()
+                    yield _sse_message("host", {"host": host, **host_status})
+            
+            # O fim só é enviado depois que o job foi finalizado (lido do histórico) e toda a saída foi entregue
+            if state[0] not in ACTIVE_JOB_STATUSES and job is None:
+                yield _sse_message("end", {"status": state[0], "progress": state[1], "cursor": cursor}, cursor)
+                return
+            
+            if time.time() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+    
+    response = Response(generate(since), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(stream_slots.release)
+    return response
+
+@app.route("/api/jobs")
+def list_jobs():
+    """
+    Histórico de jobs. Filtros: status, playbook, host, profile, since/until (ISO 8601), limit e offset.
+    """
+    try:
+        def parse_date(value):
+            return datetime.fromisoformat(value).timestamp() if value else None
+        
+        jobs = ansible_mgr.job_store.list(
+            status=request.args.get('status'),
+            playbook=request.args.get('playbook'),
+            host=request.args.get('host'),
+            since=parse_date(request.args.get('since')),
+            until=parse_date(request.args.get('until')),
+            limit=min(request.args.get('limit', 50, type=int), 500),
+            offset=request.args.get('offset', 0, type=int),
+            profile=request.args.get('profile')
+        )
+        return jsonify({"jobs": jobs})
+    except ValueError as e:
+        return jsonify({"error": f"Data inválida: {str(e)}"}), 400
+    except Exception as e:
+        logger.error(f"Erro ao consultar histórico de jobs: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/profiles")
+def list_execution_profiles():
+    """Perfis de execução disponíveis e a duração dos jobs de cada um (?playbook= filtra)"""
+    try:
+        stats = ansible_mgr.job_store.profile_stats(request.args.get('playbook'))
+        return jsonify({
+            "default": DEFAULT_EXECUTION_PROFILE,
+            "profiles": {
+                name: {
+                    "label": profile["label"],
+                    "description": profile["description"],
+                    "config": profile["config"],
+                    "stats": stats.get(name)
+                }
+                for name, profile in EXECUTION_PROFILES.items()
+            }
+        })
+    except Exception as e:
+        logger.error(f"Erro ao listar perfis de execução: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/queue")
+def queue_status():
+    """Estado da fila de jobs (workers, jobs em execução e enfileirados) e dos processos que executam jobs"""
+    try:
+        stats = ansible_mgr.scheduler.stats()
+        stats["mode"] = JOB_EXECUTION_MODE
+        stats["role"] = ansible_mgr.worker_role
+        stats["executors"] = ansible_mgr.job_store.live_workers()
+        return jsonify(stats)
+    except Exception as e:
+        logger.error(f"Erro ao consultar a fila de jobs: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+# Operações do JobStore que os job runners de outros nós chamam (ver RemoteJobStore)
+CLUSTER_METHODS = ("claim", "read_output", "publish", "renew", "finish", "cancel_requests", "request_cancel",
+                   "heartbeat", "unregister", "live_workers", "count_active", "queue_position",
+                   "running_owners", "release")
+
+@app.route("/api/cluster/<method>", methods=["POST"])
+def cluster_call(method):
+    """
+    Fila de jobs deste nó (dono do jobs.db) para os job runners de outros nós.
+    Autenticada pelo cabeçalho X-Automato-Cluster-Token; desativada sem AUTOMATO_CLUSTER_TOKEN.
+    """
+    if not CLUSTER_TOKEN:
+        return jsonify({"error": "API do cluster desativada (AUTOMATO_CLUSTER_TOKEN não definido)"}), 404
+    if not secrets.compare_digest(request.headers.get('X-Automato-Cluster-Token', ''), CLUSTER_TOKEN):
+        logger.warning(f"Chamada ao cluster com token inválido de {request.remote_addr}")
+        return jsonify({"error": "Token do cluster inválido"}), 403
+    if method not in CLUSTER_METHODS:
+        return jsonify({"error": f"Operação desconhecida: {method}"}), 404
+    try:
+        data = request.get_json(silent=True) or {}
+        result = getattr(ansible_mgr.job_store, method)(*data.get("args", []), **data.get("kwargs", {}))
+        if isinstance(result, set):
+            result = sorted(result)
+        if method == "claim" and result:
+            playbook_path = os.path.abspath(result["playbook_path"])
+            if playbook_path.startswith(os.path.join(BASE_DIR, '')):
+                # O nó remoto resolve o playbook na sua própria cópia da árvore do projeto
+                result["playbook_relpath"] = os.path.relpath(playbook_path, BASE_DIR)
+        return jsonify({"result": result})
+    except TypeError as e:
+        return jsonify({"error": f"Argumentos inválidos para {method}: {str(e)}"}), 400
+    except Exception as e:
+        logger.error(f"Erro na operação {method} do cluster: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/ssh/prewarm", methods=["POST"])
+def prewarm_ssh_connections():
+    """Abre antecipadamente as conexões SSH mestras dos hosts selecionados na interface"""
+    try:
+        data = request.get_json(silent=True) or {}
+        hosts = data.get("hosts")
+        if not isinstance(hosts, list):
+            return jsonify({"error": "Parâmetro hosts deve ser uma lista"}), 400
+        scheduled = ansible_mgr.ssh_pool.prewarm([str(h) for h in hosts])
+        return jsonify({"scheduled": scheduled}), 202
+    except Exception as e:
+        logger.error(f"Erro ao pré-aquecer conexões SSH: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/ssh/pool")
+def ssh_pool_status():
+    """Estado das conexões SSH mestras (?hosts=a,b filtra os hosts)"""
+    try:
+        hosts = [h for h in request.args.get("hosts", "").split(",") if h]
+        return jsonify(ansible_mgr.ssh_pool.status(hosts or None))
+    except Exception as e:
+        logger.error(f"Erro ao consultar o pool de conexões SSH: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/cancel", methods=["POST"])
 def cancel_playbook():
     try:
@@ -3811,17 +7815,27 @@ def cancel_playbook():
 # Rotas da API de gerenciamento de inventário
 @app.route('/get-inventory')
 def get_inventory():
-    linux_hosts, windows_hosts = parse_inventory()
+    return conditional_json(inventory_store.version, _inventory_servers)
+
+def _inventory_servers() -> dict:
     servers = []
-    for host in linux_hosts:
-        servers.append(parse_server_line(host, 'linux'))
-    for host in windows_hosts:
-        servers.append(parse_server_line(host, 'windows'))
+    for host in get_current_hosts():
+        os_info = _host_os_info(host)
+        servers.append({
+            "host": host["host"],
+            "ssh_user": host.get("ssh_user", ""),
+            "ssh_pass": host.get("ssh_pass", ""),
+            "windows_password": host.get("windows_password", ""),
+            "ssh_key_content": host.get("ssh_key_content", ""),
+            "os": os_info["os_type"],
+            "os_distribution": os_info["os_distribution"],
+            "os_version": os_info["os_version"]
+        })
     for server in servers:
         server['ssh_pass'] = server.get('ssh_pass', '')
         server['windows_password'] = server.get('windows_password', '')
         server['ssh_key_content'] = server.get('ssh_key_content', '')
-    return jsonify({'servers': servers})
+    return {'servers': servers}
 
 @app.route('/add_server', methods=['POST'])
 def add_or_update_server():
@@ -3865,10 +7879,6 @@ def add_or_update_server():
         if not is_valid_ip(host):
             return jsonify({"success": False, "message": "IP inválido!"}), 400
             
-        # Primeiro remove o host original se for uma atualização
-        if original_host and original_host != host:
-            remove_host(original_host)
-        
         # Prepara os dados do host
         host_data = {
             "host": host,
@@ -3888,8 +7898,11 @@ def add_or_update_server():
         
         logger.info(f"Dados finais do host para adicionar: {host_data}")
         
-        # Adiciona ou atualiza o host
-        success = add_host(host_data)
+        # Remove o host original (se o IP mudou) e adiciona/atualiza o novo na mesma transação
+        with InventoryBatch() as batch:
+            if original_host and original_host != host:
+                batch.remove(original_host)
+            success = batch.add(host_data)
         
         if success:
             message = "Servidor adicionado com sucesso!"
@@ -3909,10 +7922,13 @@ def show_inventory():
     ensure_inventory_exists()
     inventory_path = os.path.join(os.path.dirname(INVENTORY_FILE), 'inventory.yml')
     
-    try:
+    def read_inventory():
         with open(inventory_path, 'r') as f:
-            inventory_data = f.read()
-        return jsonify({"inventory": inventory_data})
+            return {"inventory": f.read()}
+    
+    try:
+        st = os.stat(inventory_path)
+        return conditional_json((st.st_ino, st.st_mtime_ns, st.st_size), read_inventory, last_modified=st.st_mtime)
     except Exception as e:
         logger.error(f"Erro ao ler arquivo de inventário: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -3978,41 +7994,43 @@ def inventory_refresh():
         
         removed_hosts = current_hosts_ips - inventory_hosts
         
-        for host_ip in removed_hosts:
-            remove_host(host_ip)
-        
+        # Remoções e inclusões são gravadas de uma vez ao final da transação
         added_count = 0
-        for host_ip in inventory_hosts - current_hosts_ips:
-            # Determina o tipo de host e suas credenciais
-            host_os = 'linux'  # Padrão
-            host_user = ''
-            host_pass = ''
-            host_key = ''
-            
-            # Verifica se é um host Linux
-            if host_ip in linux_hosts:
-                host_os = 'linux'
-                host_vars = linux_hosts[host_ip]
-                host_user = host_vars.get('ansible_user', '')
-                host_pass = host_vars.get('ansible_ssh_pass', '')
-                host_key = host_vars.get('ansible_ssh_private_key_content', '')
-            
-            # Verifica se é um host Windows
-            elif host_ip in windows_hosts:
-                host_os = 'windows'
-                host_vars = windows_hosts[host_ip]
-                host_user = host_vars.get('ansible_user', '')
-                host_pass = host_vars.get('ansible_password', '')
-            
-            # Adiciona o host ao sistema
-            add_host({
-                'host': host_ip,
-                'ssh_user': host_user,
-                'ssh_pass': host_pass,
-                'ssh_key_content': host_key,
-                'os': host_os
-            })
-            added_count += 1
+        with InventoryBatch() as batch:
+            for host_ip in removed_hosts:
+                batch.remove(host_ip)
+            
+            for host_ip in inventory_hosts - current_hosts_ips:
+                # Determina o tipo de host e suas credenciais
+                host_os = 'linux'  # Padrão
+                host_user = ''
+                host_pass = ''
+                host_key = ''
+            
+                # Verifica se é um host Linux
+                if host_ip in linux_hosts:
+                    host_os = 'linux'
+                    host_vars = linux_hosts[host_ip]
+                    host_user = host_vars.get('ansible_user', '')
+                    host_pass = host_vars.get('ansible_ssh_pass', '')
+                    host_key = host_vars.get('ansible_ssh_private_key_content', '')
+            
+                # Verifica se é um host Windows
+                elif host_ip in windows_hosts:
+                    host_os = 'windows'
+                    host_vars = windows_hosts[host_ip]
+                    host_user = host_vars.get('ansible_user', '')
+                    host_pass = host_vars.get('ansible_password', '')
+            
+                # Adiciona o host ao sistema
+                batch.add({
+                    'host': host_ip,
+                    'ssh_user': host_user,
+                    'ssh_pass': host_pass,
+                    'ssh_key_content': host_key,
+                    'os': host_os
+                })
+                added_count += 1
         
         logger.info(f"Inventário atualizado: {len(removed_hosts)} host(s) removido(s) e {added_count} host(s) adicionado(s)")
         
@@ -4071,8 +8089,7 @@ def update_host_status():
                 'message': 'Host não especificado'
             }), 400
             
-        hosts = ansible_mgr.load_inventory()
-        host_info = hosts.get(hostname)
+        host_info = ansible_mgr.inventory.get(hostname)
         
         if not host_info:
             return jsonify({
@@ -4080,8 +8097,13 @@ def update_host_status():
                 'message': 'Host não encontrado no inventário'
             }), 404
             
-        is_valid = ansible_mgr.test_host(hostname, host_info)
-        facts = ansible_mgr.gather_host_facts(hostname) if is_valid else {
+        # {"force": true} sonda o host na hora; caso contrário usa o cache
+        if data.get('force'):
+            entry = facts_cache.refresh({hostname: host_info})[hostname]
+        else:
+            entry = facts_cache.get(hostname, host_info)
+        is_valid = entry.get("valid", False)
+        facts = entry.get("facts") if is_valid else {
             "hostname": hostname,
             "public_ip": "N/A",
             "private_ip": "N/A",
@@ -4104,6 +8126,77 @@ def update_host_status():
             'message': f'Erro ao atualizar host: {str(e)}'
         }), 500
 
+@inventory_bp.route('/batch', methods=['POST'])
+def inventory_batch():
+    """
+    Aplica várias alterações no inventário numa única transação.
+    Corpo: {"add": [servidor, ...], "update": [servidor, ...], "remove": ["ip", ...]}
+    Se qualquer operação for inválida, nenhuma alteração é gravada.
+    """
+    try:
+        data = request.get_json() or {}
+        to_add = data.get('add', [])
+        to_update = data.get('update', [])
+        to_remove = data.get('remove', [])
+        if not all(isinstance(items, list) for items in (to_add, to_update, to_remove)):
+            return jsonify({'success': False, 'message': 'Os campos add, update e remove devem ser listas'}), 400
+        
+        errors = []
+        with InventoryBatch() as batch:
+            for server in to_add:
+                if not isinstance(server, dict) or not batch.add(server):
+                    errors.append("Servidor sem IP/host especificado")
+            for server in to_update:
+                if not isinstance(server, dict) or not batch.update(server):
+                    errors.append(f"Host {server.get('host') if isinstance(server, dict) else server} não encontrado para atualização")
+            for ip in to_remove:
+                if not batch.remove(ip):
+                    errors.append(f"Host {ip} não encontrado para remoção")
+            if errors:
+                # A exceção descarta a transação sem gravar nada
+                raise ValueError('; '.join(errors))
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(batch.changed)} host(s) alterado(s)',
+            'added': len(to_add),
+            'updated': len(to_update),
+            'removed': len(to_remove),
+            'total': batch.total if batch.total is not None else inventory_store.count()
+        }), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro na alteração em lote do inventário: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': f'Erro: {str(e)}'}), 500
+
+@inventory_bp.route('/hosts', methods=['GET'])
+def inventory_hosts():
+    """
+    Consulta indexada do inventário. Filtros: ip, os, distribution, version e group.
+    Credenciais não são devolvidas.
+    """
+    try:
+        ip = request.args.get('ip')
+        if ip:
+            host = inventory_store.get(ip)
+            servers = [host] if host else []
+        else:
+            servers = inventory_store.find(
+                os_type=request.args.get('os'),
+                distribution=request.args.get('distribution'),
+                version=request.args.get('version'),
+                group=request.args.get('group')
+            )
+        servers = [
+            {k: v for k, v in server.items() if k not in InventoryStore.SECRET_FIELDS}
+            for server in servers
+        ]
+        return jsonify({'servers': servers, 'total': len(servers)})
+    except Exception as e:
+        logger.error(f"Erro ao consultar inventário: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': f'Erro: {str(e)}'}), 500
+
 @inventory_bp.route('/export-inventory-template', methods=['GET'])
 def export_inventory_template():
     """Exporta um template amigável de inventário com exemplos para Linux e Windows"""
@@ -4286,35 +8379,29 @@ def import_inventory():
         success_count = 0
         errors = []
 
-        for server in servers:
-            if not server.get('host'):
-                errors.append("Servidor sem IP/host especificado")
-                logger.warning("Servidor sem IP/host especificado")
-                continue
-
-            server.setdefault('ssh_user', '')
-            server.setdefault('ssh_pass', '')
-            server.setdefault('ssh_key_content', '')
-            server.setdefault('os', 'linux')
+        # Todos os servidores entram numa única transação: um único write de cada arquivo
+        try:
+            with InventoryBatch() as batch:
+                for server in servers:
+                    if not server.get('host'):
+                        errors.append("Servidor sem IP/host especificado")
+                        logger.warning("Servidor sem IP/host especificado")
+                        continue
 
-            try:
-                logger.debug(f"Tentando adicionar servidor: {server}")
-                success = add_host(server)
-                if success:
-                    success_count += 1
-                    logger.info(f"Servidor adicionado com sucesso: {server['host']}")
-                else:
-                    error_msg = f"Falha ao adicionar {server['host']}"
-                    errors.append(error_msg)
-                    logger.error(error_msg)
-            except Exception as e:
-                error_msg = f"Erro ao adicionar {server['host']}: {str(e)}"
-                errors.append(error_msg)
-                logger.error(error_msg)
+                    server.setdefault('ssh_user', '')
+                    server.setdefault('ssh_pass', '')
+                    server.setdefault('ssh_key_content', '')
+                    server.setdefault('os', 'linux')
 
-        update_success = update_inventory_file()
-        if not update_success:
-            logger.error("Falha ao atualizar o arquivo inventory.yml")
+                    logger.debug(f"Tentando adicionar servidor: {server['host']}")
+                    if batch.add(server):
+                        success_count += 1
+                    else:
+                        error_msg = f"Falha ao adicionar {server['host']}"
+                        errors.append(error_msg)
+                        logger.error(error_msg)
+        except Exception as e:
+            logger.error(f"Falha ao gravar o inventário importado: {str(e)}", exc_info=True)
             return jsonify({'success': False, 'message': 'Erro ao atualizar o arquivo de inventário'}), 500
 
         message = f"Importação concluída! {success_count}/{len(servers)} servidor(es) adicionado(s)."
@@ -4337,9 +8424,196 @@ def import_inventory():
   
 
 
-if __name__ == "__main__":
+@app.before_request
+def start_background_workers():
+    """Inicia os workers da fila no processo que atende requisições (idempotente)"""
+    ansible_mgr.start_workers()
+
+
+def init_app():
+    """Prepara diretórios, inventário e blueprints; executado uma vez em cada processo do servidor"""
     ensure_inventory_exists()
     ensure_directory_structure()
-    app.register_blueprint(inventory_bp, url_prefix='/inventory')  # Verifique esta linha
+    if 'inventory' not in app.blueprints:
+        app.register_blueprint(inventory_bp, url_prefix='/inventory')
     ensure_extended_directory_structure()
-    app.run(debug=True)
\ No newline at end of file
+
+
+def serve_production(bind: str = WEB_BIND, workers: int = WEB_WORKERS, threads: int = WEB_THREADS):
+    """
+    Servidor de produção: gunicorn com vários processos, cada um com várias threads.
+    Jobs, fila, cancelamentos, sessões e caches ficam em data/ (SQLite e arquivos), então
+    qualquer worker atende consultas e cancelamentos de qualquer job. Sem o gunicorn
+    instalado, usa o servidor multithread do Werkzeug em um único processo.
+    """
+    spawn_job_runner()
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.warning("gunicorn não instalado (pip install gunicorn); usando o servidor multithread do Werkzeug em um processo")
+        host, _, port = bind.rpartition(':')
+        ansible_mgr.start_workers()
+        app.run(host=host or '0.0.0.0', port=int(port), threaded=True, debug=False, use_reloader=False)
+        return
+    
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', bind)
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+        
+        def load(self):
+            # Cada worker importa o módulo depois do fork: threads, conexões e o ID do
+            # processo (dono dos jobs) são sempre do próprio worker
+            import app as module
+            module.init_app()
+            module.ansible_mgr.start_workers()
+            return module.app
+    
+    logger.info(f"Servidor de produção em {bind}: {workers} processo(s) com {threads} thread(s)")
+    ProductionServer().run()
+
+
+def serve_streams(bind: str = STREAM_BIND, workers: int = STREAM_WORKERS,
+                  connections: int = STREAM_WORKER_CONNECTIONS):
+    """
+    Servidor dedicado aos streams de jobs (python app.py --stream-server).
+    Com gevent, cada stream aberto é uma greenlet em espera, e não uma thread, então cada
+    processo comporta até "connections" visualizações simultâneas. O proxy encaminha
+    /api/stream/ para STREAM_BIND e o restante para o servidor principal. Este processo não
+    executa jobs: apenas lê o que os workers publicam no banco compartilhado.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.error("O servidor de streams requer o gunicorn (pip install gunicorn gevent)")
+        sys.exit(1)
+    try:
+        import gevent  # noqa: F401
+        worker_class, capacity = 'gevent', connections
+    except ImportError:
+        # Sem gevent, threads em espera: menos streams por processo, mas ainda sem disputar
+        # threads com as requisições do servidor principal
+        logger.warning("gevent não instalado (pip install gevent); usando threads no servidor de streams")
+        worker_class, capacity = 'gthread', min(connections, 256)
+    
+    class StreamServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', bind)
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', worker_class)
+            if worker_class == 'gevent':
+                self.cfg.set('worker_connections', capacity)
+            else:
+                self.cfg.set('threads', capacity)
+            # Streams duram o job inteiro
+            self.cfg.set('timeout', 0)
+        
+        def load(self):
+            import app as module
+            module.init_app()
+            # Jobs enviados por engano a este servidor ficam na fila para os demais workers
+            module.JOB_EXECUTION_MODE = "daemon"
+            module.stream_slots = threading.BoundedSemaphore(capacity)
+            return module.app
+    
+    logger.info(f"Servidor de streams em {bind}: {workers} processo(s) {worker_class} com até {capacity} stream(s) cada")
+    StreamServer().run()
+
+
+def spawn_job_runner():
+    """
+    No modo "auto", inicia um job runner (python app.py --job-runner) em sessão própria, a
+    partir do processo que não recarrega (mestre do gunicorn ou monitor do reloader). Ele
+    continua ativo depois que a web para, recarrega ou cai; para encerrá-lo, envie SIGTERM
+    (ele termina os jobs em andamento antes de sair). Nada é feito se já há um runner ativo.
+    
+    Returns:
+        subprocess.Popen: Processo iniciado ou None
+    """
+    if JOB_EXECUTION_MODE != "auto":
+        return None
+    try:
+        if ansible_mgr.job_store.live_workers(role="runner"):
+            return None
+        log_path = os.path.join(DATA_DIR, 'job_runner.log')
+        with open(log_path, 'ab') as log:
+            process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--job-runner'],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+            )
+        logger.info(f"Job runner iniciado (pid {process.pid}, saída em {log_path})")
+        return process
+    except Exception as e:
+        # Sem runner, os processos web continuam executando os jobs
+        logger.error(f"Erro ao iniciar o job runner: {str(e)}", exc_info=True)
+        return None
+
+
+def run_job_runner():
+    """
+    Daemon de execução de jobs (python app.py --job-runner), independente do servidor web.
+    Assume os jobs da fila compartilhada (jobs.db) e publica saída e estado no banco, de onde
+    a web os lê; a web pode reiniciar ou cair sem afetar as execuções em andamento. Com
+    SIGTERM/SIGINT o runner para de assumir jobs e espera os atuais terminarem (até
+    RUNNER_DRAIN_TIMEOUT, depois os cancela); um segundo sinal encerra imediatamente.
+    Com AUTOMATO_JOB_COORDINATOR, o runner está em outro nó e usa a fila do coordenador por HTTP.
+    """
+    init_app()
+    stop = threading.Event()
+    
+    def handle_signal(signum, frame):
+        if stop.is_set():
+            logger.warning("Job runner encerrado sem aguardar os jobs em execução")
+            os._exit(1)
+        logger.info(f"Sinal {signum} recebido; o job runner não assumirá novos jobs")
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    
+    if JOB_COORDINATOR_URL:
+        # Nó adicional: a fila fica no nó dono do jobs.db
+        ansible_mgr.use_store(RemoteJobStore(JOB_COORDINATOR_URL, CLUSTER_TOKEN))
+        logger.info(f"Job runner usando a fila do coordenador {JOB_COORDINATOR_URL}")
+    ansible_mgr.start_workers(role="runner")
+    socket_path = ansible_mgr.listen_wakeups()
+    worker_id = ansible_mgr.scheduler.worker_id()
+    logger.info(f"Job runner {worker_id} ativo (socket de aviso: {socket_path or 'indisponível'})")
+    stop.wait()
+    
+    ansible_mgr.scheduler.stop()
+    deadline = time.monotonic() + RUNNER_DRAIN_TIMEOUT
+    while ansible_mgr.scheduler.running_count and time.monotonic() < deadline:
+        time.sleep(1)
+    if ansible_mgr.scheduler.running_count:
+        logger.warning(f"Cancelando {ansible_mgr.scheduler.running_count} job(s) que não terminaram a tempo")
+        for job_id in list(ansible_mgr.running_playbooks):
+            ansible_mgr.cancel_playbook(job_id)
+        deadline = time.monotonic() + 30
+        while ansible_mgr.scheduler.running_count and time.monotonic() < deadline:
+            time.sleep(1)
+    
+    if socket_path and os.path.exists(socket_path):
+        os.remove(socket_path)
+    ansible_mgr.job_store.unregister(worker_id)
+    logger.info(f"Job runner {worker_id} encerrado")
+
+
+if __name__ == "__main__":
+    if '--job-runner' in sys.argv[1:]:
+        run_job_runner()
+        sys.exit(0)
+    if '--stream-server' in sys.argv[1:]:
+        serve_streams()
+        sys.exit(0)
+    init_app()
+    if '--production' in sys.argv[1:] or os.environ.get('AUTOMATO_SERVER') == 'production':
+        serve_production()
+    else:
+        # O reloader reexecuta este script em um processo filho (WERKZEUG_RUN_MAIN); o runner
+        # parte do processo monitor, que não recarrega
+        if not os.environ.get('WERKZEUG_RUN_MAIN'):
+            spawn_job_runner()
+        app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Script de inventário dinâmico do Ansible gerado a partir do banco do inventário
+(data/inventory.db) mantido pela Automato Platform.
+
+Uso:
+    ansible-playbook -i dynamic_inventory.py playbook.yml
+    ./dynamic_inventory.py --list
+    ./dynamic_inventory.py --host 10.0.0.1
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import getpass
+import tempfile
+import argparse
+from contextlib import closing
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INVENTORY_DB_PATH = os.environ.get('AUTOMATO_INVENTORY_DB', os.path.join(BASE_DIR, 'data', 'inventory.db'))
+# Mesmo diretório de sockets do pool de conexões SSH do portal (SSH_CONTROL_DIR em app.py)
+SSH_CONTROL_DIR = os.environ.get('AUTOMATO_SSH_CONTROL_DIR', os.path.join(tempfile.gettempdir(), f"automato-ssh-{getpass.getuser()}"))
+SSH_CONTROL_PERSIST = int(os.environ.get('AUTOMATO_SSH_CONTROL_PERSIST', '600'))
+
+# Mesmas variáveis de grupo gravadas no inventory.yml por update_inventory_file()
+GROUP_VARS = {
+    'linux': {
+        'ansible_connection': 'ssh',
+        'ansible_port': 22,
+        'ansible_ssh_args': (f"-C -o ControlMaster=auto -o ControlPersist={SSH_CONTROL_PERSIST}s "
+                             f"-o ControlPath={os.path.join(SSH_CONTROL_DIR, '%C')}")
+    },
+    'windows': {
+        'ansible_connection': 'winrm',
+        'ansible_port': 5986,
+        'ansible_winrm_transport': 'ntlm',
+        'ansible_winrm_server_cert_validation': 'ignore'
+    }
+}
+
+
+def load_hosts(db_path):
+    """Retorna [(host, grupo, variáveis)] na ordem de inclusão"""
+    if not os.path.exists(db_path):
+        return []
+    with closing(sqlite3.connect(db_path, timeout=30)) as conn:
+        rows = conn.execute(
+            "SELECT h.host, g.group_name, h.host_vars FROM hosts h "
+            "LEFT JOIN host_groups g ON g.host = h.host "
+            "WHERE h.host_vars IS NOT NULL ORDER BY h.position"
+        ).fetchall()
+    return [(host, group, json.loads(host_vars)) for host, group, host_vars in rows]
+
+
+def build_inventory(db_path):
+    inventory = {
+        'all': {'children': list(GROUP_VARS)},
+        '_meta': {'hostvars': {}}
+    }
+    for group, group_vars in GROUP_VARS.items():
+        inventory[group] = {'hosts': [], 'vars': dict(group_vars)}
+    
+    for host, group, host_vars in load_hosts(db_path):
+        if group not in inventory:
+            inventory[group] = {'hosts': []}
+            inventory['all']['children'].append(group)
+        inventory[group]['hosts'].append(host)
+        inventory['_meta']['hostvars'][host] = host_vars
+    return inventory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inventário dinâmico da Automato Platform')
+    parser.add_argument('--list', action='store_true', help='Lista todos os grupos e hosts')
+    parser.add_argument('--host', help='Variáveis de um host')
+    args = parser.parse_args()
+    
+    inventory = build_inventory(INVENTORY_DB_PATH)
+    if args.host:
+        result = inventory['_meta']['hostvars'].get(args.host, {})
+    else:
+        result = inventory
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2077,7 +2077,7 @@ function fixButtonSpacing(card) {
                     renderHostLog(hostname, output, logContent);
                     
                     // Se o job ainda estiver em execução, continuar atualizando
-                    if (data.status === 'running') {
+                    if (data.status === 'running' || data.status === 'queued') {
                         setTimeout(() => updateHostLog(jobId, hostname), 2000);
                     }
                 })
@@ -2103,7 +2103,7 @@ function fixButtonSpacing(card) {
                     renderHostLog(hostname, data.output, logContent);
                     
                     // Se o job ainda estiver em execução, continuar atualizando
-                    if (data.status === 'running') {
+                    if (data.status === 'running' || data.status === 'queued') {
                         setTimeout(() => updateHostLog(jobId, hostname), 2000);
                     }
                 })
@@ -2843,7 +2843,7 @@ fetch(`/api/status/${jobId}`)
 .then(response => response.json())
 .then(data => {
     // Verificar se o job ainda está em execução
-    if (data.status !== 'running') {
+    if (data.status !== 'running' && data.status !== 'queued') {
         console.log(`[Ansible Multi-Host] Job concluído para ${hostname}, parando monitoramento`);
         clearInterval(interval);
     }
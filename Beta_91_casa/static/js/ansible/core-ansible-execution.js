@@ -275,6 +275,8 @@ function determineSystemIcon(system) {
 
 /**
  * Monitora a execução de uma playbook
+ * Usa o stream do servidor (Server-Sent Events) e, se indisponível, consulta o status
+ * de forma incremental (parâmetro "since") com intervalo adaptativo.
  * @param {string} jobId - ID do job
  * @param {HTMLElement} card - Card de execução
  */
@@ -283,44 +285,107 @@ function monitorPlaybookExecution(jobId, card) {
     const outputDiv = card.querySelector('.ansible-output');
     const statusDiv = card.querySelector('.task-status');
     
+    let outputText = '';
+    let cursor = 0;
+    let renderPending = false;
+    let finished = false;
+
     // Inicia com 1 segundo e vai aumentando
     let pollInterval = 1000;
     const maxInterval = 10000; // Máximo de 10 segundos entre consultas
 
+    function applyProgress(progress) {
+        if (progressBar && typeof progress === 'number') {
+            progressBar.style.width = `${progress}%`;
+        }
+    }
+
+    function appendOutput(text) {
+        if (!text) return;
+        outputText += text;
+        // Só redesenha a saída se ela estiver visível, no máximo uma vez por quadro
+        if (!outputDiv || outputDiv.style.display === 'none' || renderPending) return;
+        renderPending = true;
+        requestAnimationFrame(() => {
+            renderPending = false;
+            outputDiv.innerHTML = formatAnsibleOutput(outputText);
+            outputDiv.scrollTop = outputDiv.scrollHeight;
+        });
+    }
+
+    function finish(status) {
+        if (finished) return;
+        finished = true;
+        handlePlaybookCompletion(status, card);
+    }
+
     function updateProgress() {
         try {
-            fetch(`/api/status/${jobId}`)
+            fetch(`/api/status/${jobId}?since=${cursor}`)
                 .then(response => {
                     if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
                     return response.json();
                 })
                 .then(data => {
-                    // Atualiza o progresso e saída como antes
-                    // ...
+                    appendOutput(data.output);
+                    cursor = data.cursor || cursor;
+                    applyProgress(data.progress);
                     
                     // Continua monitorando com intervalo adaptativo
-                    if (data.status === 'running') {
-                        // Aumenta gradualmente o intervalo (backoff exponencial)
-                        pollInterval = Math.min(pollInterval * 1.5, maxInterval);
+                    if (data.status === 'running' || data.status === 'queued') {
+                        // Nova saída volta ao intervalo mínimo; sem novidades, backoff exponencial
+                        pollInterval = data.output ? 1000 : Math.min(pollInterval * 1.5, maxInterval);
                         setTimeout(updateProgress, pollInterval);
                     } else {
-                        handlePlaybookCompletion(data.status, card);
+                        finish(data.status);
                     }
                 })
                 .catch(error => {
                     console.error(error);
                     debugLog(`Erro ao monitorar job ${jobId}: ${error.message}`, 'error');
-                    handlePlaybookCompletion('failed', card);
+                    finish('failed');
                 });
         } catch (error) {
             console.error(error);
             debugLog(`Erro ao monitorar job ${jobId}: ${error.message}`, 'error');
-            handlePlaybookCompletion('failed', card);
+            finish('failed');
         }
     }
 
+    function startStream() {
+        const source = new EventSource(`/api/stream/${encodeURIComponent(jobId)}`);
+        let received = false;
+        
+        source.addEventListener('output', (e) => {
+            received = true;
+            const data = JSON.parse(e.data);
+            appendOutput(data.output);
+            cursor = data.cursor;
+        });
+        source.addEventListener('progress', (e) => {
+            received = true;
+            const data = JSON.parse(e.data);
+            applyProgress(data.progress);
+        });
+        source.addEventListener('end', (e) => {
+            source.close();
+            finish(JSON.parse(e.data).status);
+        });
+        source.onerror = () => {
+            // Sem resposta do stream: passa a consultar o status a partir do último cursor
+            if (!received || source.readyState === EventSource.CLOSED) {
+                source.close();
+                if (!finished) updateProgress();
+            }
+        };
+    }
+
     // Inicia o monitoramento
-    updateProgress();
+    if (window.EventSource) {
+        startStream();
+    } else {
+        updateProgress();
+    }
 }
 
 
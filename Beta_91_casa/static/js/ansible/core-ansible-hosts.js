@@ -378,9 +378,30 @@ function toggleHostSelection(banner, hostname) {
         }
         
         updateExecuteButton();
+        scheduleSshPrewarm();
     }
 }
 
+let sshPrewarmTimer = null;
+
+/**
+ * Pede ao servidor que abra as conexões SSH mestras dos hosts selecionados,
+ * para que a execução do playbook não precise repetir o handshake.
+ * Agrupa cliques seguidos em uma única requisição.
+ */
+function scheduleSshPrewarm() {
+    clearTimeout(sshPrewarmTimer);
+    sshPrewarmTimer = setTimeout(() => {
+        const hosts = Array.from(selectedHosts);
+        if (!hosts.length) return;
+        fetch('/api/ssh/prewarm', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ hosts })
+        }).catch(error => debugLog(`Falha ao pré-aquecer conexões SSH: ${error.message}`));
+    }, 300);
+}
+
 /**
  * Seleciona ou deseleciona todos os hosts válidos
  * @param {boolean} checked - Se verdadeiro, seleciona todos; caso contrário, deseleciona
@@ -400,6 +421,7 @@ function toggleAllHosts(checked) {
     });
     
     updateExecuteButton();
+    scheduleSshPrewarm();
     debugLog(`${checked ? 'Selecionou' : 'Desmarcou'} todos os hosts. Total: ${selectedHosts.size}`);
 }
 